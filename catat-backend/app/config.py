@@ -9,14 +9,14 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = False
     
-    # API Keys
-    GROQ_API_KEY: str
-    ANTHROPIC_API_KEY: str
+    # API Keys (checked when the app starts, so scripts and tools can import it without them)
+    GROQ_API_KEY: str = ""
+    ANTHROPIC_API_KEY: str = ""
     
     # Supabase
-    SUPABASE_URL: str
-    SUPABASE_SERVICE_KEY: str
-    SUPABASE_ANON_KEY: str
+    SUPABASE_URL: str = ""
+    SUPABASE_SERVICE_KEY: str = ""
+    SUPABASE_ANON_KEY: str = ""
     
     # CORS
     CORS_ORIGINS_STR: str = '["https://catat-chi.vercel.app", "http://localhost:5173"]'
@@ -29,12 +29,124 @@ class Settings(BaseSettings):
             return ["https://catat-chi.vercel.app", "http://localhost:5173"]
     
     # Rate Limiting
-    RATE_LIMIT_PER_MINUTE: int = 10
+    RATE_LIMIT_PER_MINUTE: int = 10  # per client, 0 disables
+    RATE_LIMIT_API_KEYS: list = []  # X-API-Key values that get their own bucket; other keys are ignored
+    # Proxies in front that append X-Forwarded-For. 0 keys clients by the peer address, safe
+    # anywhere; set 1 on Render, where every peer is the proxy. Too high lets clients pick their key.
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
+    
+    # Outbound provider backpressure
+    PROVIDER_MAX_CONCURRENCY: int = 16
+    PROVIDER_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    PROVIDER_RATE_LIMIT_RETRIES: int = 3
+    PROVIDER_TRANSIENT_RETRIES: int = 2  # 5xx, overloaded, timeouts, dropped connections
+    
+    # Models and latency budget (empty fallback disables hedging for that stage)
+    GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    GROQ_FALLBACK_MODEL: str = "llama-3.1-8b-instant"
+    CLAUDE_MODEL: str = "claude-sonnet-4-20250514"
+    CLAUDE_FALLBACK_MODEL: str = "claude-3-5-haiku-20241022"
+    LATENCY_BUDGET_SECONDS: float = 60.0  # per request, clients may override
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_MIN_SAMPLES: int = 20
     
     # File Upload
     MAX_AUDIO_SIZE_MB: int = 25
     ALLOWED_AUDIO_TYPES: list = ["audio/webm", "audio/wav", "audio/mp3", "audio/mpeg", "audio/flac", "audio/m4a"]
     
+    # Provider HTTP connection pool (shared by Groq and Anthropic clients)
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_TIMEOUT_SECONDS: float = 60.0
+    
+    # Open pooled provider connections (DNS + TLS) during startup, before the app reports ready
+    PROVIDER_WARMUP_ENABLED: bool = True
+    PROVIDER_WARMUP_CONNECTIONS: int = 2  # per provider
+    PROVIDER_WARMUP_TIMEOUT_SECONDS: float = 5.0
+    
+    # Provider endpoints (empty uses the SDK default; benchmarks point these at local stubs)
+    GROQ_BASE_URL: str = ""
+    ANTHROPIC_BASE_URL: str = ""
+    
+    # State shared by uvicorn workers: memory (per process), sqlite (one box) or redis
+    SHARED_STATE_BACKEND: str = "memory"
+    SHARED_STATE_SQLITE_PATH: str = "shared_state.db"
+    SHARED_STATE_REDIS_URL: str = "redis://localhost:6379/0"
+    SHARED_STATE_TIMEOUT_MS: float = 50.0  # per redis operation; slower calls count as a miss
+    SHARED_STATE_SQLITE_BUSY_TIMEOUT_MS: float = 500.0  # how long a sqlite call waits on another worker's lock
+    SHARED_METRICS_INTERVAL_SECONDS: float = 10.0
+    
+    # Transcript cache (empty DB path keeps it memory-only unless shared state is on)
+    TRANSCRIPT_CACHE_SIZE: int = 512
+    TRANSCRIPT_CACHE_TTL_SECONDS: int = 86400
+    TRANSCRIPT_CACHE_DB_PATH: str = ""
+    
+    # Structuring cache
+    STRUCTURE_CACHE_SIZE: int = 512
+    STRUCTURE_CACHE_TTL_SECONDS: int = 3600
+    STRUCTURE_FAST_PATH_ENABLED: bool = True  # skip the LLM when the form covers the contacts
+    
+    # Identical /generate-letter requests in flight at the same time share one pipeline run
+    REQUEST_COALESCING_ENABLED: bool = True
+    
+    # Generated letters kept server-side for revisions (a few KB each)
+    SESSION_CACHE_SIZE: int = 1000
+    SESSION_TTL_SECONDS: int = 3600
+    
+    # Generated letters written to the letters table off the request path (empty URL disables).
+    # postgresql://… (Supabase's connection string, not SUPABASE_URL) or sqlite:///letters.db
+    # Rows have no user_id, so per-user RLS policies hide them; see LetterStore
+    LETTER_DB_URL: str = ""
+    LETTER_DB_POOL_SIZE: int = 2
+    LETTER_PERSIST_QUEUE_SIZE: int = 1000
+    LETTER_PERSIST_BATCH_SIZE: int = 50
+    LETTER_PERSIST_BATCH_WAIT_MS: float = 100.0  # how long a batch waits to fill up
+    LETTER_PERSIST_ENQUEUE_TIMEOUT_SECONDS: float = 0.5  # backpressure on a full queue, then the row is dropped
+    LETTER_PERSIST_RETRIES: int = 3
+    LETTER_PERSIST_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
+    
+    # PDF/DOCX export (rendered bytes cached by content hash, tens of KB each)
+    RENDER_WORKERS: int = 2  # 0 runs in the default thread pool
+    RENDER_CACHE_SIZE: int = 200
+    RENDER_CACHE_TTL_SECONDS: int = 3600
+    
+    # Admin API and on-demand profiling (empty token disables both the API and X-Profile)
+    ADMIN_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of generation requests profiled without the header
+    PROFILE_PATH_PREFIX: str = "/api/generate-letter"  # POST paths eligible (stream and batch included)
+    PROFILE_INTERVAL_MS: float = 5.0  # stack sampling interval
+    PROFILE_LOOP_LAG_INTERVAL_MS: float = 10.0
+    PROFILE_TOP_FUNCTIONS: int = 30
+    PROFILE_STORE_SIZE: int = 50
+    PROFILE_TTL_SECONDS: int = 86400
+    
+    # Long recordings are split at silences and transcribed in parallel
+    LONG_AUDIO_ENABLED: bool = True
+    LONG_AUDIO_THRESHOLD_SECONDS: int = 120
+    LONG_AUDIO_SEGMENT_SECONDS: int = 60
+    LONG_AUDIO_OVERLAP_SECONDS: float = 1.5
+    LONG_AUDIO_MAX_CONCURRENCY: int = 4
+    
+    # Audio preprocessing before upload (16 kHz mono, silence trimmed)
+    AUDIO_PREPROCESS_ENABLED: bool = False
+    AUDIO_PREPROCESS_CODEC: str = "flac"  # flac | opus
+    AUDIO_PREPROCESS_WORKERS: int = 2  # shared with long-audio splitting; 0 runs in the default thread pool
+    AUDIO_SILENCE_THRESHOLD: float = 500.0  # RMS on the 16-bit scale
+    
+    # Background generation jobs
+    JOB_DB_PATH: str = "jobs.db"
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_SIZE: int = 100
+    JOB_LEASE_SECONDS: int = 60  # a running job whose claim isn't renewed for this long is resumed by the next start
+    
+    # Batch generation
+    BATCH_MAX_ITEMS: int = 50
+    BATCH_MAX_TOTAL_MB: int = 100
+    BATCH_WHISPER_CONCURRENCY: int = 8
+    BATCH_LLM_CONCURRENCY: int = 8
+    BATCH_CLAUDE_CONCURRENCY: int = 4
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,9 +1,33 @@
+# Taken before any other import so /health can report what importing the app cost
+import time
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import logging
-import time
 
-from app.routers import generate
+from app.routers import generate, jobs, letters, admin
+from app.middleware.upload_limit import UploadLimitMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.services.provider_clients import provider_clients
+from app.services.transcript_cache import transcript_cache
+from app.services.whisper_service import get_whisper_service
+from app.services.groq_service import get_groq_service
+from app.services.claude_service import get_claude_service
+from app.services.letter_sessions import letter_sessions
+from app.services.letter_renderer import letter_renderer
+from app.services.letter_store import letter_store
+from app.services.profiler import profile_store
+from app.services.request_coalescer import request_coalescer
+from app.services.audio_preprocessor import audio_preprocessor
+from app.services.shared_state import shared_state
+from app.services.shared_metrics import shared_metrics
+from app.services.job_queue import job_queue
+from app.services.adaptive_limiter import whisper_limiter, groq_limiter, claude_limiter
+from app.services import telemetry
 from app.config import settings
 
 # Configure logging
@@ -13,39 +37,119 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cold-start timings reported in /health
+startup_stats = {"import_ms": None, "startup_ms": None, "warmup": None}
+
+# Lifespan: services and provider clients are built once, before the app takes requests
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    logger.info("🚀 Catat API starting...")
+    logger.info(f"Environment: {'Development' if settings.DEBUG else 'Production'}")
+    provider_clients.open()
+    get_whisper_service()
+    get_groq_service()
+    get_claude_service()
+    if settings.PROVIDER_WARMUP_ENABLED:
+        startup_stats["warmup"] = await provider_clients.warmup()
+    letter_store.start()
+    await job_queue.start()
+    shared_metrics.start()
+    
+    startup_stats["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"✅ Ready in {startup_stats['startup_ms']:.0f}ms (import {startup_stats['import_ms']:.0f}ms)")
+    
+    yield
+    
+    logger.info("🛑 Catat API shutting down...")
+    await job_queue.stop()
+    # After the job queue, so letters from jobs finishing during shutdown are flushed too
+    await letter_store.stop()
+    await shared_metrics.stop()
+    await provider_clients.close()
+    await transcript_cache.close()
+    audio_preprocessor.close()
+    letter_renderer.close()
+    await shared_state.close()
+
 # Create app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="AI-powered Malaysian letter generator",
-    docs_url="/docs" if settings.DEBUG else None
+    docs_url="/docs" if settings.DEBUG else None,
+    lifespan=lifespan
 )
 
-# CORS
+# Upload size: audio limit plus headroom for the multipart envelope and form fields
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    UploadLimitMiddleware,
+    max_bytes=(settings.MAX_AUDIO_SIZE_MB + 1) * 1024 * 1024,
+    path_limits={"/api/generate-letters/batch": (settings.BATCH_MAX_TOTAL_MB + 1) * 1024 * 1024},
+    file_field="audio",
+    allowed_types=settings.ALLOWED_AUDIO_TYPES,
+    max_part_bytes=settings.MAX_AUDIO_SIZE_MB * 1024 * 1024
 )
 
-# Request logging
+# Per-client rate limit, checked before any upload is read; buckets are shared across workers
+app.add_middleware(
+    RateLimitMiddleware,
+    per_minute=settings.RATE_LIMIT_PER_MINUTE,
+    store=shared_state,
+    api_keys=settings.RATE_LIMIT_API_KEYS,
+    trusted_proxies=settings.RATE_LIMIT_TRUSTED_PROXIES
+)
+
+# Request logging, metrics and Server-Timing
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start = time.time()
     logger.info(f"→ {request.method} {request.url.path}")
     
-    response = await call_next(request)
+    # Services append their stage timings to this list while handling the request
+    timings = []
+    telemetry.request_timings.set(timings)
+    telemetry.HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+    finally:
+        telemetry.HTTP_IN_FLIGHT.dec()
     
     duration = time.time() - start
     logger.info(f"← {request.method} {request.url.path} - {response.status_code} - {duration:.3f}s")
     response.headers["X-Process-Time"] = str(duration)
+    response.headers["Server-Timing"] = telemetry.server_timing(timings, duration)
+    telemetry.HTTP_REQUESTS.inc(method=request.method, status=str(response.status_code))
+    telemetry.HTTP_SECONDS.observe(duration, method=request.method)
     
     return response
 
+# On-demand profiling, outside the request logging so reports include its Server-Timing.
+# Not installed at all unless configured, so it costs nothing when off.
+if settings.ADMIN_TOKEN or settings.PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        token=settings.ADMIN_TOKEN,
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        path_prefix=settings.PROFILE_PATH_PREFIX
+    )
+
+# CORS (outermost, so 413/429 responses from the middlewares above still carry CORS headers)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.CORS_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Process-Time", "Retry-After", "X-Profile-Id"],
+)
+
 # Include routers
 app.include_router(generate.router)
+app.include_router(jobs.router)
+app.include_router(letters.router)
+app.include_router(admin.router)
 
 # Health check
 @app.get("/health")
@@ -53,7 +157,28 @@ async def health():
     return {
         "status": "healthy",
         "version": settings.APP_VERSION,
-        "service": settings.APP_NAME
+        "service": settings.APP_NAME,
+        "caches": {
+            "transcript": transcript_cache.stats(),
+            "structure": get_groq_service().cache.stats(),
+            "sessions": letter_sessions.stats(),
+            "render": letter_renderer.stats()
+        },
+        "shared_state": shared_state.stats(),
+        "persistence": letter_store.stats(),
+        "coalescing": request_coalescer.stats(),
+        "audio_preprocessing": audio_preprocessor.stats(),
+        "providers": {
+            "whisper": whisper_limiter.stats(),
+            "groq": groq_limiter.stats(),
+            "claude": claude_limiter.stats()
+        },
+        "models": {
+            "structure": get_groq_service().router.stats(),
+            "generate": get_claude_service().router.stats(),
+            "revise": get_claude_service().paragraph_router.stats()
+        },
+        "startup": startup_stats
     }
 
 # Root
@@ -65,11 +190,28 @@ async def root():
         "docs": "/docs" if settings.DEBUG else "Disabled"
     }
 
-@app.on_event("startup")
-async def startup():
-    logger.info("🚀 Catat API starting...")
-    logger.info(f"Environment: {'Development' if settings.DEBUG else 'Production'}")
+# Prometheus metrics; with a shared backend each scrape sums every worker's series
+def _collect_live_state():
+    caches = (
+        ("transcript", transcript_cache), ("structure", get_groq_service().cache),
+        ("sessions", letter_sessions), ("render", letter_renderer)
+    )
+    for name, cache in caches:
+        stats = cache.stats()
+        telemetry.CACHE_REQUESTS.set(stats["hits"], cache=name, result="hit")
+        telemetry.CACHE_REQUESTS.set(stats["misses"], cache=name, result="miss")
+    for name, limiter in (("whisper", whisper_limiter), ("groq", groq_limiter), ("claude", claude_limiter)):
+        telemetry.PROVIDER_IN_FLIGHT.set(limiter.in_flight, provider=name)
+        telemetry.PROVIDER_CONCURRENCY_LIMIT.set(int(limiter.limit), provider=name)
+    telemetry.LETTER_WRITE_QUEUE.set(letter_store.stats()["queue"])
+
+telemetry.registry.on_collect(_collect_live_state)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        await shared_metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
-@app.on_event("shutdown")
-async def shutdown():
-    logger.info("🛑 Catat API shutting down...")
\ No newline at end of file
+startup_stats["import_ms"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
@@ -0,0 +1,78 @@
+from app.services.profiler import ProfileStore, RequestProfile
+from typing import Optional, Tuple
+import hmac
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+class ProfilingMiddleware:
+    """
+    Opt-in profiling of generation requests.
+    A request is profiled when it carries X-Profile set to the admin token, or
+    when it falls in the sample rate. The report id comes back in X-Profile-Id;
+    fetch the report from /api/admin/profiles/{id}. Streamed responses are
+    profiled until their last chunk.
+    Only added to the app when a token or sample rate is configured.
+    """
+
+    def __init__(self, app, store: ProfileStore, token: str, sample_rate: float, path_prefix: str):
+        self.app = app
+        self.store = store
+        self.token = token.encode("latin-1")
+        self.sample_rate = sample_rate
+        self.path_prefix = path_prefix
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    if hmac.compare_digest(value, self.token):
+                        return "header"
+                    logger.warning(f"⛔ Ignored X-Profile with a wrong token on {scope['path']}")
+                    break
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.path_prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        trigger = self._trigger(scope)
+        if trigger is None or self.store.active:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], trigger)
+        response: Tuple[Optional[int], Optional[str]] = (None, None)
+
+        async def profiled_send(message):
+            nonlocal response
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                server_timing = next((v.decode("latin-1") for k, v in headers if k == b"server-timing"), None)
+                response = (message["status"], server_timing)
+                message = {**message, "headers": headers + [(b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        self.store.active = True
+        profile.start()
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            try:
+                report = await profile.stop(*response)
+            finally:
+                self.store.active = False
+            await self.store.save(report)
+            logger.info(
+                f"🔬 Profiled {scope['path']} ({trigger}): {report['duration_ms']:.0f}ms, "
+                f"{report['samples']['busy']} busy samples, loop blocked {report['loop_lag']['blocked_ms']:.0f}ms "
+                f"→ {profile.id}"
+            )
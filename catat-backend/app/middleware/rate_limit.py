@@ -0,0 +1,69 @@
+from app.services.shared_state import SharedState
+from app.services.telemetry import RATE_LIMIT_FAIL_OPEN
+from starlette.responses import JSONResponse
+from typing import Iterable
+import hashlib
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+class RateLimitMiddleware:
+    """
+    Per-client token buckets for POST requests under /api.
+    Clients are keyed by X-API-Key only when it is one of the configured keys;
+    anything else a client sends is ignored. Otherwise the key is the address
+    the nearest trusted proxy saw: with N trusted proxies, the Nth X-Forwarded-For
+    hop from the right, since hops further left are whatever the client wrote.
+    Without trusted proxies it is the peer address.
+    Buckets live in the shared state, so every worker enforces the same limit.
+    """
+
+    def __init__(self, app, per_minute: int, store: SharedState, api_keys: Iterable[str] = (), trusted_proxies: int = 0):
+        self.app = app
+        self.per_minute = per_minute
+        self.store = store
+        self.api_keys = {key.encode("latin-1") for key in api_keys}
+        self.trusted_proxies = trusted_proxies
+
+    def _client_key(self, scope) -> str:
+        forwarded = []
+        for name, value in scope["headers"]:
+            if name == b"x-api-key" and value in self.api_keys:
+                # Hashed so keys never reach the shared state or the logs
+                return "key:" + hashlib.sha256(value).hexdigest()[:16]
+            if name == b"x-forwarded-for":
+                forwarded.extend(hop.strip() for hop in value.decode("latin-1").split(","))
+        if self.trusted_proxies and len(forwarded) >= self.trusted_proxies:
+            return "ip:" + forwarded[-self.trusted_proxies]
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    async def __call__(self, scope, receive, send):
+        if (
+            self.per_minute <= 0
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith("/api/")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = self._client_key(scope)
+        wait = await self.store.take_token("rate:" + key, self.per_minute, self.per_minute / 60)
+        if wait is None:
+            # A store outage shouldn't take the API down with it
+            RATE_LIMIT_FAIL_OPEN.inc()
+            logger.warning(f"⚠️ Rate limit store unavailable, allowed {key} on {scope['path']} unchecked")
+        elif wait > 0:
+            retry_after = max(1, math.ceil(wait))
+            logger.warning(f"⛔ Rate limited {key} on {scope['path']} (retry in {retry_after}s)")
+            response = JSONResponse(
+                {"detail": f"Rate limit reached. Max {self.per_minute} requests per minute."},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
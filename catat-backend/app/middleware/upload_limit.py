@@ -0,0 +1,100 @@
+from fastapi import HTTPException
+from typing import Dict, List, Optional
+from starlette.responses import JSONResponse
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+class UploadLimitMiddleware:
+    """
+    Reject request bodies over max_bytes before they are parsed.
+    Declared Content-Length is checked up front; chunked bodies are counted
+    as they arrive and cut off as soon as they cross the limit.
+    Multipart part headers for file_field are checked as they stream past, so a
+    wrong Content-Type (or an oversized part Content-Length) is rejected before
+    the part's bytes are read.
+    """
+
+    # Headers of one part: everything between a boundary line and the blank line
+    PART_HEADERS = rb"\r\n--%s\r\n((?:[^\r\n]+\r\n)*?)\r\n"
+
+    def __init__(
+        self,
+        app,
+        max_bytes: int,
+        path_limits: Optional[Dict[str, int]] = None,
+        file_field: Optional[str] = None,
+        allowed_types: Optional[List[str]] = None,
+        max_part_bytes: Optional[int] = None
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+        self.file_field = file_field
+        self.allowed_types = set(allowed_types or ())
+        self.max_part_bytes = max_part_bytes
+
+    @staticmethod
+    def _boundary(content_type: bytes) -> Optional[bytes]:
+        match = re.search(rb'boundary="?([^";]+)"?', content_type)
+        return match.group(1) if content_type.startswith(b"multipart/form-data") and match else None
+
+    def _check_part(self, block: bytes):
+        headers = {}
+        for line in block.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip().decode("latin-1")
+        if f'name="{self.file_field}"' not in headers.get(b"content-disposition", ""):
+            return
+        content_type = headers.get(b"content-type")
+        if self.allowed_types and content_type not in self.allowed_types:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {content_type}")
+        length = headers.get(b"content-length", "")
+        if self.max_part_bytes and length.isdigit() and int(length) > self.max_part_bytes:
+            raise HTTPException(
+                status_code=413, detail=f"File too large. Max: {self.max_part_bytes // (1024 * 1024)}MB"
+            )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.path_limits.get(scope["path"], self.max_bytes)
+        detail = f"Request too large. Max: {max_bytes // (1024 * 1024)}MB"
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            logger.warning(f"⛔ Rejected {scope['path']}: Content-Length {int(content_length)} bytes")
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+        boundary = self._boundary(headers.get(b"content-type", b"")) if self.file_field else None
+        part_headers = re.compile(self.PART_HEADERS % re.escape(boundary)) if boundary else None
+        # The body opens with the first boundary line; the leading CRLF lets one pattern match every part
+        tail = b"\r\n"
+
+        async def limited_receive():
+            nonlocal received, tail
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                if received > max_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing as-is
+                    raise HTTPException(status_code=413, detail=detail)
+                if part_headers is not None:
+                    window = tail + body
+                    end = 0
+                    for match in part_headers.finditer(window):
+                        self._check_part(match.group(1))
+                        end = match.end()
+                    # Keep enough unmatched bytes for a header block split across chunks
+                    tail = window[max(end, len(window) - 4096):]
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import Optional
+from enum import Enum
+from app.models.letter import StructuredData, GenerateLetterResponse
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobStage(str, Enum):
+    TRANSCRIBE = "transcribe"
+    STRUCTURE = "structure"
+    GENERATE = "generate"
+    DONE = "done"
+
+class JobCreatedResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: JobStatus
+    stage: JobStage
+    transcript: Optional[str] = None
+    structured_data: Optional[StructuredData] = None
+    result: Optional[GenerateLetterResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, List
 from enum import Enum
 
 class LetterType(str, Enum):
@@ -14,6 +14,10 @@ class Language(str, Enum):
     MALAY = "ms"
     MIXED = "mixed"
 
+class RenderFormat(str, Enum):
+    PDF = "pdf"
+    DOCX = "docx"
+
 class ToneDetected(str, Enum):
     CASUAL = "casual"
     MANGLISH = "manglish"
@@ -31,6 +35,16 @@ class ContactInfo(BaseModel):
     title: Optional[str] = None
     organization: Optional[str] = None
 
+class ContactOverrides(BaseModel):
+    """User-provided contact details that take priority over AI extraction"""
+    sender_name: Optional[str] = None
+    sender_address: Optional[str] = None
+    sender_contact: Optional[str] = None
+    recipient_name: Optional[str] = None
+    recipient_title: Optional[str] = None
+    recipient_organization: Optional[str] = None
+    recipient_address: Optional[str] = None
+
 class StructuredData(BaseModel):
     letter_type: LetterType
     sender: ContactInfo
@@ -47,10 +61,49 @@ class LetterMetadata(BaseModel):
     letter_type: LetterType
     tone_detected: Optional[ToneDetected] = None
     urgency: Optional[UrgencyLevel] = None
+    # Pipeline stage → model that actually served it (fallbacks included)
+    models: Dict[str, str] = {}
 
 class GenerateLetterResponse(BaseModel):
     success: bool
     transcript: str
     structured_data: StructuredData
     letter: str
-    metadata: LetterMetadata
\ No newline at end of file
+    metadata: LetterMetadata
+    # Pass to /api/letters/{generation_id}/revise while the session is alive
+    generation_id: Optional[str] = None
+    # Row in the letters table, written shortly after the response when persistence is on
+    letter_id: Optional[str] = None
+
+class LetterSession(BaseModel):
+    """Server-side state of one generation, enough to revise it without Whisper or Groq"""
+    transcript: str
+    structured_data: StructuredData
+    letter: str
+    language: Language
+    letter_type: LetterType
+
+class ReviseLetterRequest(BaseModel):
+    """Changes to a stored generation; anything left unset keeps its previous value"""
+    instructions: Optional[str] = Field(None, max_length=2000)
+    language: Optional[Language] = None
+    letter_type: Optional[LetterType] = None
+    # Rewrite only this paragraph of the subject and body (0 is the subject line)
+    paragraph: Optional[int] = Field(None, ge=0)
+    # Header/closing changes are rendered locally, no model call needed
+    contacts: Optional[ContactOverrides] = None
+
+class RenderLetterRequest(BaseModel):
+    """Letter HTML to export, e.g. after the user edited it in the browser"""
+    letter: str = Field(..., max_length=100_000)
+    language: Language
+    letter_type: LetterType
+    format: RenderFormat = RenderFormat.PDF
+
+class BatchItemResult(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    success: bool
+    result: Optional[GenerateLetterResponse] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Header, Depends
+from fastapi.responses import PlainTextResponse
+from app.services.profiler import profile_store
+from app.config import settings
+from typing import Optional
+import hmac
+import logging
+
+logger = logging.getLogger(__name__)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Without a configured token the admin API doesn't exist
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+async def list_profiles():
+    """Stored request profiles, newest first"""
+    return {"profiles": await profile_store.list()}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "json"):
+    """
+    One profile report. format=folded returns the stack samples as folded
+    text for flamegraph.pl or speedscope.
+    """
+    report = await profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found or expired")
+    if format == "folded":
+        return PlainTextResponse("\n".join(report["folded"]) + "\n")
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be json or folded")
+    return report
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, UploadFile, Form, File, HTTPException
-from app.services.whisper_service import whisper_service
-from app.services.groq_service import groq_service
-from app.services.claude_service import claude_service
-from app.models.letter import GenerateLetterResponse, Language, LetterType, LetterMetadata, ContactInfo
+from fastapi import APIRouter, UploadFile, Form, File, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from app.services.whisper_service import WhisperService, get_whisper_service
+from app.services.groq_service import GroqService, get_groq_service
+from app.services.claude_service import ClaudeService, get_claude_service
+from app.services.batch_service import batch_service
+from app.services.letter_pipeline import merge_contact_info, build_response, save_session
+from app.services.model_router import latency_budget
+from app.services.request_coalescer import request_coalescer, generation_key
+from app.models.letter import GenerateLetterResponse, Language, LetterType, ContactOverrides, BatchItemResult
+from app.utils.upload import read_audio_upload
 from app.config import settings
+from pydantic import TypeAdapter, ValidationError
+import json
 import logging
-from typing import Optional
+from typing import List, Optional
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["generate"])
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.post("/generate-letter", response_model=GenerateLetterResponse)
 async def generate_letter(
     audio: UploadFile = File(...),
@@ -23,83 +34,213 @@ async def generate_letter(
     recipient_name: Optional[str] = Form(None),
     recipient_title: Optional[str] = Form(None),
     recipient_organization: Optional[str] = Form(None),
-    recipient_address: Optional[str] = Form(None)
+    recipient_address: Optional[str] = Form(None),
+    # Overrides LATENCY_BUDGET_SECONDS for this request
+    latency_budget_seconds: Optional[float] = Form(None, gt=0),
+    whisper_service: WhisperService = Depends(get_whisper_service),
+    groq_service: GroqService = Depends(get_groq_service),
+    claude_service: ClaudeService = Depends(get_claude_service)
 ):
     """
     Complete pipeline: Audio → Groq Whisper → Groq LLM → Claude → Letter
     User-provided contact info will override/supplement AI-extracted data
     """
     
-    audio_bytes = await audio.read()
+    audio_bytes = await read_audio_upload(audio)
     file_size_mb = len(audio_bytes) / (1024 * 1024)
+    overrides = ContactOverrides(
+        sender_name=sender_name,
+        sender_address=sender_address,
+        sender_contact=sender_contact,
+        recipient_name=recipient_name,
+        recipient_title=recipient_title,
+        recipient_organization=recipient_organization,
+        recipient_address=recipient_address
+    )
     
-    if file_size_mb > settings.MAX_AUDIO_SIZE_MB:
-        raise HTTPException(status_code=413, detail=f"File too large. Max: {settings.MAX_AUDIO_SIZE_MB}MB")
+    async def pipeline() -> GenerateLetterResponse:
+        try:
+            logger.info(f"🚀 Starting generation: {letter_type}, {language}, {file_size_mb:.2f}MB")
+            
+            with latency_budget(latency_budget_seconds) as models:
+                # Step 1: Transcribe
+                logger.info("Step 1: Groq Whisper transcription...")
+                transcript = await whisper_service.transcribe_audio(
+                    audio_bytes=audio_bytes,
+                    language=language.value,
+                    filename=audio.filename or "recording.webm"
+                )
+                
+                # Step 2: Structure
+                logger.info("Step 2: Groq LLM structuring...")
+                structured_data = await groq_service.structure_letter(transcript, letter_type.value, overrides)
+                
+                # Step 3: Merge user-provided contact info with AI-extracted data
+                logger.info("Step 3: Merging user-provided contact info...")
+                structured_data = merge_contact_info(structured_data, overrides)
+                
+                # Step 4: Generate letter with merged data
+                logger.info("Step 4: Claude generation...")
+                final_letter = await claude_service.generate_letter(structured_data, language, letter_type)
+            
+            response = await save_session(
+                build_response(transcript, structured_data, final_letter, language, letter_type, models)
+            )
+            
+            logger.info("✅ Generation completed successfully!")
+            return response
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Generation failed: {str(e)}", exc_info=True)
+            raise HTTPException(status_code=500, detail=str(e))
     
-    if audio.content_type not in settings.ALLOWED_AUDIO_TYPES:
-        raise HTTPException(status_code=400, detail=f"Unsupported format: {audio.content_type}")
+    if not settings.REQUEST_COALESCING_ENABLED:
+        return await pipeline()
     
-    try:
-        logger.info(f"🚀 Starting generation: {letter_type}, {language}, {file_size_mb:.2f}MB")
-        
-        # Step 1: Transcribe
-        logger.info("Step 1: Groq Whisper transcription...")
-        transcript = await whisper_service.transcribe_audio(
-            audio_bytes=audio_bytes,
-            language=language.value,
-            filename=audio.filename or "recording.webm"
-        )
-        
-        # Step 2: Structure
-        logger.info("Step 2: Groq LLM structuring...")
-        structured_data = await groq_service.structure_letter(transcript, letter_type.value)
-        
-        # Step 3: Merge user-provided contact info with AI-extracted data
-        logger.info("Step 3: Merging user-provided contact info...")
-        
-        # User-provided info takes priority (overrides AI extraction)
-        if sender_name or sender_address or sender_contact:
-            structured_data.sender = ContactInfo(
-                name=sender_name or structured_data.sender.name,
-                address=sender_address or structured_data.sender.address,
-                contact=sender_contact or structured_data.sender.contact
-            )
-        
-        if recipient_name or recipient_title or recipient_organization or recipient_address:
-            structured_data.recipient = ContactInfo(
-                name=recipient_name or structured_data.recipient.name,
-                title=recipient_title or structured_data.recipient.title,
-                organization=recipient_organization or structured_data.recipient.organization,
-                address=recipient_address or structured_data.recipient.address
+    # Double taps and client retries attach to the run already in flight and share its result
+    key = generation_key(audio_bytes, language, letter_type, overrides, latency_budget_seconds)
+    return await request_coalescer.run(key, pipeline)
+
+@router.post("/generate-letter/stream")
+async def generate_letter_stream(
+    audio: UploadFile = File(...),
+    language: Language = Form(...),
+    letter_type: LetterType = Form(...),
+    sender_name: Optional[str] = Form(None),
+    sender_address: Optional[str] = Form(None),
+    sender_contact: Optional[str] = Form(None),
+    recipient_name: Optional[str] = Form(None),
+    recipient_title: Optional[str] = Form(None),
+    recipient_organization: Optional[str] = Form(None),
+    recipient_address: Optional[str] = Form(None),
+    # Overrides LATENCY_BUDGET_SECONDS for this request
+    latency_budget_seconds: Optional[float] = Form(None, gt=0),
+    whisper_service: WhisperService = Depends(get_whisper_service),
+    groq_service: GroqService = Depends(get_groq_service),
+    claude_service: ClaudeService = Depends(get_claude_service)
+):
+    """
+    Same pipeline as /generate-letter, streamed as Server-Sent Events:
+    transcript → structured → letter_chunk (repeated) → complete
+    An error event replaces the remaining events if any stage fails.
+    """
+    
+    audio_bytes = await read_audio_upload(audio)
+    filename = audio.filename or "recording.webm"
+    overrides = ContactOverrides(
+        sender_name=sender_name,
+        sender_address=sender_address,
+        sender_contact=sender_contact,
+        recipient_name=recipient_name,
+        recipient_title=recipient_title,
+        recipient_organization=recipient_organization,
+        recipient_address=recipient_address
+    )
+    
+    async def events():
+        try:
+            logger.info(f"🚀 Starting streamed generation: {letter_type}, {language}")
+            
+            with latency_budget(latency_budget_seconds) as models:
+                transcript = await whisper_service.transcribe_audio(
+                    audio_bytes=audio_bytes,
+                    language=language.value,
+                    filename=filename
+                )
+                yield _sse("transcript", {"transcript": transcript})
+                
+                structured_data = await groq_service.structure_letter(transcript, letter_type.value, overrides)
+                structured_data = merge_contact_info(structured_data, overrides)
+                yield _sse("structured", {"structured_data": structured_data.model_dump(mode="json")})
+                
+                chunks = []
+                async for text in claude_service.stream_letter(structured_data, language, letter_type):
+                    chunks.append(text)
+                    yield _sse("letter_chunk", {"text": text})
+            
+            final_letter = "".join(chunks)
+            response = await save_session(
+                build_response(transcript, structured_data, final_letter, language, letter_type, models)
             )
+            yield _sse("complete", response.model_dump(mode="json"))
+            
+            logger.info("✅ Streamed generation completed successfully!")
+            
+        except HTTPException as e:
+            yield _sse("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logger.error(f"❌ Streamed generation failed: {str(e)}", exc_info=True)
+            yield _sse("error", {"status_code": 500, "detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/generate-letters/batch")
+async def generate_letters_batch(
+    audio: List[UploadFile] = File(...),
+    language: Language = Form(...),
+    letter_type: LetterType = Form(...),
+    # JSON array of per-item contact overrides, aligned with the audio files
+    items: Optional[str] = Form(None),
+    # Per-recording budget, overrides LATENCY_BUDGET_SECONDS
+    latency_budget_seconds: Optional[float] = Form(None, gt=0)
+):
+    """
+    Generate one letter per uploaded recording, streamed as Server-Sent Events.
+    An item event is sent for each recording as it finishes (success or error),
+    then a done event with the totals.
+    """
+    
+    if len(audio) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many recordings. Max: {settings.BATCH_MAX_ITEMS}")
+    
+    try:
+        overrides = TypeAdapter(List[ContactOverrides]).validate_json(items) if items else []
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid items: {e.errors()[0]['msg']}")
+    if len(overrides) > len(audio):
+        raise HTTPException(status_code=400, detail="More items than recordings")
+    overrides += [ContactOverrides()] * (len(audio) - len(overrides))
+    
+    # Invalid uploads fail on their own without holding up the rest of the batch
+    runnable = []
+    rejected = []
+    for index, (upload, item_overrides) in enumerate(zip(audio, overrides)):
+        filename = upload.filename or "recording.webm"
+        try:
+            runnable.append((index, await read_audio_upload(upload), filename, item_overrides))
+        except HTTPException as e:
+            rejected.append(BatchItemResult(index=index, filename=filename, success=False, status_code=e.status_code, error=str(e.detail)))
+    
+    logger.info(f"🚀 Starting batch: {len(runnable)} recordings, {len(rejected)} rejected")
+    
+    async def events():
+        succeeded = 0
+        for result in rejected:
+            yield _sse("item", result.model_dump(mode="json"))
         
-        logger.info(f"✅ Final sender: {structured_data.sender.name or '[Not provided]'}")
-        logger.info(f"✅ Final recipient: {structured_data.recipient.name or '[Not provided]'}")
-        
-        # Step 4: Generate letter with merged data
-        logger.info("Step 4: Claude generation...")
-        final_letter = await claude_service.generate_letter(structured_data, language, letter_type)
-        
-        metadata = LetterMetadata(
-            language=language,
-            letter_type=letter_type,
-            tone_detected=structured_data.tone_detected,
-            urgency=structured_data.urgency_level
-        )
-        
-        response = GenerateLetterResponse(
-            success=True,
-            transcript=transcript,
-            structured_data=structured_data,
-            letter=final_letter,
-            metadata=metadata
+        results = batch_service.run(
+            [(audio_bytes, filename, item_overrides) for _, audio_bytes, filename, item_overrides in runnable],
+            language,
+            letter_type,
+            latency_budget_seconds
         )
+        async for result in results:
+            # Map back from position in the runnable list to the original upload index
+            result.index = runnable[result.index][0]
+            succeeded += result.success
+            yield _sse("item", result.model_dump(mode="json"))
         
-        logger.info("✅ Generation completed successfully!")
-        return response
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Generation failed: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.info(f"✅ Batch completed: {succeeded}/{len(audio)} succeeded")
+        yield _sse("done", {"total": len(audio), "succeeded": succeeded, "failed": len(audio) - succeeded})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
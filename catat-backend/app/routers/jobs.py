@@ -0,0 +1,89 @@
+from fastapi import APIRouter, UploadFile, Form, File, HTTPException
+from app.services.job_queue import job_queue
+from app.services.letter_pipeline import build_response
+from app.services.letter_store import letter_store
+from app.models.job import JobCreatedResponse, JobStatusResponse, JobStatus, JobStage
+from app.models.letter import Language, LetterType, ContactOverrides, StructuredData
+from app.utils.upload import read_audio_upload
+import json
+import logging
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+@router.post("/jobs", response_model=JobCreatedResponse, status_code=202)
+async def create_job(
+    audio: UploadFile = File(...),
+    language: Language = Form(...),
+    letter_type: LetterType = Form(...),
+    sender_name: Optional[str] = Form(None),
+    sender_address: Optional[str] = Form(None),
+    sender_contact: Optional[str] = Form(None),
+    recipient_name: Optional[str] = Form(None),
+    recipient_title: Optional[str] = Form(None),
+    recipient_organization: Optional[str] = Form(None),
+    recipient_address: Optional[str] = Form(None)
+):
+    """
+    Queue the generation pipeline and return immediately.
+    Poll GET /api/jobs/{job_id} for progress and the final letter.
+    """
+
+    audio_bytes = await read_audio_upload(audio)
+    overrides = ContactOverrides(
+        sender_name=sender_name,
+        sender_address=sender_address,
+        sender_contact=sender_contact,
+        recipient_name=recipient_name,
+        recipient_title=recipient_title,
+        recipient_organization=recipient_organization,
+        recipient_address=recipient_address
+    )
+
+    job_id = await job_queue.submit(
+        audio_bytes=audio_bytes,
+        filename=audio.filename or "recording.webm",
+        language=language,
+        letter_type=letter_type,
+        overrides=overrides
+    )
+    return JobCreatedResponse(job_id=job_id, status=JobStatus.QUEUED)
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """Job status plus whatever stage results are ready so far"""
+
+    job = await job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    structured_data = None
+    if job["structured_data"]:
+        structured_data = StructuredData.model_validate_json(job["structured_data"])
+
+    result = None
+    if job["status"] == JobStatus.COMPLETED.value:
+        result = build_response(
+            job["transcript"],
+            structured_data,
+            job["letter"],
+            Language(job["language"]),
+            LetterType(job["letter_type"]),
+            json.loads(job["models"] or "{}")
+        )
+        if letter_store.enabled:
+            result.letter_id = letter_store.row_id(job["id"])
+
+    return JobStatusResponse(
+        job_id=job["id"],
+        status=JobStatus(job["status"]),
+        stage=JobStage(job["stage"]),
+        transcript=job["transcript"],
+        structured_data=structured_data,
+        result=result,
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
@@ -0,0 +1,126 @@
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import Response, StreamingResponse
+from app.services.claude_service import ClaudeService, get_claude_service
+from app.services.letter_sessions import letter_sessions
+from app.services.letter_renderer import letter_renderer, MEDIA_TYPES
+from app.services.letter_pipeline import merge_contact_info, build_response
+from app.services.letter_store import letter_store
+from app.services.letter_template import assemble_letter, letter_body
+from app.services.model_router import latency_budget
+from app.services.telemetry import LETTER_REVISIONS
+from app.models.letter import GenerateLetterResponse, ReviseLetterRequest, RenderLetterRequest, RenderFormat
+import logging
+
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api", tags=["letters"])
+
+RENDER_CHUNK_SIZE = 64 * 1024
+
+async def _file_response(request: Request, letter: str, fmt: RenderFormat, letter_type: str, language: str):
+    """Stream a rendered letter back; an unchanged letter answers If-None-Match with 304"""
+    rendered, key = await letter_renderer.render(letter, fmt.value, letter_type, language)
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=3600"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    async def chunks():
+        for start in range(0, len(rendered), RENDER_CHUNK_SIZE):
+            yield rendered[start:start + RENDER_CHUNK_SIZE]
+
+    headers["Content-Length"] = str(len(rendered))
+    headers["Content-Disposition"] = f'attachment; filename="letter.{fmt.value}"'
+    return StreamingResponse(chunks(), media_type=MEDIA_TYPES[fmt.value], headers=headers)
+
+@router.post("/letters/render")
+async def render_letter(body: RenderLetterRequest, request: Request):
+    """Render letter HTML as a Malaysian-format A4 PDF or DOCX"""
+    return await _file_response(request, body.letter, body.format, body.letter_type.value, body.language.value)
+
+@router.get("/letters/{generation_id}/render")
+async def render_stored_letter(generation_id: str, request: Request, format: RenderFormat = RenderFormat.PDF):
+    """Render a stored generation (latest revision) without sending its HTML back up"""
+    session = await letter_sessions.get(generation_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Letter session not found or expired")
+    return await _file_response(request, session.letter, format, session.letter_type.value, session.language.value)
+
+@router.post("/letters/{generation_id}/revise", response_model=GenerateLetterResponse)
+async def revise_letter(
+    generation_id: str,
+    request: ReviseLetterRequest,
+    claude_service: ClaudeService = Depends(get_claude_service)
+):
+    """
+    Revise a letter from /api/generate-letter using its stored transcript and structured data.
+    Only the Claude step reruns: the whole subject and body (new instructions, language or
+    letter type), or just one paragraph when `paragraph` is set. Contact changes alone are
+    rendered locally without calling any model.
+    """
+
+    session = await letter_sessions.get(generation_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Letter session not found or expired")
+
+    language = request.language or session.language
+    letter_type = request.letter_type or session.letter_type
+    rewrite = request.instructions or language != session.language or letter_type != session.letter_type
+    if request.paragraph is not None:
+        if not request.instructions:
+            raise HTTPException(status_code=400, detail="A paragraph rewrite needs instructions")
+        if language != session.language:
+            raise HTTPException(status_code=400, detail="Changing the language rewrites the whole letter; omit paragraph")
+    elif not rewrite and request.contacts is None:
+        raise HTTPException(status_code=400, detail="Nothing to revise")
+
+    structured_data = session.structured_data
+    structured_data.letter_type = letter_type
+    if request.contacts is not None:
+        structured_data = merge_contact_info(structured_data, request.contacts)
+    body = letter_body(session.letter, session.language)
+    paragraphs = body.split("\n\n")
+    if request.paragraph is not None and request.paragraph >= len(paragraphs):
+        raise HTTPException(status_code=400, detail=f"Paragraph out of range. Letter has {len(paragraphs)}")
+
+    try:
+        with latency_budget() as models:
+            if request.paragraph is not None:
+                logger.info(f"✏️ Revising {generation_id}: paragraph {request.paragraph}")
+                paragraphs[request.paragraph] = await claude_service.rewrite_paragraph(
+                    structured_data, language, letter_type, paragraphs, request.paragraph, request.instructions
+                )
+                letter = assemble_letter(structured_data, language, "\n\n".join(paragraphs))
+                mode = "paragraph"
+            elif rewrite:
+                logger.info(f"✏️ Revising {generation_id}: full letter ({language.value}, {letter_type.value})")
+                letter = await claude_service.generate_letter(
+                    structured_data, language, letter_type,
+                    instructions=request.instructions,
+                    previous_body=body
+                )
+                mode = "full"
+            else:
+                logger.info(f"✏️ Revising {generation_id}: contacts only")
+                letter = assemble_letter(structured_data, language, body)
+                mode = "contacts"
+
+        LETTER_REVISIONS.inc(mode=mode)
+        session.structured_data = structured_data
+        session.letter = letter
+        session.language = language
+        session.letter_type = letter_type
+        await letter_sessions.update(generation_id, session)
+
+        response = build_response(session.transcript, structured_data, letter, language, letter_type, models)
+        response.generation_id = generation_id
+        # Same row as the original generation, so the stored letter follows its revisions
+        response.letter_id = await letter_store.save(generation_id, response)
+        logger.info(f"✅ Revision completed ({mode})")
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Revision failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,109 @@
+from app.config import settings
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or "rate_limit" in str(error).lower()
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one upstream provider.
+    The limit halves whenever the provider answers 429 and grows back by
+    roughly one slot per limit's worth of successful calls. Callers over
+    the limit queue for up to PROVIDER_QUEUE_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, min_concurrency: int = 1):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.throttled = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def _acquire(self):
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < int(self.limit)),
+                    timeout=settings.PROVIDER_QUEUE_TIMEOUT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=503, detail=f"{self.name} is busy. Please retry shortly.")
+            self.in_flight += 1
+
+    async def _release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _on_success(self):
+        self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    def _on_rate_limited(self):
+        self.throttled += 1
+        # Calls already in flight when the provider pushed back report together; halve once
+        now = time.monotonic()
+        if now - self._last_decrease < 1.0:
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_concurrency, self.limit / 2)
+        logger.warning(f"🐢 {self.name} rate limited, concurrency limit now {int(self.limit)}")
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one slot for the duration of a call; outcome feeds the limit"""
+        await self._acquire()
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self._on_rate_limited()
+            raise
+        else:
+            self._on_success()
+        finally:
+            await self._release()
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Run `call` in a slot, retrying upstream rate limits with jittered backoff"""
+        retries = settings.PROVIDER_RATE_LIMIT_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                async with self.slot():
+                    return await call()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == retries:
+                    raise
+                delay = _retry_after(e) or 0.5 * 2 ** attempt
+                await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "throttled": self.throttled
+        }
+
+whisper_limiter = AdaptiveLimiter("Groq Whisper", settings.PROVIDER_MAX_CONCURRENCY)
+groq_limiter = AdaptiveLimiter("Groq LLM", settings.PROVIDER_MAX_CONCURRENCY)
+claude_limiter = AdaptiveLimiter("Claude", settings.PROVIDER_MAX_CONCURRENCY)
@@ -0,0 +1,102 @@
+from app.config import settings
+from app.utils import audio
+from app.services.telemetry import track_stage
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+def preprocess_audio(audio_bytes: bytes, codec: str) -> dict:
+    """
+    Decode to 16 kHz mono, trim leading/trailing silence and re-encode.
+    Module-level so it can be pickled into a process pool.
+    """
+    started = time.perf_counter()
+    pcm = audio.decode_pcm(audio_bytes)
+    trimmed = audio.trim_silence(pcm, threshold=settings.AUDIO_SILENCE_THRESHOLD)
+    encoded, extension = audio.encode_pcm(trimmed, codec=codec)
+
+    return {
+        "audio": encoded,
+        "extension": extension,
+        "original_bytes": len(audio_bytes),
+        "processed_bytes": len(encoded),
+        "original_seconds": audio.pcm_duration(pcm),
+        "processed_seconds": audio.pcm_duration(trimmed),
+        "elapsed_ms": (time.perf_counter() - started) * 1000
+    }
+
+class AudioPreprocessor:
+    """
+    Optional normalization before upload: downmix, resample, trim silence, re-encode.
+    Runs in a process pool (or the default thread pool when AUDIO_PREPROCESS_WORKERS=0).
+    The pool also runs other CPU-bound audio work (long-audio splitting) through run().
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.runs = 0
+        self.bytes_saved = 0
+        self.seconds_trimmed = 0.0
+        self.total_ms = 0.0
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._pool is None and settings.AUDIO_PREPROCESS_WORKERS > 0:
+            self._pool = ProcessPoolExecutor(max_workers=settings.AUDIO_PREPROCESS_WORKERS)
+        return self._pool
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run a picklable module-level function in the audio pool"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor(), func, *args)
+
+    async def process(self, audio_bytes: bytes, filename: str) -> Tuple[bytes, str]:
+        if not settings.AUDIO_PREPROCESS_ENABLED or not audio.audio_available():
+            return audio_bytes, filename
+
+        loop = asyncio.get_running_loop()
+        try:
+            with track_stage("preprocess"):
+                result = await loop.run_in_executor(
+                    self._executor(), preprocess_audio, audio_bytes, settings.AUDIO_PREPROCESS_CODEC
+                )
+        except Exception as e:
+            logger.warning(f"Audio preprocessing skipped: {e}")
+            return audio_bytes, filename
+
+        saved = result["original_bytes"] - result["processed_bytes"]
+        trimmed = result["original_seconds"] - result["processed_seconds"]
+        self.runs += 1
+        self.total_ms += result["elapsed_ms"]
+
+        if saved <= 0 and trimmed < 1.0:
+            # Re-encoding made it bigger without trimming anything worth billing for
+            logger.info(f"🎚️ Preprocessing kept original ({result['elapsed_ms']:.0f}ms)")
+            return audio_bytes, filename
+
+        self.bytes_saved += saved
+        self.seconds_trimmed += trimmed
+        logger.info(
+            f"🎚️ Preprocessed audio: {result['original_bytes'] / 1024:.0f}KB → "
+            f"{result['processed_bytes'] / 1024:.0f}KB, trimmed {trimmed:.1f}s "
+            f"in {result['elapsed_ms']:.0f}ms"
+        )
+        return result["audio"], f"recording{result['extension']}"
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.AUDIO_PREPROCESS_ENABLED and audio.audio_available(),
+            "runs": self.runs,
+            "bytes_saved": self.bytes_saved,
+            "seconds_trimmed": round(self.seconds_trimmed, 2),
+            "total_ms": round(self.total_ms, 1)
+        }
+
+audio_preprocessor = AudioPreprocessor()
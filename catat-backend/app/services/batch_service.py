@@ -0,0 +1,99 @@
+from app.config import settings
+from app.models.letter import Language, LetterType, ContactOverrides, BatchItemResult
+from app.services.whisper_service import get_whisper_service
+from app.services.groq_service import get_groq_service
+from app.services.claude_service import get_claude_service
+from app.services.letter_pipeline import merge_contact_info, build_response, save_session
+from app.services.model_router import latency_budget
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BatchService:
+    """
+    Fans batch items out across the three providers.
+    Each provider has its own semaphore, so throughput is bounded by
+    provider quotas rather than by running items one after another.
+    """
+
+    def __init__(self):
+        self.whisper_slots = asyncio.Semaphore(settings.BATCH_WHISPER_CONCURRENCY)
+        self.llm_slots = asyncio.Semaphore(settings.BATCH_LLM_CONCURRENCY)
+        self.claude_slots = asyncio.Semaphore(settings.BATCH_CLAUDE_CONCURRENCY)
+
+    @asynccontextmanager
+    async def _stage(self, slots: asyncio.Semaphore, budget_seconds: Optional[float], models: dict):
+        """
+        Hold a provider slot and run one stage under its own latency budget.
+        Items can queue behind the semaphores for a long time, so the budget
+        only starts once the slot is held.
+        """
+        async with slots:
+            with latency_budget(budget_seconds) as stage_models:
+                yield
+            models.update(stage_models)
+
+    async def _run_item(
+        self,
+        index: int,
+        audio_bytes: bytes,
+        filename: str,
+        language: Language,
+        letter_type: LetterType,
+        overrides: ContactOverrides,
+        budget_seconds: Optional[float] = None
+    ) -> BatchItemResult:
+        models = {}
+        try:
+            async with self._stage(self.whisper_slots, budget_seconds, models):
+                transcript = await get_whisper_service().transcribe_audio(
+                    audio_bytes=audio_bytes,
+                    language=language.value,
+                    filename=filename
+                )
+            
+            async with self._stage(self.llm_slots, budget_seconds, models):
+                structured_data = await get_groq_service().structure_letter(transcript, letter_type.value, overrides)
+            structured_data = merge_contact_info(structured_data, overrides)
+            
+            async with self._stage(self.claude_slots, budget_seconds, models):
+                letter = await get_claude_service().generate_letter(structured_data, language, letter_type)
+            
+            return BatchItemResult(
+                index=index,
+                filename=filename,
+                success=True,
+                result=await save_session(build_response(transcript, structured_data, letter, language, letter_type, models))
+            )
+        
+        except HTTPException as e:
+            return BatchItemResult(index=index, filename=filename, success=False, status_code=e.status_code, error=str(e.detail))
+        except Exception as e:
+            logger.error(f"❌ Batch item {index} failed: {str(e)}", exc_info=True)
+            return BatchItemResult(index=index, filename=filename, success=False, status_code=500, error=str(e))
+
+    async def run(
+        self,
+        items: List[Tuple[bytes, str, ContactOverrides]],
+        language: Language,
+        letter_type: LetterType,
+        budget_seconds: Optional[float] = None
+    ) -> AsyncIterator[BatchItemResult]:
+        """Yield each item's result as soon as it finishes, in completion order"""
+        tasks = [
+            asyncio.create_task(self._run_item(i, audio_bytes, filename, language, letter_type, overrides, budget_seconds))
+            for i, (audio_bytes, filename, overrides) in enumerate(items)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away or the consumer stopped early
+            for task in tasks:
+                task.cancel()
+
+batch_service = BatchService()
@@ -1,41 +1,29 @@
-import anthropic
 from app.config import settings
+from app.services.provider_clients import provider_clients
+from app.services.adaptive_limiter import claude_limiter
+from app.services.model_router import ModelRouter, record_model
+from app.services.letter_template import render_header, render_closing, assemble_letter
+from app.services.letter_sanitizer import LetterSanitizer, sanitize_letter_body
+from app.services.telemetry import timed_stage, track_call, record_tokens, LETTER_REPAIRS
 from app.models.letter import StructuredData, Language, LetterType
 from fastapi import HTTPException
+from functools import lru_cache
 import logging
 import json
-import re
+from collections import Counter
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-class ClaudeService:
-    def __init__(self):
-        self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        self.model = "claude-sonnet-4-20250514"
-    
-    def _build_system_prompt(self) -> str:
-        return """You are an expert Malaysian letter writer.
+SYSTEM_PROMPT = """You are an expert Malaysian letter writer.
 
-Generate letters using MARKDOWN-STYLE FORMATTING following Malaysian formal letter schema.
-Use minimal HTML tags ONLY for structure and alignment.
+You write the SUBJECT LINE and BODY PARAGRAPHS of Malaysian formal letters.
+The sender block, recipient block, date, salutation and closing are added
+around your text automatically, so never write them yourself.
 
-MALAYSIAN FORMAL LETTER STRUCTURE:
+Use minimal HTML: one <p> tag per paragraph, nothing else.
 
 ENGLISH FORMAT:
-<p>[Sender Name]</p>
-<p>[Sender Address]</p>
-<p>[Sender Phone/Email]</p>
-
-<hr>
-
-<p>[Recipient Name]</p>
-<p>[Recipient Title]</p>
-<p>[Recipient Organization]</p>
-<p>[Recipient Address]</p>
-<p>DD MONTH YYYY</p>
-
-<p>Dear Sir/Madam,</p>
-
 <p>Subject: [Subject Line]</p>
 
 <p>[Opening paragraph with formal introduction]</p>
@@ -46,24 +34,7 @@ ENGLISH FORMAT:
 
 <p>[Closing paragraph with call to action or thanks]</p>
 
-<p>Yours faithfully,</p>
-<p>[Sender Name]</p>
-
 MALAY FORMAT:
-<p>[Nama Pengirim]</p>
-<p>[Alamat Pengirim]</p>
-<p>[Telefon/Email]</p>
-
-<hr>
-
-<p>[Nama Penerima]</p>
-<p>[Jawatan Penerima]</p>
-<p>[Organisasi]</p>
-<p>[Alamat Penerima]</p>
-<p>DD BULAN YYYY</p>
-
-<p>Tuan/Puan,</p>
-
 <p>Perkara: [Tajuk Surat]</p>
 
 <p>Dengan segala hormatnya, [opening paragraph]</p>
@@ -72,83 +43,376 @@ MALAY FORMAT:
 
 <p>[Isi kandungan perenggan 2]</p>
 
-<p>Sekian, terima kasih.</p>
-
-<p>Yang benar,</p>
-<p>[Nama Pengirim]</p>
-
 CRITICAL FORMATTING RULES:
-1. **Sender info**: Each line in separate <p> tag (name, address, contact)
-2. **Horizontal line**: <hr> placed after sender section
-3. **Recipient info**: Each line in separate <p> tag (name, title, organization, address)
-4. **Date**: Separate <p> tag after recipient address, format "DD MONTH YYYY" in CAPITAL LETTERS (e.g., "6 DECEMBER 2025")
-5. **Subject**: Plain text with "Subject:" or "Perkara:" prefix in separate <p> tag (no bold formatting)
-6. **Body**: Each paragraph in separate <p> tag
-7. **Closing**: Closing phrase in one <p> tag, sender name in another <p> tag
-
-DATE FORMAT EXAMPLES:
+1. **Subject**: First paragraph, plain text with "Subject:" or "Perkara:" prefix (no bold formatting)
+2. **Body**: Each paragraph in separate <p> tag
+3. **Do NOT write**: sender or recipient details, <hr>, the date, "Dear Sir/Madam" / "Tuan/Puan",
+   "Yours faithfully" / "Sekian, terima kasih" / "Yang benar", or the sender's name as a signature
+
+DATE FORMAT (only for dates mentioned inside the body):
 - English: "6 DECEMBER 2025" (CAPITAL LETTERS, full month name, no leading zero)
 - Malay: "6 DISEMBER 2025" (HURUF BESAR, bulan penuh, tanpa sifar di hadapan)
 
+SUBJECT LINE:
+- One line, at most about twelve words, naming the matter and where or when it applies
+- Written in capital letters in Malay letters ("Perkara: ADUAN LAMPU JALAN ROSAK DI TAMAN MELATI")
+  and in title case in English letters ("Subject: Complaint on Faulty Street Lights at Taman Melati")
+- No full stop at the end
+
+FACTS:
+- Use only the facts in the structured data and key points; never invent names, dates, amounts,
+  reference numbers, clinic names or diagnoses
+- When a useful fact is missing, write the sentence so it reads naturally without it;
+  never leave placeholders such as [DATE] or [NAME] in the body
+- Keep every date, amount, address and reference number exactly as given
+- Each key point appears in the body, in a sensible order, without repeating itself
+
+LETTER TYPES:
+- complaint (aduan): state the problem, where it is and since when; describe its effect on the
+  sender or the public; mention any earlier reports and their reference numbers; end with the
+  specific action requested and, when urgency allows, a reasonable timeframe. Firm, never rude.
+- proposal (cadangan): open with the purpose of the proposal; explain the background or need;
+  describe what is proposed, who is involved, the timeline and any costs given; state the benefit
+  to the recipient; end by asking for approval, a meeting or feedback.
+- mc (cuti sakit): inform the recipient of the medical leave and its dates; mention the medical
+  certificate only if the data says one was issued; describe any handover of urgent work and how
+  the sender can be reached. Keep it short: two or three body paragraphs. Never state a diagnosis
+  unless the sender gave one.
+- official (rasmi): for applications, confirmations and requests to government agencies,
+  councils, schools and employers; state the request plainly in the opening paragraph, list the
+  supporting details or documents given, and close with the action expected.
+- general (am): follow the purpose in the data (thanks, notification, enquiry or request);
+  opening paragraph with the purpose, body with the details, closing paragraph with the
+  expected reply or thanks.
+
+URGENCY:
+- high: put the requested action and its deadline in the opening paragraph; "immediate action"
+  or "tindakan segera" is appropriate
+- medium: state the request in the closing paragraph with a reasonable timeframe
+- low: a courteous request without any deadline
+
 TONE CONVERSION:
 - Casual → Formal and professional
+- Rewrite Manglish, slang, particles (lah, kan, meh, lor) and abbreviations in full formal language
 - "Boss I MC lah" → "I am writing to formally inform you that I require medical leave"
+- "Boss saya MC hari ni" → "Dengan segala hormatnya, saya ingin memaklumkan bahawa saya
+  tidak dapat hadir bertugas hari ini kerana cuti sakit"
+- "The longkang near my house clogged already, smell very bad" → "The drain near my residence
+  has been blocked, causing a strong and persistent odour"
+- "Jalan depan rumah banyak lubang, dah report tapi takde orang datang" → "Jalan di hadapan
+  kediaman saya mempunyai banyak lubang. Aduan telah dibuat sebelum ini, namun tiada tindakan
+  diambil setakat ini"
+- A formal input keeps its wording where it is already correct
 
-Use [SENDER_NAME], [DATE] if info missing.
+ENGLISH REGISTER:
+- Malaysian English follows British spelling: organisation, programme, centre, favourable
+- Refer to the recipient's organisation as "your office", "your department" or "the council";
+  the sender writes as "I"
+- Useful phrases: "I am writing to", "I would like to bring to your attention",
+  "I would be grateful if", "Thank you for your attention to this matter"
 
-Output ONLY the formatted HTML letter, no additional text or explanations."""
+MALAY REGISTER:
+- Address the recipient as "pihak tuan/puan"; the sender writes as "saya"; never "awak" or "anda"
+- Useful phrases: "Dengan segala hormatnya", "Untuk makluman pihak tuan/puan",
+  "Sehubungan dengan itu", "Besarlah harapan saya agar", "Kerjasama dan perhatian pihak
+  tuan/puan amatlah dihargai"
+- Standard Malay spelling (Dewan Bahasa dan Pustaka); English terms only where no common
+  Malay word exists
 
-    async def generate_letter(
+EXAMPLE (English complaint, high urgency):
+<p>Subject: Complaint on Faulty Street Lights at Jalan Melati 3, Taman Melati</p>
+
+<p>I am writing to bring to your attention that four street lights along Jalan Melati 3 have not
+been working since 2 JUNE 2025, leaving the road in complete darkness at night.</p>
+
+<p>The affected stretch is used by residents walking home from the bus stop, and two attempted
+break-ins have been reported in the area since the lights failed. I reported the matter through
+the council hotline on 5 JUNE 2025 under reference number MBSA-12345, but no repairs have been
+carried out.</p>
+
+<p>I would be grateful if your department could arrange for the lights to be repaired within the
+next seven days. Thank you for your attention to this matter.</p>
+
+EXAMPLE (Malay medical leave):
+<p>Perkara: PERMOHONAN CUTI SAKIT PADA 14 OGOS 2025</p>
+
+<p>Dengan segala hormatnya, saya ingin memaklumkan bahawa saya tidak dapat hadir bertugas pada
+14 OGOS 2025 kerana cuti sakit. Sijil cuti sakit daripada klinik akan dikemukakan sebaik sahaja
+saya kembali bertugas.</p>
+
+<p>Sepanjang ketiadaan saya, tugasan yang mendesak telah diserahkan kepada rakan sekerja saya.
+Saya juga boleh dihubungi melalui telefon sekiranya terdapat perkara yang memerlukan perhatian
+segera.</p>
+
+<p>Kerjasama dan pertimbangan pihak tuan/puan amatlah dihargai.</p>
+
+Output ONLY the subject and body paragraphs, no additional text or explanations."""
+
+
+FORMATTING_RULES = """Write the subject and body of a professional {letter_type} letter in {language_name}.
+
+CRITICAL FORMATTING REQUIREMENTS:
+1. Start with the subject paragraph: "Subject: [text]" or "Perkara: [text]" (no bold formatting)
+2. Then the body: each paragraph in separate <p> tag
+3. Stop after the last body paragraph; the header and closing are added for you
+4. Natural, professional tone throughout
+
+The structured data and key points for the letter follow in the user message."""
+
+REVISION_PROMPT = """Current subject and body:
+{previous_body}
+
+Revise them: {instructions}
+Keep the facts above unless the instructions change them, and output the complete revised subject and body."""
+
+DEFAULT_REVISION = "rewrite them to match the language and letter type required above, keeping the content."
+
+PARAGRAPH_PROMPT = """Current subject and body, paragraphs numbered from 0 (0 is the subject line):
+{numbered}
+
+Rewrite ONLY paragraph {index}: {instructions}
+Output just that paragraph as a single <p> tag{subject_note}. Do not repeat any other paragraph."""
+
+class ClaudeService:
+    def __init__(self):
+        self.model = settings.CLAUDE_MODEL
+        self.router = ModelRouter("generate", self.model, settings.CLAUDE_FALLBACK_MODEL, claude_limiter)
+        # Paragraph rewrites are far shorter than letters; their own window keeps both hedge points honest
+        self.paragraph_router = ModelRouter("revise", self.model, settings.CLAUDE_FALLBACK_MODEL, claude_limiter)
+        self._system_prompts: Dict[Tuple[Language, LetterType], List[dict]] = {}
+    
+    @property
+    def client(self):
+        return provider_clients.anthropic
+    
+    def _build_system_prompt(self, language: Language, letter_type: LetterType) -> List[dict]:
+        """
+        System blocks for one language and letter type, built once and reused.
+        Only the first block is marked for Anthropic prompt caching: it is the same
+        for every request and long enough to pass Sonnet's 1024-token minimum
+        (the Haiku fallback needs 2048, so it runs uncached). The short per-language,
+        per-type rules follow the cached prefix.
+        """
+        key = (language, letter_type)
+        blocks = self._system_prompts.get(key)
+        if blocks is None:
+            rules = FORMATTING_RULES.format(
+                letter_type=letter_type.value,
+                language_name=self._get_language_name(language)
+            )
+            blocks = [
+                {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": rules}
+            ]
+            self._system_prompts[key] = blocks
+        return blocks
+
+    def _build_user_prompt(
         self,
         structured_data: StructuredData,
         language: Language,
-        letter_type: LetterType
+        letter_type: LetterType,
+        instructions: Optional[str] = None,
+        previous_body: Optional[str] = None
     ) -> str:
-        """Generate professional letter"""
-        
+        # Only the per-request data goes here; the static rules sit in the cached system prefix
         data_json = json.dumps(structured_data.dict(), indent=2)
         
-        user_prompt = f"""Generate a professional {letter_type} letter in {self._get_language_name(language)}.
-
-Structured Data:
+        prompt = f"""Structured Data:
 {data_json}
 
 Key Points:
 {self._format_key_points(structured_data.key_points)}
 
-CRITICAL FORMATTING REQUIREMENTS:
-1. Follow Malaysian formal letter schema exactly as shown in system prompt
-2. Sender info: each line in separate <p> tag (name, address, contact)
-3. Horizontal line <hr> after sender section
-4. Recipient info: each line in separate <p> tag (name, title, organization, address)
-5. Date: separate <p> tag after recipient address, in CAPITAL LETTERS "DD MONTH YYYY" (e.g., "6 DECEMBER 2025")
-6. Subject: plain text "Subject: [text]" or "Perkara: [text]" in separate <p> tag (no bold formatting)
-7. Body: each paragraph in separate <p> tag
-8. Closing: closing phrase in one <p> tag, sender name in another <p> tag
-9. Natural, professional tone throughout
-
-Generate the complete formatted letter now."""
+"""
+        if previous_body is not None:
+            return prompt + REVISION_PROMPT.format(
+                previous_body=previous_body,
+                instructions=instructions or DEFAULT_REVISION
+            )
+        return prompt + "Write the subject line and body paragraphs now."
 
+    def _request_params(
+        self,
+        model: str,
+        structured_data: StructuredData,
+        language: Language,
+        letter_type: LetterType,
+        instructions: Optional[str] = None,
+        previous_body: Optional[str] = None
+    ) -> dict:
+        prompt = self._build_user_prompt(structured_data, language, letter_type, instructions, previous_body)
+        return dict(
+            model=model,
+            max_tokens=1500,
+            temperature=0.3,
+            system=self._build_system_prompt(language, letter_type),
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+    @timed_stage("generate")
+    async def generate_letter(
+        self,
+        structured_data: StructuredData,
+        language: Language,
+        letter_type: LetterType,
+        instructions: Optional[str] = None,
+        previous_body: Optional[str] = None
+    ) -> str:
+        """
+        Generate professional letter: Claude writes the subject and body, the rest is rendered locally.
+        With previous_body, Claude revises that subject and body following the instructions instead.
+        """
+        
         try:
             logger.info(f"🧠 Generating letter with Claude")
             
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=3000,
-                temperature=0.3,
-                system=self._build_system_prompt(),
-                messages=[{"role": "user", "content": user_prompt}]
-            )
+            async def call(model: str):
+                with track_call("generate", "anthropic", model):
+                    return await self.client.messages.create(
+                        **self._request_params(
+                            model, structured_data, language, letter_type, instructions, previous_body
+                        )
+                    )
             
-            letter = message.content[0].text
-            letter = self._normalize_layout(letter)
+            message, model = await self.router.run(call)
+            self._record_usage(model, getattr(message, "usage", None))
+            record_model("generate", model)
+            
+            body, issues = sanitize_letter_body(
+                message.content[0].text, language, structured_data.sender.name
+            )
+            self._record_issues(issues)
+            letter = assemble_letter(structured_data, language, body)
             logger.info(f"✅ Letter generated: {len(letter)} characters")
             return letter
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"❌ Generation failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Letter generation failed: {str(e)}")
     
+    @timed_stage("revise")
+    async def rewrite_paragraph(
+        self,
+        structured_data: StructuredData,
+        language: Language,
+        letter_type: LetterType,
+        paragraphs: List[str],
+        index: int,
+        instructions: str
+    ) -> str:
+        """
+        Rewrite one paragraph of the subject and body, the others given as context.
+        Returns the sanitized replacement (normally one <p>, more if Claude split it).
+        """
+        
+        try:
+            logger.info(f"✏️ Rewriting paragraph {index} with Claude")
+            prompt = PARAGRAPH_PROMPT.format(
+                numbered="\n".join(f"[{i}] {paragraph}" for i, paragraph in enumerate(paragraphs)),
+                index=index,
+                instructions=instructions,
+                subject_note=' keeping the "Subject:" or "Perkara:" prefix' if index == 0 else ""
+            )
+            
+            async def call(model: str):
+                with track_call("revise", "anthropic", model):
+                    return await self.client.messages.create(
+                        model=model,
+                        max_tokens=600,
+                        temperature=0.3,
+                        system=self._build_system_prompt(language, letter_type),
+                        messages=[{"role": "user", "content": prompt}]
+                    )
+            
+            message, model = await self.paragraph_router.run(call)
+            self._record_usage(model, getattr(message, "usage", None))
+            record_model("revise", model)
+            
+            paragraph, issues = sanitize_letter_body(
+                message.content[0].text, language, structured_data.sender.name, subject_first=index == 0
+            )
+            self._record_issues(issues)
+            if not paragraph:
+                raise HTTPException(status_code=502, detail="Paragraph rewrite came back empty")
+            return paragraph
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Paragraph rewrite failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Paragraph rewrite failed: {str(e)}")
+    
+    async def stream_letter(
+        self,
+        structured_data: StructuredData,
+        language: Language,
+        letter_type: LetterType
+    ) -> AsyncIterator[str]:
+        """
+        Stream the letter HTML: the locally rendered header goes out first,
+        then Claude's subject and body as it writes them, then the closing.
+        The joined chunks are the complete letter.
+        """
+        try:
+            logger.info(f"🧠 Streaming letter with Claude")
+            yield render_header(structured_data, language)
+            
+            # Once tokens are on the wire a stream can't be retried or hedged;
+            # before the first token a failed primary falls back to the next model
+            models = list(dict.fromkeys(m for m in (self.model, settings.CLAUDE_FALLBACK_MODEL) if m))
+            sanitizer = LetterSanitizer(language, structured_data.sender.name)
+            for attempt, model in enumerate(models):
+                started = False
+                try:
+                    async with claude_limiter.slot():
+                        with track_call("generate_stream", "anthropic", model):
+                            async with self.client.messages.stream(
+                                **self._request_params(model, structured_data, language, letter_type)
+                            ) as stream:
+                                async for text in stream.text_stream:
+                                    if not started:
+                                        started = True
+                                        record_model("generate", model)
+                                    clean = sanitizer.feed(text)
+                                    if clean:
+                                        yield clean
+                                message = await stream.get_final_message()
+                    self._record_usage(model, getattr(message, "usage", None))
+                    tail = sanitizer.close()
+                    self._record_issues(sanitizer.issues)
+                    yield tail + render_closing(structured_data, language)
+                    return
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    if started or attempt == len(models) - 1:
+                        raise
+                    logger.warning(f"🪂 Stream on {model} failed before first token ({e}), falling back")
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Streaming generation failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Letter generation failed: {str(e)}")
+    
+    def _record_usage(self, model: str, usage):
+        record_tokens("anthropic", model, usage)
+        if usage is not None:
+            logger.info(
+                f"📦 Prompt cache: {getattr(usage, 'cache_read_input_tokens', 0) or 0} read, "
+                f"{getattr(usage, 'cache_creation_input_tokens', 0) or 0} written, "
+                f"{usage.input_tokens} uncached input tokens"
+            )
+    
+    def _record_issues(self, issues: Counter):
+        for issue, count in issues.items():
+            LETTER_REPAIRS.inc(count, issue=issue)
+        if issues:
+            logger.warning(f"🩹 Letter output repaired/flagged: {dict(issues)}")
+    
     def _get_language_name(self, language: Language) -> str:
         mapping = {
             Language.ENGLISH: "English",
@@ -160,23 +424,7 @@ Generate the complete formatted letter now."""
     def _format_key_points(self, points: list) -> str:
         return "\n".join(f"- {point}" for point in points)
 
-    def _normalize_layout(self, html: str) -> str:
-        """
-        Ensure Malaysian letter layout has proper structure with <hr> separator.
-        Letters should already have correct format from Claude, this just validates structure.
-        """
-        try:
-            # Check if <hr> exists
-            if '<hr>' not in html.lower():
-                # Try to add <hr> after first paragraph (sender section)
-                blocks = re.findall(r"<p[^>]*>.*?</p>", html, flags=re.IGNORECASE | re.DOTALL)
-                if len(blocks) >= 2:
-                    # Insert <hr> after first paragraph
-                    html = html.replace(blocks[0], blocks[0] + '\n\n<hr>\n\n', 1)
-
-            return html
-        except Exception as exc:
-            logger.warning(f"Layout normalization skipped: {exc}")
-            return html
-
-claude_service = ClaudeService()
\ No newline at end of file
+# Built on first use (the app lifespan does that at startup); routers take it via Depends
+@lru_cache()
+def get_claude_service() -> ClaudeService:
+    return ClaudeService()
\ No newline at end of file
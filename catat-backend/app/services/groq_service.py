@@ -1,31 +1,83 @@
 import json
-from groq import Groq
 from app.config import settings
-from app.models.letter import StructuredData, ContactInfo
+from app.services.provider_clients import provider_clients
+from app.services.adaptive_limiter import groq_limiter
+from app.services.model_router import ModelRouter, record_model
+from app.services.local_extractor import local_extractor
+from app.services.telemetry import timed_stage, track_call, record_tokens, STRUCTURE_PATH, STRUCTURE_OUTCOMES
+from app.models.letter import StructuredData, ContactOverrides, LetterType, ToneDetected, Language, UrgencyLevel
+from app.services.shared_state import TieredCache, shared_state
 from fastapi import HTTPException
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Lenient spellings the model uses for enum values, mapped onto the real ones
+ENUM_SYNONYMS = {
+    "letter_type": {
+        "aduan": "complaint", "complain": "complaint", "cadangan": "proposal", "medical": "mc",
+        "medical leave": "mc", "medical certificate": "mc", "sick leave": "mc", "cuti sakit": "mc",
+        "rasmi": "official", "formal": "official", "am": "general", "other": "general"
+    },
+    "tone_detected": {
+        "informal": "casual", "neutral": "casual", "colloquial": "casual", "rojak": "manglish",
+        "professional": "formal", "polite": "formal"
+    },
+    "language_preference": {
+        "english": "en", "eng": "en", "malay": "ms", "bahasa": "ms", "bahasa malaysia": "ms",
+        "bahasa melayu": "ms", "bm": "ms", "my": "ms", "manglish": "mixed", "mix": "mixed", "rojak": "mixed"
+    },
+    "urgency_level": {
+        "urgent": "high", "critical": "high", "tinggi": "high", "normal": "medium",
+        "moderate": "medium", "sederhana": "medium", "rendah": "low", "none": "low"
+    }
+}
+ENUM_DEFAULTS = {
+    "tone_detected": (ToneDetected, "casual"),
+    "language_preference": (Language, "en"),
+    "urgency_level": (UrgencyLevel, "low")
+}
+
 class GroqService:
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-        # Updated to use currently supported model
         # Options: llama-3.3-70b-versatile, llama-3.1-70b-versatile, llama-3.1-8b-instant
-        self.model = "llama-3.3-70b-versatile"
+        self.model = settings.GROQ_MODEL
+        self.router = ModelRouter("structure", self.model, settings.GROQ_FALLBACK_MODEL, groq_limiter)
+        self.system_prompt = self._build_system_prompt()
+        # Editing the system prompt (or the schema in it) changes the version and retires old cache entries
+        self.prompt_version = hashlib.sha256(self.system_prompt.encode()).hexdigest()[:12]
+        self.cache = TieredCache(
+            "structure",
+            max_size=settings.STRUCTURE_CACHE_SIZE,
+            ttl_seconds=settings.STRUCTURE_CACHE_TTL_SECONDS,
+            store=shared_state,
+            encode=lambda structured: structured.model_dump_json().encode("utf-8"),
+            decode=StructuredData.model_validate_json
+        )
+    
+    @property
+    def client(self):
+        return provider_clients.groq
     
     def _build_system_prompt(self) -> str:
+        schema = json.dumps(StructuredData.model_json_schema(), separators=(",", ":"))
         return """You are a Malaysian document analyzer. Extract structured data from speech transcripts.
 
-Output ONLY valid JSON:
+Output ONLY a JSON object matching this JSON Schema:
+""" + schema + """
+
+Example:
 {
-  "letter_type": "complaint|proposal|mc|general",
+  "letter_type": "complaint|proposal|mc|general|official",
   "sender": {"name": "", "address": "", "contact": ""},
   "recipient": {"name": "", "title": "", "organization": "", "address": ""},
   "subject": "",
   "key_points": ["point1", "point2"],
   "tone_detected": "casual|manglish|formal",
-  "language_preference": "en|ms",
+  "language_preference": "en|ms|mixed",
   "dates_mentioned": [],
   "urgency_level": "low|medium|high"
 }
@@ -36,62 +88,175 @@ MALAYSIAN CONTEXT:
 
 MANGLISH: Look for "lah", "ah", "can or not"
 
-If info missing, leave empty string."""
+If info missing, leave empty string. Use only the enum values listed in the schema."""
+
+    def _cache_key(self, transcript: str, letter_type: str) -> str:
+        normalized = hashlib.sha256(" ".join(transcript.split()).encode("utf-8")).hexdigest()
+        return f"{self.model}:{self.prompt_version}:{letter_type}:{normalized}"
 
-    async def structure_letter(self, transcript: str, letter_type: str) -> StructuredData:
-        """Extract structured data from transcript"""
+    @timed_stage("structure")
+    async def structure_letter(
+        self,
+        transcript: str,
+        letter_type: str,
+        overrides: Optional[ContactOverrides] = None
+    ) -> StructuredData:
+        """
+        Extract structured data from transcript
+        Results are memoized per transcript/letter type; callers always get their own copy.
+        When the form overrides already cover the contact details, a local rule-based
+        extractor fills in the rest and the LLM call is skipped.
+        """
+        
+        if settings.STRUCTURE_FAST_PATH_ENABLED and overrides is not None:
+            local = local_extractor.extract(transcript, letter_type)
+            if local_extractor.covers_contacts(local, overrides):
+                logger.info("⚡ Structuring fast path: contacts come from the form, skipping LLM")
+                STRUCTURE_PATH.inc(path="local")
+                record_model("structure", "local")
+                return local
+        
+        cache_key = self._cache_key(transcript, letter_type)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            logger.info("⚡ Structuring cache hit")
+            STRUCTURE_PATH.inc(path="cache")
+            record_model("structure", self.model)
+            return cached.model_copy(deep=True)
         
         user_prompt = f"""Letter Type: {letter_type}
 
 Transcript: {transcript}
 
 Extract structured data in JSON format."""
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
 
         try:
             logger.info(f"⚙️ Structuring with Groq {self.model}")
+            STRUCTURE_PATH.inc(path="llm")
             
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._build_system_prompt()},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=2000
-            )
-            
-            response_text = completion.choices[0].message.content
-            
-            # Clean JSON
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0]
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0]
-            
-            response_text = response_text.strip()
-            
+            response_text, model = await self._complete(messages)
             try:
-                data = json.loads(response_text)
-                structured = StructuredData(**data)
-                logger.info("✅ Structuring successful")
-                return structured
-                
-            except json.JSONDecodeError:
-                logger.warning("⚠️ JSON parsing failed, using fallback")
-                return StructuredData(
-                    letter_type=letter_type,
-                    sender=ContactInfo(),
-                    recipient=ContactInfo(),
-                    subject="Letter content",
-                    key_points=[transcript[:200]],
-                    tone_detected="casual",
-                    language_preference="en",
-                    dates_mentioned=[],
-                    urgency_level="low"
-                )
+                structured, coerced = self._parse(response_text, letter_type)
+                outcome = "coerced" if coerced else "valid"
+            except ValueError as e:
+                # One bounded repair round: show the model its output and the error
+                logger.warning(f"⚠️ Structured output invalid, asking for a repair: {e}")
+                messages += [
+                    {"role": "assistant", "content": response_text},
+                    {"role": "user", "content": f"That JSON was invalid: {str(e)[:500]}\nReturn the corrected JSON object only."}
+                ]
+                try:
+                    response_text, model = await self._complete(messages)
+                    structured, _ = self._parse(response_text, letter_type)
+                    outcome = "repaired"
+                except ValueError as e:
+                    logger.warning(f"⚠️ Repair failed, using local extraction: {e}")
+                    STRUCTURE_OUTCOMES.inc(outcome="fallback")
+                    record_model("structure", "local")
+                    return local_extractor.extract(transcript, letter_type)
+            
+            STRUCTURE_OUTCOMES.inc(outcome=outcome)
+            record_model("structure", model)
+            logger.info(f"✅ Structuring successful ({outcome})")
+            # Fallback answers aren't cached so the next request gets the primary model again
+            if model == self.model:
+                await self.cache.set(cache_key, structured.model_copy(deep=True))
+            return structured
                 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"❌ Structuring failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Structuring failed: {str(e)}")
 
-groq_service = GroqService()
\ No newline at end of file
+    async def _complete(self, messages: List[dict]) -> Tuple[str, str]:
+        """JSON-mode completion through the model router; returns the text and serving model"""
+        async def call(model: str):
+            with track_call("structure", "groq", model):
+                return await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=0.1,
+                    max_tokens=2000,
+                    response_format={"type": "json_object"}
+                )
+        
+        completion, model = await self.router.run(call)
+        record_tokens("groq", model, getattr(completion, "usage", None))
+        return completion.choices[0].message.content or "", model
+
+    def _parse(self, response_text: str, letter_type: str) -> Tuple[StructuredData, bool]:
+        """
+        Validate model output against StructuredData after lenient coercion.
+        Raises ValueError (JSONDecodeError / ValidationError) when it can't be saved.
+        """
+        # JSON mode returns a bare object, but fallback models may still wrap it in prose or fences
+        start, end = response_text.find("{"), response_text.rfind("}")
+        if start < 0 or end < start:
+            raise ValueError("No JSON object in response")
+        data = json.loads(response_text[start:end + 1])
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        coerced = self._coerce(data, letter_type)
+        structured = StructuredData.model_validate(data)
+        if not structured.subject.strip() and not structured.key_points:
+            raise ValueError("subject and key_points are both empty")
+        return structured, coerced
+
+    def _coerce(self, data: dict, letter_type: str) -> bool:
+        """Fix near-miss values in place; returns True when anything was changed"""
+        changed = False
+
+        def set_field(key, value):
+            nonlocal changed
+            if data.get(key) != value:
+                data[key] = value
+                changed = True
+
+        for key in ("letter_type", "tone_detected", "language_preference", "urgency_level"):
+            value = data.get(key)
+            normalized = str(value).strip().lower() if value is not None else ""
+            normalized = ENUM_SYNONYMS[key].get(normalized, normalized)
+            if key == "letter_type":
+                # The caller already chose the letter type; the model only echoes it
+                valid = normalized in LetterType._value2member_map_
+                set_field(key, normalized if valid else letter_type)
+            else:
+                enum, default = ENUM_DEFAULTS[key]
+                set_field(key, normalized if normalized in enum._value2member_map_ else default)
+
+        for key in ("sender", "recipient"):
+            value = data.get(key)
+            if isinstance(value, str):
+                set_field(key, {"name": value})
+            elif not isinstance(value, dict):
+                set_field(key, {})
+            else:
+                for field, item in list(value.items()):
+                    if item is not None and not isinstance(item, str):
+                        value[field] = ", ".join(map(str, item)) if isinstance(item, list) else str(item)
+                        changed = True
+
+        for key in ("key_points", "dates_mentioned"):
+            value = data.get(key)
+            if value is None:
+                set_field(key, [])
+            elif isinstance(value, str):
+                set_field(key, [value] if value.strip() else [])
+            elif isinstance(value, list) and not all(isinstance(item, str) for item in value):
+                set_field(key, [str(item) for item in value if item is not None])
+
+        subject = data.get("subject")
+        if not isinstance(subject, str):
+            set_field("subject", "" if subject is None else str(subject))
+
+        return changed
+
+# Built on first use (the app lifespan does that at startup); routers take it via Depends
+@lru_cache()
+def get_groq_service() -> GroqService:
+    return GroqService()
\ No newline at end of file
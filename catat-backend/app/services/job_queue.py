@@ -0,0 +1,199 @@
+from app.config import settings
+from app.models.job import JobStatus, JobStage
+from app.models.letter import Language, LetterType, ContactOverrides, StructuredData
+from app.services.job_store import JobStore, job_store
+from app.services.whisper_service import get_whisper_service
+from app.services.groq_service import get_groq_service
+from app.services.claude_service import get_claude_service
+from app.services.letter_pipeline import merge_contact_info, build_response
+from app.services.letter_store import letter_store
+from app.services.model_router import latency_budget
+from fastapi import HTTPException
+from typing import List, Optional
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class LeaseLost(Exception):
+    """Another worker claimed the job after this one's lease ran out"""
+
+class JobQueue:
+    """
+    Bounded pool of in-process workers running transcribe → structure → generate.
+    Every stage result is written to the job store before the next stage starts,
+    so a restarted worker picks a job up from its last completed stage.
+    A job runs only after this process claims it in the store, so app processes
+    sharing the database never run the same job twice.
+    """
+
+    def __init__(self, store: JobStore):
+        self.store = store
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(settings.JOB_WORKERS)
+        ]
+
+        # Jobs left queued, or running under a lapsed lease, resume where they stopped.
+        # Other processes enqueue the same ids; the claim decides who runs each one.
+        unfinished = await self.store.unfinished()
+        for job_id in unfinished:
+            self._queue.put_nowait(job_id)
+        logger.info(f"🧵 Job queue started: {settings.JOB_WORKERS} workers, {len(unfinished)} resumed")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.store.close()
+        logger.info("🧵 Job queue stopped")
+
+    async def submit(
+        self,
+        audio_bytes: bytes,
+        filename: str,
+        language: Language,
+        letter_type: LetterType,
+        overrides: ContactOverrides
+    ) -> str:
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Job queue is not running.")
+        if self._queue.qsize() >= settings.JOB_QUEUE_SIZE:
+            raise HTTPException(status_code=503, detail="Job queue is full. Please retry shortly.")
+
+        job_id = uuid.uuid4().hex
+        await self.store.create(
+            id=job_id,
+            status=JobStatus.QUEUED.value,
+            stage=JobStage.TRANSCRIBE.value,
+            language=language.value,
+            letter_type=letter_type.value,
+            overrides=overrides.model_dump_json(),
+            filename=filename,
+            audio=audio_bytes
+        )
+        self._queue.put_nowait(job_id)
+        logger.info(f"📥 Job {job_id} queued ({self._queue.qsize()} waiting)")
+        return job_id
+
+    async def _worker(self, number: int):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                # Left as running with its lease released; the next start resumes it
+                raise
+            except Exception as e:
+                logger.error(f"❌ Job {job_id} crashed in worker {number}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _renew_lease(self, job_id: str, run: asyncio.Task):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                renewed = await self.store.renew(job_id, self.worker_id, settings.JOB_LEASE_SECONDS)
+            except Exception as e:
+                # The lease may still hold; try again next interval
+                logger.warning(f"⚠️ Renewing the lease on job {job_id} failed: {e}")
+                continue
+            if not renewed:
+                # Another worker owns the job now; stop paying for a run it will redo
+                logger.warning(f"⚠️ Lost the lease on job {job_id}, abandoning this run")
+                run.cancel()
+                return
+
+    async def _run(self, job_id: str):
+        # Finished jobs, and jobs another process holds, fail the claim
+        if not await self.store.claim(job_id, self.worker_id, settings.JOB_LEASE_SECONDS):
+            return
+        run = asyncio.create_task(self._run_claimed(job_id))
+        renewal = asyncio.create_task(self._renew_lease(job_id, run))
+        try:
+            # wait() rather than await: a run cancelled by _renew_lease mustn't look like shutdown
+            await asyncio.wait([run])
+        except asyncio.CancelledError:
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+            await asyncio.shield(self.store.release(job_id, self.worker_id))
+            raise
+        finally:
+            renewal.cancel()
+        if not run.cancelled():
+            run.result()
+
+    async def _update(self, job_id: str, **fields):
+        if not await self.store.update(job_id, self.worker_id, **fields):
+            raise LeaseLost(job_id)
+
+    async def _fail(self, job_id: str, error: str):
+        if not await self.store.update(job_id, self.worker_id, status=JobStatus.FAILED.value, error=error):
+            logger.warning(f"⚠️ Job {job_id} was claimed by another worker; left its status alone")
+
+    async def _run_claimed(self, job_id: str):
+        job = await self.store.get(job_id)
+        language = Language(job["language"])
+        letter_type = LetterType(job["letter_type"])
+
+        try:
+            with latency_budget() as models:
+                # Stages finished by a previous run keep the model that served them
+                models.update(json.loads(job["models"] or "{}"))
+
+                transcript = job["transcript"]
+                if transcript is None:
+                    transcript = await get_whisper_service().transcribe_audio(
+                        audio_bytes=await self.store.get_audio(job_id),
+                        language=language.value,
+                        filename=job["filename"]
+                    )
+                    # Audio is no longer needed once the transcript is safe
+                    await self._update(
+                        job_id, transcript=transcript, audio=None, stage=JobStage.STRUCTURE.value,
+                        models=json.dumps(models)
+                    )
+
+                if job["structured_data"] is None:
+                    overrides = ContactOverrides.model_validate_json(job["overrides"])
+                    structured_data = await get_groq_service().structure_letter(transcript, letter_type.value, overrides)
+                    structured_data = merge_contact_info(structured_data, overrides)
+                    await self._update(
+                        job_id,
+                        structured_data=structured_data.model_dump_json(),
+                        stage=JobStage.GENERATE.value,
+                        models=json.dumps(models)
+                    )
+                else:
+                    structured_data = StructuredData.model_validate_json(job["structured_data"])
+
+                letter = await get_claude_service().generate_letter(structured_data, language, letter_type)
+                await self._update(
+                    job_id, letter=letter, stage=JobStage.DONE.value, status=JobStatus.COMPLETED.value,
+                    models=json.dumps(models)
+                )
+            await letter_store.save(job_id, build_response(transcript, structured_data, letter, language, letter_type, models))
+            logger.info(f"✅ Job {job_id} completed")
+
+        except LeaseLost:
+            logger.warning(f"⚠️ Job {job_id} was claimed by another worker; dropped this run's results")
+        except HTTPException as e:
+            logger.error(f"❌ Job {job_id} failed: {e.detail}")
+            await self._fail(job_id, str(e.detail))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {str(e)}", exc_info=True)
+            await self._fail(job_id, str(e))
+
+job_queue = JobQueue(job_store)
@@ -0,0 +1,146 @@
+from app.config import settings
+from typing import List, Optional
+import asyncio
+import sqlite3
+import threading
+import time
+
+class JobStore:
+    """
+    SQLite record of every job and the output of each completed stage.
+    Calls run in a worker thread so the event loop never waits on disk.
+    Every app process shares the file, so a job runs only in the process that
+    claims it; the claim is a lease renewed while the job runs.
+    """
+
+    COLUMNS = (
+        "id", "status", "stage", "language", "letter_type", "overrides", "filename",
+        "audio", "transcript", "structured_data", "letter", "error", "models", "claimed_by", "lease_until", "created_at", "updated_at"
+    )
+    # Everything but the audio, which is only read by the worker that runs the job
+    SUMMARY_COLUMNS = ", ".join(name for name in COLUMNS if name != "audio")
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._db = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT NOT NULL, "
+                "language TEXT NOT NULL, letter_type TEXT NOT NULL, overrides TEXT NOT NULL, "
+                "filename TEXT NOT NULL, audio BLOB, transcript TEXT, structured_data TEXT, "
+                "letter TEXT, error TEXT, models TEXT, claimed_by TEXT, lease_until REAL, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            # Job databases created before serving models or claims were recorded
+            existing = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for name, kind in (("models", "TEXT"), ("claimed_by", "TEXT"), ("lease_until", "REAL")):
+                if name not in existing:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            self._db.commit()
+        return self._db
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            db = self._connect()
+            rows = db.execute(sql, params).fetchall()
+            db.commit()
+            return rows
+
+    def _modify(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            db = self._connect()
+            count = db.execute(sql, params).rowcount
+            db.commit()
+            return count
+
+    async def create(self, **fields):
+        now = time.time()
+        fields.update(created_at=now, updated_at=now)
+        names = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        await asyncio.to_thread(
+            self._execute, f"INSERT INTO jobs ({names}) VALUES ({placeholders})", tuple(fields.values())
+        )
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        rows = await asyncio.to_thread(
+            self._execute, f"SELECT {self.SUMMARY_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        )
+        return dict(rows[0]) if rows else None
+
+    async def get_audio(self, job_id: str) -> Optional[bytes]:
+        rows = await asyncio.to_thread(self._execute, "SELECT audio FROM jobs WHERE id = ?", (job_id,))
+        return rows[0]["audio"] if rows else None
+
+    async def claim(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """
+        Mark the job running for this worker. Only one claimant wins: the job
+        must still be queued, or running under a lease that has run out.
+        """
+        now = time.time()
+        count = await asyncio.to_thread(
+            self._modify,
+            "UPDATE jobs SET status = 'running', claimed_by = ?, lease_until = ?, updated_at = ? "
+            "WHERE id = ? AND (status = 'queued' OR "
+            "(status = 'running' AND (lease_until IS NULL OR lease_until < ?)))",
+            (worker_id, now + lease_seconds, now, job_id, now)
+        )
+        return count == 1
+
+    async def renew(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a held lease; False once another worker has taken the job over"""
+        # No status check: the job finishing under this worker mustn't read as a lost lease
+        count = await asyncio.to_thread(
+            self._modify,
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND claimed_by = ?",
+            (time.time() + lease_seconds, job_id, worker_id)
+        )
+        return count == 1
+
+    async def release(self, job_id: str, worker_id: str):
+        """Give up a running job so the next start can resume it without waiting out the lease"""
+        await asyncio.to_thread(
+            self._modify,
+            "UPDATE jobs SET lease_until = NULL WHERE id = ? AND claimed_by = ? AND status = 'running'",
+            (job_id, worker_id)
+        )
+
+    async def update(self, job_id: str, worker_id: str, **fields) -> bool:
+        """Write fields of a job this worker holds; False when another worker has claimed it since"""
+        unknown = set(fields) - set(self.COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {unknown}")
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        count = await asyncio.to_thread(
+            self._modify,
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND claimed_by = ?",
+            (*fields.values(), job_id, worker_id)
+        )
+        return count == 1
+
+    async def unfinished(self) -> List[str]:
+        """Queued jobs, and running ones whose worker stopped renewing its lease"""
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT id FROM jobs WHERE status = 'queued' OR "
+            "(status = 'running' AND (lease_until IS NULL OR lease_until < ?)) ORDER BY created_at",
+            (time.time(),)
+        )
+        return [row["id"] for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+job_store = JobStore(settings.JOB_DB_PATH)
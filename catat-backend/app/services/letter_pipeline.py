@@ -0,0 +1,69 @@
+from app.models.letter import (
+    GenerateLetterResponse, Language, LetterType, LetterMetadata,
+    ContactInfo, ContactOverrides, StructuredData, LetterSession
+)
+from app.services.letter_sessions import letter_sessions
+from app.services.letter_store import letter_store
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+def merge_contact_info(structured_data: StructuredData, overrides: ContactOverrides) -> StructuredData:
+    """User-provided info takes priority (overrides AI extraction)"""
+    if overrides.sender_name or overrides.sender_address or overrides.sender_contact:
+        structured_data.sender = ContactInfo(
+            name=overrides.sender_name or structured_data.sender.name,
+            address=overrides.sender_address or structured_data.sender.address,
+            contact=overrides.sender_contact or structured_data.sender.contact
+        )
+    
+    if (overrides.recipient_name or overrides.recipient_title
+            or overrides.recipient_organization or overrides.recipient_address):
+        structured_data.recipient = ContactInfo(
+            name=overrides.recipient_name or structured_data.recipient.name,
+            title=overrides.recipient_title or structured_data.recipient.title,
+            organization=overrides.recipient_organization or structured_data.recipient.organization,
+            address=overrides.recipient_address or structured_data.recipient.address
+        )
+    
+    logger.info(f"✅ Final sender: {structured_data.sender.name or '[Not provided]'}")
+    logger.info(f"✅ Final recipient: {structured_data.recipient.name or '[Not provided]'}")
+    return structured_data
+
+def build_response(
+    transcript: str,
+    structured_data: StructuredData,
+    letter: str,
+    language: Language,
+    letter_type: LetterType,
+    models: Optional[Dict[str, str]] = None
+) -> GenerateLetterResponse:
+    metadata = LetterMetadata(
+        language=language,
+        letter_type=letter_type,
+        tone_detected=structured_data.tone_detected,
+        urgency=structured_data.urgency_level,
+        models=models or {}
+    )
+    
+    return GenerateLetterResponse(
+        success=True,
+        transcript=transcript,
+        structured_data=structured_data,
+        letter=letter,
+        metadata=metadata
+    )
+
+
+async def save_session(response: GenerateLetterResponse) -> GenerateLetterResponse:
+    """Keep the generation server-side for revisions, queue it for the database and tag the response with its ids"""
+    response.generation_id = await letter_sessions.create(LetterSession(
+        transcript=response.transcript,
+        structured_data=response.structured_data,
+        letter=response.letter,
+        language=response.metadata.language,
+        letter_type=response.metadata.letter_type
+    ))
+    response.letter_id = await letter_store.save(response.generation_id, response)
+    return response
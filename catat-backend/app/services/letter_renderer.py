@@ -0,0 +1,81 @@
+from app.config import settings
+from app.utils import documents
+from app.utils.cache import TTLCache
+from app.services.telemetry import track_stage
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from typing import Optional, Tuple
+import asyncio
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+}
+
+class LetterRenderer:
+    """
+    Server-side PDF/DOCX export of letter HTML.
+    Renders run in a process pool (or the default thread pool when RENDER_WORKERS=0)
+    and the bytes are cached by a hash of the letter, format and template version.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.renders = 0
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self._pool is None and settings.RENDER_WORKERS > 0:
+            self._pool = ProcessPoolExecutor(max_workers=settings.RENDER_WORKERS)
+        return self._pool
+
+    @staticmethod
+    def key(letter: str, fmt: str, letter_type: str, language: str) -> str:
+        # Everything that changes the output bytes, so the key doubles as an ETag
+        content = "\0".join((documents.TEMPLATE_VERSION, fmt, letter_type, language, letter))
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    async def render(self, letter: str, fmt: str, letter_type: str, language: str) -> Tuple[bytes, str]:
+        """Rendered file bytes and their cache key (usable as an ETag)"""
+        if fmt == "pdf" and not documents.pdf_available():
+            raise HTTPException(status_code=501, detail="PDF rendering is not available on this server")
+
+        key = self.key(letter, fmt, letter_type, language)
+        rendered = self.cache.get(key)
+        if rendered is not None:
+            return rendered, key
+
+        loop = asyncio.get_running_loop()
+        try:
+            with track_stage("render"):
+                rendered = await loop.run_in_executor(
+                    self._executor(), documents.render_letter, letter, fmt, letter_type, language
+                )
+        except Exception as e:
+            logger.error(f"❌ {fmt.upper()} render failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+
+        self.renders += 1
+        self.cache.set(key, rendered)
+        logger.info(f"📄 Rendered {fmt.upper()} ({len(rendered) / 1024:.0f}KB)")
+        return rendered, key
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        stats["renders"] = self.renders
+        stats["pdf_available"] = documents.pdf_available()
+        return stats
+
+letter_renderer = LetterRenderer(
+    max_size=settings.RENDER_CACHE_SIZE,
+    ttl_seconds=settings.RENDER_CACHE_TTL_SECONDS
+)
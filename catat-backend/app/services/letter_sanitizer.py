@@ -0,0 +1,362 @@
+from app.models.letter import Language
+from app.services.letter_template import MONTHS_EN, MONTHS_MS
+from collections import Counter
+from typing import List, Optional, Tuple
+import re
+
+# Longest tag we'll buffer; anything longer was never a tag and is emitted as text
+MAX_TAG_LENGTH = 256
+# Characters of a paragraph seen before deciding whether it is a leaked salutation/closing
+DECIDE_LENGTH = 64
+# Trailing text held back while streaming so a date split across chunks is repaired whole
+HOLDBACK_LENGTH = 32
+
+# Dropped with everything inside them
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "svg", "math", "head", "title"}
+# Treated as paragraph boundaries
+BLOCK_TAGS = {
+    "div", "h1", "h2", "h3", "h4", "h5", "h6", "li", "ul", "ol", "blockquote",
+    "section", "article", "table", "tr", "td", "th", "header", "footer", "br", "hr"
+}
+
+# Header and closing are rendered locally; the model repeating them is a leak
+LEAKED_PARAGRAPHS = {
+    "dear sir/madam", "dear sir or madam", "dear sir", "dear madam", "tuan/puan", "tuan / puan",
+    "yours faithfully", "yours sincerely", "sincerely", "yang benar", "yang ikhlas",
+    "sekian, terima kasih", "sekian terima kasih", "sekian. terima kasih", "sekian"
+}
+SUBJECT_PREFIXES = ("subject:", "perkara:")
+
+MONTHS = {name: name for name in MONTHS_EN + MONTHS_MS}
+MONTHS.update({name[:3]: name for name in MONTHS_EN})
+MONTHS.update({"SEPT": "SEPTEMBER", "OGOS": "OGOS", "DIS": "DISEMBER", "OKT": "OKTOBER", "MEI": "MEI"})
+
+# Inputs are whitespace-collapsed first; every quantifier is bounded, so matching stays linear
+DAY_MONTH_YEAR = re.compile(r"\b(\d{1,2}) ([A-Za-z]{3,9})\.?,? (\d{4})\b")
+MONTH_DAY_YEAR = re.compile(r"\b([A-Za-z]{3,9}) (\d{1,2})(?:st|nd|rd|th)?, (\d{4})\b")
+NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b")
+WHITESPACE = re.compile(r"\s+")
+
+class LetterSanitizer:
+    """
+    Single-pass validator for the subject and body Claude writes.
+    Feed it chunks as they arrive (or the whole text once) and it returns clean
+    HTML: only <p> paragraphs, subject first, no leaked salutation/closing/<hr>,
+    and dates in "6 DECEMBER 2025" form. Work per chunk is proportional to the
+    chunk plus a small bounded holdback, so the total is linear in the input.
+    Deviations it repairs or can only flag are counted in `issues`.
+    """
+
+    def __init__(self, language: Language, sender_name: Optional[str] = None, subject_first: bool = True):
+        self.subject_first = subject_first
+        self.months = MONTHS_MS if language == Language.MALAY else MONTHS_EN
+        self.subject_prefix = "Perkara:" if language == Language.MALAY else "Subject:"
+        self.sender_name = " ".join(sender_name.split()).lower() if sender_name else None
+        self.issues: Counter = Counter()
+
+        # Tokenizer
+        self._in_tag = False
+        self._tag: List[str] = []
+        self._tag_length = 0
+        self._in_comment = False
+        self._comment_tail = ""
+        self._skip: Optional[str] = None
+
+        # Paragraph being assembled
+        self._open = False
+        self._explicit = False
+        self._pending = ""
+        self._decided = False
+        self._dropping = False
+        self._emitted = False
+        self._blank_line = False
+        self._kept = 0
+
+        self._out: List[str] = []
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk; returns the sanitized HTML that is final so far"""
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._in_comment:
+                i = self._consume_comment(chunk, i)
+            elif self._in_tag:
+                i = self._consume_tag(chunk, i)
+            else:
+                lt = chunk.find("<", i)
+                end = n if lt < 0 else lt
+                if end > i:
+                    self._text(chunk[i:end])
+                if lt < 0:
+                    break
+                self._in_tag = True
+                self._tag, self._tag_length = [], 0
+                i = lt + 1
+        self._flush(final=False)
+        return self._drain()
+
+    def close(self) -> str:
+        """Flush whatever is left once the model has finished"""
+        if self._in_tag:
+            self._tag_as_text()
+        self._end_paragraph()
+        if self._kept == 0:
+            self.issues["empty_body"] += 1
+        return self._drain()
+
+    # Tokenizer
+
+    def _consume_tag(self, chunk: str, i: int) -> int:
+        if self._tag_length == 0 and not (chunk[i].isalpha() or chunk[i] in "/!?"):
+            # "a < b", "<3": not a tag
+            self._in_tag = False
+            self._text("&lt;")
+            return i
+
+        gt = chunk.find(">", i, i + MAX_TAG_LENGTH - self._tag_length + 1)
+        if gt < 0:
+            piece = chunk[i:i + MAX_TAG_LENGTH - self._tag_length + 1]
+            self._tag.append(piece)
+            self._tag_length += len(piece)
+            if self._tag_length > MAX_TAG_LENGTH:
+                self._tag_as_text()
+            return i + len(piece)
+
+        self._tag.append(chunk[i:gt])
+        self._in_tag = False
+        raw = "".join(self._tag)
+        if raw.startswith("!--") and not (raw.endswith("--") and len(raw) >= 5):
+            self._in_comment = True
+            self._comment_tail = ""
+        else:
+            self._handle_tag(raw)
+        return gt + 1
+
+    def _consume_comment(self, chunk: str, i: int) -> int:
+        # Carry the last two characters so a "-->" split across chunks is found
+        combined = self._comment_tail + chunk[i:]
+        end = combined.find("-->")
+        if end < 0:
+            self._comment_tail = combined[-2:]
+            return len(chunk)
+        self._in_comment = False
+        return i + end + 3 - len(self._comment_tail)
+
+    def _tag_as_text(self):
+        self._in_tag = False
+        self.issues["stray_angle_bracket"] += 1
+        self._text("&lt;" + "".join(self._tag))
+
+    def _handle_tag(self, raw: str):
+        closing = raw.startswith("/")
+        body = raw[1:] if closing else raw
+        length = 0
+        while length < len(body) and body[length].isalnum():
+            length += 1
+        name = body[:length].lower()
+
+        if self._skip:
+            if closing and name == self._skip:
+                self._skip = None
+            return
+        if not name or raw.startswith(("!", "?")):
+            return
+        if name in DROP_CONTENT_TAGS:
+            self.issues["disallowed_tag"] += 1
+            if not closing and not raw.endswith("/"):
+                self._skip = name
+            return
+        if name == "p":
+            if not closing and body[length:].strip(" /"):
+                self.issues["attributes_stripped"] += 1
+            self._end_paragraph()
+            if not closing:
+                self._start_paragraph(explicit=True)
+            return
+        if name in BLOCK_TAGS:
+            self.issues["hr_in_body" if name == "hr" else "disallowed_tag"] += 1
+            self._end_paragraph()
+            return
+        # Inline formatting: drop the tag, keep the words
+        self.issues["disallowed_tag"] += 1
+
+    # Paragraphs
+
+    def _text(self, text: str):
+        if self._skip:
+            return
+        if self._explicit:
+            self._append(text)
+            return
+        # Outside <p>, a blank line ends an implicit paragraph
+        for index, line in enumerate(text.split("\n")):
+            if index > 0:
+                if self._blank_line and self._open:
+                    self._end_paragraph()
+                self._blank_line = True
+                self._append(" ")
+            if line:
+                if line.strip():
+                    self._blank_line = False
+                self._append(line)
+
+    def _append(self, text: str):
+        if not self._open:
+            if not text.strip():
+                return
+            self.issues["text_outside_paragraph"] += 1
+            self._start_paragraph(explicit=False)
+        if self._dropping:
+            return
+        if not self._pending and not self._emitted:
+            text = text.lstrip()
+        text = WHITESPACE.sub(" ", text)
+        if self._pending.endswith(" ") and text.startswith(" "):
+            text = text[1:]
+        self._pending += text
+        if len(self._pending) > DECIDE_LENGTH + HOLDBACK_LENGTH:
+            self._flush(final=False)
+
+    def _start_paragraph(self, explicit: bool):
+        self._open = True
+        self._explicit = explicit
+        self._pending = ""
+        self._decided = False
+        self._dropping = False
+        self._emitted = False
+        self._blank_line = False
+
+    def _end_paragraph(self):
+        if self._open:
+            self._flush(final=True)
+        self._open = False
+        self._explicit = False
+
+    def _decide(self, final: bool):
+        text = self._pending.strip()
+        key = text.lower().rstrip(" .,:;!")
+        if not text:
+            self._dropping = final
+            self._decided = final
+            return
+        self._decided = True
+        if (
+            key in LEAKED_PARAGRAPHS
+            or (self.sender_name and key == self.sender_name)
+            or (key.startswith("dear ") and text.endswith(","))
+            or (final and self._is_bare_date(text))
+        ):
+            self.issues["leaked_header_or_closing"] += 1
+            self._dropping = True
+            self._pending = ""
+            return
+
+        self._kept += 1
+        is_subject = key.startswith(SUBJECT_PREFIXES)
+        if self._kept == 1 and self.subject_first and not is_subject:
+            if key.startswith("re:"):
+                self._pending = self.subject_prefix + self._pending.lstrip()[3:]
+                self.issues["subject_prefix_repaired"] += 1
+            else:
+                self.issues["missing_subject"] += 1
+        elif (self._kept > 1 or not self.subject_first) and is_subject:
+            self.issues["subject_out_of_order"] += 1
+
+    def _is_bare_date(self, text: str) -> bool:
+        repaired = self._repair_dates(text, count=False)
+        return any(
+            pattern.fullmatch(candidate)
+            for pattern in (DAY_MONTH_YEAR, NUMERIC_DATE)
+            for candidate in (text.rstrip("."), repaired.rstrip("."))
+        )
+
+    def _flush(self, final: bool):
+        if not self._open:
+            return
+        if not self._decided and (final or len(self._pending) >= DECIDE_LENGTH):
+            self._decide(final)
+        if not self._decided or self._dropping:
+            if final and not self._decided:
+                self._pending = ""
+            return
+
+        text = self._repair_dates(self._pending)
+        if final:
+            emit, hold = text.rstrip(), ""
+        else:
+            cut = self._holdback_start(text)
+            emit, hold = text[:cut], text[cut:]
+
+        if emit:
+            if not self._emitted:
+                self._out.append("\n\n<p>" if self._kept > 1 else "<p>")
+                self._emitted = True
+            self._out.append(emit)
+        self._pending = hold
+        if final and self._emitted:
+            self._out.append("</p>")
+
+    def _holdback_start(self, text: str) -> int:
+        """Start of the last few short words, which might be the front of a date"""
+        cut = len(text)
+        for _ in range(3):
+            space = text.rfind(" ", 0, cut)
+            start = max(space, 0)
+            if len(text) - start > HOLDBACK_LENGTH:
+                break
+            cut = start
+            if space < 0:
+                break
+        return cut
+
+    def _repair_dates(self, text: str, count: bool = True) -> str:
+        def month(word: str) -> Optional[str]:
+            return MONTHS.get(word.upper())
+
+        def day_month_year(match):
+            name = month(match.group(2))
+            if name is None:
+                return match.group(0)
+            return self._date(match, f"{int(match.group(1))} {name} {match.group(3)}", count)
+
+        def month_day_year(match):
+            name = month(match.group(1))
+            if name is None:
+                return match.group(0)
+            return self._date(match, f"{int(match.group(2))} {name} {match.group(3)}", count)
+
+        def numeric(match):
+            day, month_number = int(match.group(1)), int(match.group(2))
+            if not (1 <= day <= 31 and 1 <= month_number <= 12):
+                return match.group(0)
+            return self._date(match, f"{day} {self.months[month_number - 1]} {match.group(3)}", count)
+
+        if not any(c.isdigit() for c in text):
+            return text
+        text = DAY_MONTH_YEAR.sub(day_month_year, text)
+        text = MONTH_DAY_YEAR.sub(month_day_year, text)
+        return NUMERIC_DATE.sub(numeric, text)
+
+    def _date(self, match, repaired: str, count: bool) -> str:
+        if count and repaired != match.group(0):
+            self.issues["date_format"] += 1
+        return repaired
+
+    def _drain(self) -> str:
+        out = "".join(self._out)
+        self._out = []
+        return out
+
+def sanitize_letter_body(
+    text: str,
+    language: Language,
+    sender_name: Optional[str] = None,
+    subject_first: bool = True
+) -> Tuple[str, Counter]:
+    """
+    Sanitize a complete subject+body in one go; returns the HTML and the issues found.
+    subject_first=False is for body paragraphs rewritten on their own.
+    """
+    sanitizer = LetterSanitizer(language, sender_name, subject_first)
+    html = sanitizer.feed(text) + sanitizer.close()
+    return html, sanitizer.issues
@@ -0,0 +1,44 @@
+from app.config import settings
+from app.models.letter import LetterSession
+from app.services.shared_state import TieredCache, shared_state
+from typing import Optional
+import uuid
+
+class LetterSessionStore:
+    """
+    Recent generations (transcript, structured data, letter) keyed by a random
+    generation id, so a revision only reruns Claude. Bounded LRU with a TTL that
+    restarts on every revision, backed by the shared state so any worker can
+    serve the revision.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.cache = TieredCache(
+            "session",
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+            store=shared_state,
+            encode=lambda session: session.model_dump_json().encode("utf-8"),
+            decode=LetterSession.model_validate_json
+        )
+
+    async def create(self, session: LetterSession) -> str:
+        generation_id = uuid.uuid4().hex
+        await self.cache.set(generation_id, session)
+        return generation_id
+
+    async def get(self, generation_id: str) -> Optional[LetterSession]:
+        session = await self.cache.get(generation_id)
+        # Callers mutate what they get back; the stored copy changes only through update()
+        return session.model_copy(deep=True) if session is not None else None
+
+    async def update(self, generation_id: str, session: LetterSession):
+        await self.cache.set(generation_id, session)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+letter_sessions = LetterSessionStore(
+    max_size=settings.SESSION_CACHE_SIZE,
+    ttl_seconds=settings.SESSION_TTL_SECONDS
+)
@@ -0,0 +1,292 @@
+from app.config import settings
+from app.models.letter import GenerateLetterResponse
+from app.services.telemetry import LETTER_WRITES, LETTER_WRITE_BATCH, LETTER_WRITE_SECONDS
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+try:
+    import asyncpg
+except ImportError:  # asyncpg is optional; only postgres URLs need it
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+# Same fallback titles the editor uses when a letter has no subject
+TYPE_TITLES = {
+    "complaint": "Complaint Letter",
+    "proposal": "Proposal Letter",
+    "mc": "MC Letter",
+    "general": "General Letter",
+    "official": "Official Letter"
+}
+
+COLUMNS = (
+    "id", "title", "content", "letter_type", "language", "tone_detected", "urgency",
+    "transcript", "structured_data", "metadata", "created_at", "updated_at"
+)
+# A revision rewrites the row it came from; created_at and the transcript stay as first written.
+# Only a newer version overwrites: a batch flushed late must not undo an edit the user saved meanwhile.
+UPDATED_COLUMNS = (
+    "title", "content", "letter_type", "language", "tone_detected", "urgency",
+    "structured_data", "metadata", "updated_at"
+)
+
+def letter_row(letter_id: str, response: GenerateLetterResponse) -> dict:
+    """One row of the letters table (catat-frontend/DATABASE_SCHEMA.sql)"""
+    metadata = response.metadata
+    now = time.time()
+    return {
+        "id": letter_id,
+        "title": response.structured_data.subject or TYPE_TITLES.get(metadata.letter_type.value, "Letter"),
+        "content": response.letter,
+        "letter_type": metadata.letter_type.value,
+        "language": metadata.language.value,
+        "tone_detected": metadata.tone_detected.value if metadata.tone_detected else None,
+        "urgency": metadata.urgency.value if metadata.urgency else None,
+        "transcript": response.transcript,
+        "structured_data": response.structured_data.model_dump_json(),
+        "metadata": metadata.model_dump_json(),
+        "created_at": now,
+        "updated_at": now
+    }
+
+class PostgresLetterDB:
+    """asyncpg pool; each batch is one pipelined executemany in a transaction"""
+
+    name = "postgres"
+
+    def __init__(self, url: str, pool_size: int):
+        if asyncpg is None:
+            raise RuntimeError("A postgres LETTER_DB_URL needs the asyncpg package")
+        self.url = url
+        self.pool_size = pool_size
+        self._pool = None
+        updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in UPDATED_COLUMNS)
+        self.sql = (
+            f"INSERT INTO letters ({', '.join(COLUMNS)}) VALUES "
+            "($1::uuid, $2, $3, $4, $5, $6, $7, $8, $9::jsonb, $10::jsonb, $11, $12) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates} WHERE letters.updated_at < EXCLUDED.updated_at"
+        )
+
+    async def write(self, rows: List[dict]):
+        if self._pool is None:
+            # Opened on first write, so an unreachable database never blocks startup
+            self._pool = await asyncpg.create_pool(
+                self.url, min_size=1, max_size=self.pool_size,
+                # Transaction-mode poolers (Supabase's port 6543) can't keep prepared statements
+                statement_cache_size=0
+            )
+        records = [
+            tuple(
+                datetime.fromtimestamp(row[name], timezone.utc) if name in ("created_at", "updated_at") else row[name]
+                for name in COLUMNS
+            )
+            for row in rows
+        ]
+        async with self._pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.executemany(self.sql, records)
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+class SQLiteLetterDB:
+    """Local stand-in with the same table and upsert, for development and benchmarks"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        updates = ", ".join(f"{name} = excluded.{name}" for name in UPDATED_COLUMNS)
+        self.sql = (
+            f"INSERT INTO letters ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates} WHERE letters.updated_at < excluded.updated_at"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS letters ("
+                "id TEXT PRIMARY KEY, title TEXT NOT NULL, content TEXT NOT NULL, "
+                "letter_type TEXT NOT NULL, language TEXT NOT NULL, tone_detected TEXT, urgency TEXT, "
+                "transcript TEXT, structured_data TEXT, metadata TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _write(self, rows: List[dict]):
+        with self._lock:
+            db = self._connect()
+            with db:
+                db.executemany(self.sql, [tuple(row[name] for name in COLUMNS) for row in rows])
+
+    async def write(self, rows: List[dict]):
+        await asyncio.to_thread(self._write, rows)
+
+    async def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+def create_letter_db(url: str):
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresLetterDB(url, settings.LETTER_DB_POOL_SIZE)
+    if url.startswith("sqlite:///"):
+        return SQLiteLetterDB(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported LETTER_DB_URL: {url.split(':', 1)[0]}")
+
+class LetterStore:
+    """
+    Write-behind persistence of generated letters.
+    Requests only enqueue a row; one writer drains the queue in batches (up to
+    LETTER_PERSIST_BATCH_SIZE rows, or whatever arrived within the batch wait) so
+    a burst of generations costs a few round trips. A full queue makes callers
+    wait up to LETTER_PERSIST_ENQUEUE_TIMEOUT_SECONDS, then the row is dropped
+    rather than failing the request. A single writer keeps a revision from
+    landing before the row it updates.
+
+    Rows are written without a user_id: requests carry no signed-in user. The
+    backend connects as the table owner, so RLS doesn't stop the writes, but
+    the schema's "own letters" policies (auth.uid() = user_id) hide ownerless
+    rows from every user. The frontend saves under the returned letter_id, so
+    this only works with the schema's public-access policies until requests
+    carry an owner id.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.counts: Dict[str, int] = {"queued": 0, "written": 0, "dropped": 0, "failed": 0}
+        self.batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.db is not None
+
+    @staticmethod
+    def row_id(generation_id: str) -> str:
+        """Generation and job ids are uuid4 hex; the letters table wants the dashed form"""
+        return str(uuid.UUID(generation_id))
+
+    def start(self):
+        if not self.enabled:
+            return
+        self._queue = asyncio.Queue(maxsize=settings.LETTER_PERSIST_QUEUE_SIZE)
+        self._writer = asyncio.create_task(self._write_loop())
+        logger.info(f"🗄️ Letter persistence started ({self.db.name})")
+
+    async def save(self, generation_id: str, response: GenerateLetterResponse) -> Optional[str]:
+        """Queue the letter for writing; returns its row id, or None when it won't be stored"""
+        if self._queue is None:
+            return None
+        row = letter_row(self.row_id(generation_id), response)
+        try:
+            await asyncio.wait_for(self._queue.put(row), settings.LETTER_PERSIST_ENQUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            self._count("dropped")
+            logger.warning(f"⚠️ Letter persistence queue full, dropped {row['id']}")
+            return None
+        self._count("queued")
+        return row["id"]
+
+    def _count(self, result: str, n: int = 1):
+        self.counts[result] += n
+        LETTER_WRITES.inc(n, result=result)
+
+    async def _next_batch(self) -> List[dict]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + settings.LETTER_PERSIST_BATCH_WAIT_MS / 1000
+        while len(batch) < settings.LETTER_PERSIST_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: List[dict]):
+        # Revisions queued behind their own generation only need the latest version
+        latest: Dict[str, dict] = {}
+        for row in batch:
+            first = latest.get(row["id"])
+            latest[row["id"]] = {**row, "created_at": first["created_at"]} if first else row
+        rows = list(latest.values())
+        for attempt in range(settings.LETTER_PERSIST_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                await self.db.write(rows)
+            except Exception as e:
+                if attempt == settings.LETTER_PERSIST_RETRIES:
+                    self._count("failed", len(batch))
+                    logger.error(f"❌ Dropped {len(batch)} letters after {attempt + 1} write attempts: {e}")
+                    return
+                delay = min(2 ** attempt * 0.5, 10)
+                logger.warning(f"⚠️ Letter write failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            else:
+                LETTER_WRITE_SECONDS.observe(time.perf_counter() - started, backend=self.db.name)
+                LETTER_WRITE_BATCH.observe(len(rows))
+                self.batches += 1
+                self._count("written", len(batch))
+                return
+
+    async def _write_loop(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush(batch)
+            except asyncio.CancelledError:
+                # Shutdown timed out mid-write
+                self._count("dropped", len(batch))
+                raise
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def stop(self):
+        """Flush what is queued (bounded by the shutdown timeout), then close the pool"""
+        if self._writer is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), settings.LETTER_PERSIST_SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Shutdown left {self._queue.qsize()} letters unwritten")
+            self._count("dropped", self._queue.qsize())
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        self._queue = None
+        await self.db.close()
+        logger.info("🗄️ Letter persistence stopped")
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.db.name if self.enabled else None,
+            "queue": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            **self.counts
+        }
+
+letter_store = LetterStore(create_letter_db(settings.LETTER_DB_URL) if settings.LETTER_DB_URL else None)
@@ -0,0 +1,75 @@
+from app.models.letter import StructuredData, Language
+from datetime import date, datetime, timedelta, timezone
+from html import escape
+from typing import List, Optional
+
+MALAYSIA_TZ = timezone(timedelta(hours=8))
+
+MONTHS_EN = (
+    "JANUARY", "FEBRUARY", "MARCH", "APRIL", "MAY", "JUNE",
+    "JULY", "AUGUST", "SEPTEMBER", "OCTOBER", "NOVEMBER", "DECEMBER"
+)
+MONTHS_MS = (
+    "JANUARI", "FEBRUARI", "MAC", "APRIL", "MEI", "JUN",
+    "JULAI", "OGOS", "SEPTEMBER", "OKTOBER", "NOVEMBER", "DISEMBER"
+)
+
+# Malay letters use Malay blocks; English and mixed letters use English ones
+BLOCKS = {
+    "en": {
+        "sender_placeholder": "[Sender Name]",
+        "salutation": "Dear Sir/Madam,",
+        "closing": ["Yours faithfully,"],
+        "months": MONTHS_EN
+    },
+    "ms": {
+        "sender_placeholder": "[Nama Pengirim]",
+        "salutation": "Tuan/Puan,",
+        "closing": ["Sekian, terima kasih.", "Yang benar,"],
+        "months": MONTHS_MS
+    }
+}
+
+def _blocks(language: Language) -> dict:
+    return BLOCKS["ms" if language == Language.MALAY else "en"]
+
+def _paragraphs(lines: List[Optional[str]]) -> List[str]:
+    return [f"<p>{escape(line.strip(), quote=False)}</p>" for line in lines if line and line.strip()]
+
+def format_letter_date(day: date, language: Language) -> str:
+    """"6 DECEMBER 2025" / "6 DISEMBER 2025": capitals, full month, no leading zero"""
+    return f"{day.day} {_blocks(language)['months'][day.month - 1]} {day.year}"
+
+def render_header(structured_data: StructuredData, language: Language, today: Optional[date] = None) -> str:
+    """Sender block, <hr>, recipient block, date and salutation"""
+    blocks = _blocks(language)
+    sender = structured_data.sender
+    recipient = structured_data.recipient
+    today = today or datetime.now(MALAYSIA_TZ).date()
+
+    lines = _paragraphs([sender.name or blocks["sender_placeholder"], sender.address, sender.contact])
+    lines.append("<hr>")
+    lines += _paragraphs([recipient.name, recipient.title, recipient.organization, recipient.address])
+    lines += _paragraphs([format_letter_date(today, language), blocks["salutation"]])
+    return "\n\n".join(lines) + "\n\n"
+
+def render_closing(structured_data: StructuredData, language: Language) -> str:
+    blocks = _blocks(language)
+    lines = _paragraphs(blocks["closing"] + [structured_data.sender.name or blocks["sender_placeholder"]])
+    return "\n\n" + "\n\n".join(lines)
+
+def assemble_letter(structured_data: StructuredData, language: Language, body: str) -> str:
+    """Locally rendered header and closing around Claude's subject and body paragraphs"""
+    return render_header(structured_data, language) + body.strip() + render_closing(structured_data, language)
+
+
+def letter_body(letter: str, language: Language) -> str:
+    """Subject and body paragraphs of an assembled letter: between the salutation and the closing"""
+    blocks = _blocks(language)
+    salutation = _paragraphs([blocks["salutation"]])[0] + "\n\n"
+    closing = "\n\n" + _paragraphs(blocks["closing"][:1])[0]
+    # The sanitizer drops both from Claude's output, so each appears once
+    start = letter.find(salutation)
+    start = 0 if start < 0 else start + len(salutation)
+    end = letter.rfind(closing)
+    return letter[start:end if end >= start else len(letter)].strip()
@@ -0,0 +1,157 @@
+from app.models.letter import StructuredData, ContactInfo, ContactOverrides
+from typing import List, Optional
+import re
+
+# Government agencies and utilities people most often write to
+AGENCIES = {
+    "DBKL": "Dewan Bandaraya Kuala Lumpur",
+    "MBPJ": "Majlis Bandaraya Petaling Jaya",
+    "MBSA": "Majlis Bandaraya Shah Alam",
+    "MPSJ": "Majlis Perbandaran Subang Jaya",
+    "MPAJ": "Majlis Perbandaran Ampang Jaya",
+    "MBJB": "Majlis Bandaraya Johor Bahru",
+    "MBPP": "Majlis Bandaraya Pulau Pinang",
+    "JPJ": "Jabatan Pengangkutan Jalan",
+    "JPN": "Jabatan Pendaftaran Negara",
+    "JKR": "Jabatan Kerja Raya",
+    "LHDN": "Lembaga Hasil Dalam Negeri",
+    "KWSP": "Kumpulan Wang Simpanan Pekerja",
+    "EPF": "Employees Provident Fund",
+    "PERKESO": "Pertubuhan Keselamatan Sosial",
+    "SOCSO": "Social Security Organisation",
+    "KKM": "Kementerian Kesihatan Malaysia",
+    "KPM": "Kementerian Pendidikan Malaysia",
+    "PDRM": "Polis Diraja Malaysia",
+    "TNB": "Tenaga Nasional Berhad",
+    "SYABAS": "Syarikat Bekalan Air Selangor",
+    "Air Selangor": "Pengurusan Air Selangor",
+    "SPAN": "Suruhanjaya Perkhidmatan Air Negara",
+    "SPRM": "Suruhanjaya Pencegahan Rasuah Malaysia",
+    "MACC": "Malaysian Anti-Corruption Commission",
+}
+
+MONTHS = (
+    "january|february|march|april|may|june|july|august|september|october|november|december|"
+    "januari|februari|mac|mei|jun|julai|ogos|oktober|disember|"
+    "jan|feb|mar|apr|aug|sep|sept|oct|nov|dec"
+)
+
+AGENCY_RE = re.compile(r"\b(" + "|".join(re.escape(a) for a in sorted(AGENCIES, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+TITLE_RE = re.compile(
+    r"\b(Yang Berhormat|YB|Tan Sri|Puan Sri|Dato'? Sri|Datuk Seri|Datuk|Dato'?|Datin|Tuan Haji|Hajah|Tuan|Puan|Encik|Cik|Dr\.?|Prof\.?)"
+    r"\s+([A-Z][\w'-]*(?:\s+(?:bin|binti|bt|a/l|a/p|[A-Z][\w'-]*)){0,4})"
+)
+PHONE_RE = re.compile(r"(?<![\d+])(?:\+?60[\s-]?|0)(1\d[\s-]?\d{3,4}[\s-]?\d{4}|[3-9][\s-]?\d{3,4}[\s-]?\d{4})(?!\d)")
+EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+DATE_RE = re.compile(
+    r"\b(?:\d{1,2}(?:hb)?\s+(?:" + MONTHS + r")\.?(?:\s+\d{4})?"
+    r"|(?:" + MONTHS + r")\.?\s+\d{1,2}(?:st|nd|rd|th)?(?:,?\s+\d{4})?"
+    r"|\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})\b",
+    re.IGNORECASE
+)
+NAME_RE = re.compile(r"\b(?i:nama saya|my name is)\s+([A-Z][\w'-]*(?:\s+(?:bin|binti|a/l|a/p|[A-Z][\w'-]*)){0,4})")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD_RE = re.compile(r"[a-z']+")
+
+MANGLISH_MARKERS = {"lah", "leh", "lor", "meh", "mah", "ah", "boss", "alamak", "aiyo", "aiyah", "wei"}
+MALAY_WORDS = {
+    "saya", "kami", "yang", "dan", "di", "ke", "tidak", "ini", "itu", "dengan", "untuk", "ada",
+    "sudah", "akan", "kerana", "sebab", "tolong", "rumah", "jalan", "taman", "rosak", "minta", "boleh"
+}
+FORMAL_MARKERS = ("i am writing", "dengan segala hormatnya", "saya ingin memaklumkan", "i wish to", "dimaklumkan")
+URGENT_MARKERS = ("urgent", "segera", "kecemasan", "emergency", "asap", "immediately", "bahaya", "dangerous")
+SOON_MARKERS = ("soon", "secepat", "lekas", "this week", "minggu ini", "before")
+
+class LocalExtractor:
+    """
+    Rule-based structuring for transcripts that arrive with the form filled in.
+    Picks out agencies, honorifics, phone numbers, emails and dates with regexes
+    and turns the transcript's sentences into key points. It is much rougher than
+    the LLM, so it only stands in when the contact details come from the form.
+    """
+
+    def extract(self, transcript: str, letter_type: str) -> StructuredData:
+        text = " ".join(transcript.split())
+        lowered = text.lower()
+        words = WORD_RE.findall(lowered)
+
+        agency = AGENCY_RE.search(text)
+        title = TITLE_RE.search(text)
+        phone = PHONE_RE.search(text)
+        email = EMAIL_RE.search(text)
+        name = NAME_RE.search(text)
+
+        recipient = ContactInfo(
+            name=title.group(0) if title else None,
+            organization=self._agency_name(agency.group(1)) if agency else None
+        )
+        sender = ContactInfo(
+            name=name.group(1) if name else None,
+            contact=(phone.group(0) if phone else None) or (email.group(0) if email else None)
+        )
+
+        # Self-introductions and contact details go in the letter header, not the body
+        sentences = [
+            s.strip() for s in SENTENCE_RE.split(text)
+            if len(s.split()) > 1 and not (NAME_RE.search(s) or PHONE_RE.search(s) or EMAIL_RE.search(s))
+        ]
+        return StructuredData(
+            letter_type=letter_type,
+            sender=sender,
+            recipient=recipient,
+            subject=self._subject(sentences),
+            key_points=sentences[:8] or [text[:200]],
+            tone_detected=self._tone(lowered, words),
+            language_preference="ms" if self._malay_ratio(words) >= 0.15 else "en",
+            dates_mentioned=list(dict.fromkeys(m.group(0) for m in DATE_RE.finditer(text))),
+            urgency_level=self._urgency(lowered)
+        )
+
+    def covers_contacts(self, extracted: StructuredData, overrides: Optional[ContactOverrides]) -> bool:
+        """
+        True when the form plus local extraction leave nothing for the LLM to find:
+        sender name, address and contact, a recipient name or organization, and
+        the recipient address.
+        """
+        if overrides is None:
+            return False
+        sender, recipient = extracted.sender, extracted.recipient
+        return all((
+            overrides.sender_name or sender.name,
+            overrides.sender_address,
+            overrides.sender_contact or sender.contact,
+            overrides.recipient_name or overrides.recipient_organization or recipient.name or recipient.organization,
+            overrides.recipient_address
+        ))
+
+    def _agency_name(self, match: str) -> str:
+        for acronym, name in AGENCIES.items():
+            if acronym.lower() == match.lower():
+                return f"{name} ({acronym})" if acronym.isupper() else name
+        return match
+
+    def _subject(self, sentences: List[str]) -> str:
+        substantial = [s for s in sentences if len(s.split()) >= 4]
+        if not substantial:
+            return "Letter content"
+        subject = substantial[0].rstrip(".!?")
+        return subject if len(subject) <= 80 else subject[:77].rsplit(" ", 1)[0] + "..."
+
+    def _tone(self, lowered: str, words: List[str]) -> str:
+        if any(word in MANGLISH_MARKERS for word in words) or "can or not" in lowered:
+            return "manglish"
+        if any(marker in lowered for marker in FORMAL_MARKERS):
+            return "formal"
+        return "casual"
+
+    def _malay_ratio(self, words: List[str]) -> float:
+        return sum(word in MALAY_WORDS for word in words) / len(words) if words else 0.0
+
+    def _urgency(self, lowered: str) -> str:
+        if any(marker in lowered for marker in URGENT_MARKERS):
+            return "high"
+        if any(marker in lowered for marker in SOON_MARKERS):
+            return "medium"
+        return "low"
+
+local_extractor = LocalExtractor()
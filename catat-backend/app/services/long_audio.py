@@ -0,0 +1,115 @@
+from app.utils import audio
+from typing import List, Optional, Tuple
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Lowest bytes per second a speech recording of each type plausibly has. A file
+# smaller than this times the threshold can't be long enough to split, so it
+# never reaches the process pool. Unknown types get the lowest floor.
+MIN_BYTES_PER_SECOND = 2000  # Opus at 16 kbps
+FORMAT_MIN_BYTES_PER_SECOND = {
+    ".wav": 16000,  # 8 kHz 16-bit mono PCM
+    ".flac": 6000,
+    ".mp3": 4000,
+    ".mpeg": 4000,
+    ".m4a": 4000,
+    ".mp4": 4000
+}
+
+def may_be_long(size: int, filename: str, threshold_seconds: float) -> bool:
+    """Cheap check on the upload size before any probing or decoding"""
+    extension = "." + filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    return size >= threshold_seconds * FORMAT_MIN_BYTES_PER_SECOND.get(extension, MIN_BYTES_PER_SECOND)
+
+def plan_segments(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    segment_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float = 10.0
+) -> List[Tuple[float, float]]:
+    """
+    Cut points near every `segment_seconds`, snapped back to the closest silence
+    midpoint within `search_seconds`. Segments overlap by `overlap_seconds` on each side.
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = [0.0]
+
+    while duration - cuts[-1] > segment_seconds:
+        target = cuts[-1] + segment_seconds
+        candidates = [m for m in midpoints if target - search_seconds <= m <= target and m > cuts[-1]]
+        cuts.append(max(candidates) if candidates else target)
+    cuts.append(duration)
+
+    return [
+        (max(0.0, start - overlap_seconds), min(duration, end + overlap_seconds))
+        for start, end in zip(cuts, cuts[1:])
+    ]
+
+def split_long_audio(
+    audio_bytes: bytes,
+    threshold_seconds: float,
+    segment_seconds: float,
+    overlap_seconds: float
+) -> Optional[List[Tuple[bytes, str]]]:
+    """
+    Split a recording longer than `threshold_seconds` into FLAC segments.
+    Returns None when the recording is short or cannot be decoded, so the
+    caller uploads the original bytes unchanged. CPU-bound and GIL-holding
+    (the energy scan is pure Python): run it in a process pool.
+    Module-level so it can be pickled into one.
+    """
+    if not audio.audio_available() or len(audio_bytes) < threshold_seconds * MIN_BYTES_PER_SECOND:
+        return None
+
+    started = time.perf_counter()
+    try:
+        # The container or packet timestamps spare short recordings the full decode
+        duration = audio.probe_duration(audio_bytes)
+        if duration is not None and duration <= threshold_seconds:
+            return None
+        pcm = audio.decode_pcm(audio_bytes)
+    except Exception as e:
+        logger.warning(f"Long-audio split skipped, decode failed: {e}")
+        return None
+
+    duration = audio.pcm_duration(pcm)
+    if duration <= threshold_seconds:
+        return None
+
+    silences = audio.find_silences(audio.frame_energies(pcm))
+    plan = plan_segments(duration, silences, segment_seconds, overlap_seconds)
+    segments = [audio.encode_pcm(audio.slice_pcm(pcm, start, end)) for start, end in plan]
+
+    logger.info(
+        f"✂️ Split {duration:.0f}s recording into {len(segments)} segments "
+        f"({len(silences)} silences, {time.perf_counter() - started:.2f}s)"
+    )
+    return segments
+
+_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+def _normalize_word(word: str) -> str:
+    return _WORD.sub("", word.lower())
+
+def stitch_transcripts(parts: List[str], max_overlap_words: int = 30) -> str:
+    """
+    Join segment transcripts, dropping words repeated across each overlap.
+    The longest run of words that ends one part and starts the next is kept once.
+    """
+    words: List[str] = []
+    for part in parts:
+        incoming = part.split()
+        tail = [_normalize_word(w) for w in words[-max_overlap_words:]]
+        head = [_normalize_word(w) for w in incoming[:max_overlap_words]]
+
+        overlap = 0
+        for size in range(min(len(tail), len(head)), 0, -1):
+            if tail[-size:] == head[:size]:
+                overlap = size
+                break
+        words.extend(incoming[overlap:])
+    return " ".join(words)
@@ -0,0 +1,180 @@
+from app.config import settings
+from app.services.adaptive_limiter import AdaptiveLimiter
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi import HTTPException
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Monotonic deadline for the current request and the model that served each stage
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+served_models: ContextVar[Optional[Dict[str, str]]] = ContextVar("served_models", default=None)
+
+TRANSIENT_STATUS_CODES = {408, 409, 500, 502, 503, 504, 529}
+
+@contextmanager
+def latency_budget(seconds: Optional[float] = None):
+    """
+    Run the enclosed pipeline under a latency budget (Settings default when None).
+    Yields the dict that collects stage → serving model for LetterMetadata.
+    """
+    budget = seconds if seconds is not None else settings.LATENCY_BUDGET_SECONDS
+    models: Dict[str, str] = {}
+    deadline_token = request_deadline.set(time.monotonic() + budget)
+    models_token = served_models.set(models)
+    try:
+        yield models
+    finally:
+        request_deadline.reset(deadline_token)
+        served_models.reset(models_token)
+
+def remaining_budget() -> Optional[float]:
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def record_model(stage: str, model: str):
+    models = served_models.get()
+    if models is not None:
+        models[stage] = model
+
+def is_transient_error(error: Exception) -> bool:
+    # Our own 503s (limiter queue timeouts) already waited; don't retry them
+    if isinstance(error, HTTPException):
+        return False
+    if getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES:
+        return True
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+class LatencyTracker:
+    """Sliding window of successful call latencies for one model"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+class ModelRouter:
+    """
+    Runs one pipeline stage against a primary model with a faster fallback.
+    Transient errors are retried with jittered backoff. If the primary hasn't
+    answered by its HEDGE_PERCENTILE latency (or half the remaining budget
+    while the window is still warming up), the same call is hedged to the
+    fallback and whichever answers first wins. The fallback also takes over when
+    the primary fails transiently; any other primary error (a bad request or
+    key) is raised as is, since the fallback would fail the same way.
+    """
+
+    def __init__(self, stage: str, primary: str, fallback: str, limiter: AdaptiveLimiter):
+        self.stage = stage
+        self.primary = primary
+        self.fallback = fallback
+        self.limiter = limiter
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.hedged = 0
+        self.fallback_wins = 0
+
+    def _tracker(self, model: str) -> LatencyTracker:
+        return self.latency.setdefault(model, LatencyTracker())
+
+    def _hedge_delay(self, remaining: Optional[float]) -> Optional[float]:
+        delay = self._tracker(self.primary).percentile(settings.HEDGE_PERCENTILE)
+        if remaining is None:
+            return delay
+        return min(delay, remaining / 2) if delay is not None else remaining / 2
+
+    async def _attempt(self, model: str, call: Callable[[str], Awaitable[T]]) -> T:
+        retries = settings.PROVIDER_TRANSIENT_RETRIES
+        for attempt in range(retries + 1):
+            started = time.monotonic()
+            try:
+                result = await self.limiter.run(lambda: call(model))
+                self._tracker(model).observe(time.monotonic() - started)
+                return result
+            except Exception as e:
+                delay = 0.25 * 2 ** attempt * random.uniform(0.8, 1.2)
+                remaining = remaining_budget()
+                if (
+                    not is_transient_error(e)
+                    or attempt == retries
+                    or (remaining is not None and remaining <= delay)
+                ):
+                    raise
+                logger.warning(f"🔁 {self.stage} on {model} failed ({type(e).__name__}), retrying")
+                await asyncio.sleep(delay)
+
+    async def run(self, call: Callable[[str], Awaitable[T]]) -> Tuple[T, str]:
+        """Call `call(model)` and return its result with the model that produced it"""
+        remaining = remaining_budget()
+        hedge_delay = self._hedge_delay(remaining)
+        deadline = None if remaining is None else time.monotonic() + remaining
+
+        has_fallback = bool(self.fallback) and self.fallback != self.primary
+        tasks: Dict[asyncio.Task, str] = {
+            asyncio.create_task(self._attempt(self.primary, call)): self.primary
+        }
+        errors = []
+        fallback_started = False
+        try:
+            while tasks:
+                # Until the fallback is running, wake up at the hedge point; after that only the budget
+                hedging = has_fallback and not fallback_started and hedge_delay is not None
+                timeout = hedge_delay if hedging else None
+                if deadline is not None:
+                    left = max(0.0, deadline - time.monotonic())
+                    timeout = left if timeout is None else min(timeout, left)
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    model = tasks.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if model != self.primary:
+                            self.fallback_wins += 1
+                            logger.info(f"🪂 {self.stage} served by fallback {model}")
+                        return task.result(), model
+                    logger.warning(f"⚠️ {self.stage} on {model} failed: {error}")
+                    if model == self.primary and not is_transient_error(error):
+                        raise error
+                    errors.append(error)
+
+                if deadline is not None and time.monotonic() >= deadline and tasks:
+                    raise HTTPException(status_code=504, detail=f"{self.stage.capitalize()} exceeded the latency budget")
+
+                # Primary is slow or has failed: bring in the fallback once
+                if has_fallback and not fallback_started and (errors or not done):
+                    fallback_started = True
+                    if not errors:
+                        self.hedged += 1
+                        logger.info(f"🏃 Hedging {self.stage} to {self.fallback}")
+                    tasks[asyncio.create_task(self._attempt(self.fallback, call))] = self.fallback
+
+            raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "primary": self.primary,
+            "fallback": self.fallback,
+            "hedged": self.hedged,
+            "fallback_wins": self.fallback_wins,
+            "primary_p50": self._tracker(self.primary).percentile(50),
+            "primary_hedge_delay": self._tracker(self.primary).percentile(settings.HEDGE_PERCENTILE)
+        }
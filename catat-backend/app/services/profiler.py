@@ -0,0 +1,236 @@
+from app.config import settings
+from app.services.shared_state import TieredCache, shared_state
+from app.services.telemetry import PROFILES
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Where the loop thread's stack ends while it waits for I/O. With uvloop the
+# wait happens in C, so the last Python frame is whatever started the loop.
+IDLE_FRAMES = {
+    "selectors.py": {"select"},
+    "base_events.py": {"run_forever", "run_until_complete", "_run_once"},
+    "runners.py": {"run"},
+    "server.py": {"serve", "main_loop"}
+}
+
+def _is_idle(code) -> bool:
+    return code.co_name in IDLE_FRAMES.get(os.path.basename(code.co_filename), ())
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    parts = path.replace("\\", "/").split("/")
+    # app/services/x.py for our code, package/module.py for libraries
+    if "app" in parts:
+        path = "/".join(parts[parts.index("app"):])
+    else:
+        path = "/".join(parts[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Samples one thread's Python stack on a fixed interval from a background
+    thread (sys._current_frames), so the profiled code runs unmodified.
+    Only the event loop thread is sampled: that is where serialization,
+    validation and regex work block every request.
+    """
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter = Counter()
+        self.idle = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            if _is_idle(frame.f_code):
+                self.idle += 1
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+class LoopLagMonitor:
+    """How late short sleeps wake up: the time the loop spent blocked by something"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval_seconds)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval_seconds))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    def summary(self) -> dict:
+        lags = sorted(self.lags)
+        return {
+            "interval_ms": self.interval_seconds * 1000,
+            "checks": len(lags),
+            "max_ms": round(lags[-1] * 1000, 2) if lags else 0.0,
+            "p99_ms": round(lags[int((len(lags) - 1) * 0.99)] * 1000, 2) if lags else 0.0,
+            # Lag past one interval means a callback held the loop that long
+            "blocked_ms": round(sum(lag for lag in lags if lag > self.interval_seconds) * 1000, 1)
+        }
+
+class RequestProfile:
+    """Stack samples and loop lag for one request, started and stopped around it"""
+
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.sampler = StackSampler(threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000)
+        self.lag = LoopLagMonitor(settings.PROFILE_LOOP_LAG_INTERVAL_MS / 1000)
+        self.started_at = 0.0
+        self.started = 0.0
+
+    def start(self):
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.lag.start()
+
+    async def stop(self, status: Optional[int], server_timing: Optional[str]) -> dict:
+        duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        await self.lag.stop()
+        return self.report(duration, status, server_timing)
+
+    def report(self, duration: float, status: Optional[int], server_timing: Optional[str]) -> dict:
+        stacks = self.sampler.stacks
+        busy = sum(stacks.values())
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            # Recursion counts once per sample
+            for label in set(stack):
+                total[label] += count
+
+        def share(count: int) -> float:
+            return round(100 * count / busy, 1) if busy else 0.0
+
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "status": status,
+            "started_at": self.started_at,
+            "duration_ms": round(duration * 1000, 1),
+            "server_timing": server_timing,
+            "pid": os.getpid(),
+            "samples": {
+                "interval_ms": self.sampler.interval_seconds * 1000,
+                "busy": busy,
+                "idle": self.sampler.idle
+            },
+            # Where the loop thread was when sampled; concurrent requests share that thread
+            "top_self": [
+                {"function": label, "samples": count, "percent": share(count)}
+                for label, count in own.most_common(settings.PROFILE_TOP_FUNCTIONS)
+            ],
+            "top_total": [
+                {"function": label, "samples": count, "percent": share(count)}
+                for label, count in total.most_common(settings.PROFILE_TOP_FUNCTIONS)
+            ],
+            "loop_lag": self.lag.summary(),
+            # Brendan Gregg's folded format, for flamegraph.pl or speedscope
+            "folded": [f"{';'.join(stack)} {count}" for stack, count in stacks.most_common()]
+        }
+
+class ProfileStore:
+    """
+    Finished reports, kept in the shared state so any worker can serve them.
+    An index hash of summaries backs the listing and is trimmed as reports expire.
+    """
+
+    INDEX = "profiles"
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.cache = TieredCache(
+            "profile",
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+            store=shared_state,
+            encode=lambda report: json.dumps(report).encode("utf-8"),
+            decode=json.loads
+        )
+        # Only one profile per process at a time: a second sampler would only see the same thread
+        self.active = False
+
+    async def save(self, report: dict):
+        await self.cache.set(report["id"], report)
+        summary = {
+            name: report[name]
+            for name in ("id", "method", "path", "trigger", "status", "started_at", "duration_ms")
+        }
+        summary["blocked_ms"] = report["loop_lag"]["blocked_ms"]
+        await shared_state.hset(self.INDEX, report["id"], json.dumps(summary).encode("utf-8"))
+        PROFILES.inc(trigger=report["trigger"])
+        await self._trim()
+
+    async def _trim(self):
+        summaries = await self.list()
+        for summary in summaries[self.max_size:]:
+            await shared_state.hdel(self.INDEX, summary["id"])
+
+    async def list(self) -> List[dict]:
+        """Newest first; entries past the TTL are dropped from the index"""
+        summaries = []
+        expired_before = time.time() - self.ttl_seconds
+        for profile_id, raw in (await shared_state.hgetall(self.INDEX)).items():
+            summary = json.loads(raw)
+            if summary["started_at"] < expired_before:
+                await shared_state.hdel(self.INDEX, profile_id)
+                continue
+            summaries.append(summary)
+        return sorted(summaries, key=lambda s: s["started_at"], reverse=True)
+
+    async def get(self, profile_id: str) -> Optional[dict]:
+        return await self.cache.get(profile_id)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+profile_store = ProfileStore(
+    max_size=settings.PROFILE_STORE_SIZE,
+    ttl_seconds=settings.PROFILE_TTL_SECONDS
+)
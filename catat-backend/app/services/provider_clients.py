@@ -0,0 +1,126 @@
+from groq import AsyncGroq, DefaultAsyncHttpxClient as GroqHttpClient
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient as AnthropicHttpClient
+import httpx
+from app.config import settings
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class ProviderClients:
+    """
+    Async Groq and Anthropic clients backed by keep-alive connection pools.
+    Opened and closed by the app lifespan; Whisper and Llama share the Groq client.
+    """
+
+    def __init__(self):
+        self._groq = None
+        self._anthropic = None
+        self.warmup_stats: dict = {}
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS
+        )
+
+    def open(self):
+        missing = [name for name in ("GROQ_API_KEY", "ANTHROPIC_API_KEY") if not getattr(settings, name)]
+        if missing:
+            raise RuntimeError(f"Missing provider API keys: {', '.join(missing)}")
+        
+        # Each SDK needs its own httpx client type, so both pools get the same limits.
+        # SDK retries are off: the adaptive limiters and model routers own retrying.
+        if self._groq is None:
+            self._groq = AsyncGroq(
+                api_key=settings.GROQ_API_KEY,
+                base_url=settings.GROQ_BASE_URL or None,
+                max_retries=0,
+                http_client=GroqHttpClient(
+                    limits=self._limits(),
+                    timeout=settings.HTTP_TIMEOUT_SECONDS
+                )
+            )
+        if self._anthropic is None:
+            self._anthropic = AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                base_url=settings.ANTHROPIC_BASE_URL or None,
+                max_retries=0,
+                http_client=AnthropicHttpClient(
+                    limits=self._limits(),
+                    timeout=settings.HTTP_TIMEOUT_SECONDS
+                )
+            )
+        logger.info(f"🔌 Provider clients ready (max {settings.HTTP_MAX_CONNECTIONS} connections)")
+
+    async def warmup(self) -> dict:
+        """
+        Pre-open pooled connections with cheap authenticated calls (model listings),
+        so the first real request skips DNS and TLS. Failures are logged, never raised.
+        """
+        started = time.perf_counter()
+        
+        async def ping(client):
+            return await client.models.list()
+        
+        async def warm(name: str, client) -> dict:
+            provider_started = time.perf_counter()
+            # Concurrent calls each take their own connection, leaving that many in the pool
+            results = await asyncio.gather(
+                *(asyncio.wait_for(ping(client), settings.PROVIDER_WARMUP_TIMEOUT_SECONDS)
+                  for _ in range(settings.PROVIDER_WARMUP_CONNECTIONS)),
+                return_exceptions=True
+            )
+            errors = [r for r in results if isinstance(r, BaseException)]
+            if errors:
+                logger.warning(f"🔥 {name} warmup: {len(errors)}/{len(results)} failed ({type(errors[0]).__name__})")
+            return {
+                "connections": len(results) - len(errors),
+                "failed": len(errors),
+                "ms": round((time.perf_counter() - provider_started) * 1000, 1)
+            }
+        
+        groq, anthropic = await asyncio.gather(
+            warm("Groq", self.groq),
+            warm("Anthropic", self.anthropic)
+        )
+        self.warmup_stats = {
+            "groq": groq,
+            "anthropic": anthropic,
+            "ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        logger.info(f"🔥 Provider warmup finished in {self.warmup_stats['ms']:.0f}ms")
+        return self.warmup_stats
+
+    async def close(self):
+        for client in (self._groq, self._anthropic):
+            if client is not None:
+                await client.close()
+        self._groq = None
+        self._anthropic = None
+        logger.info("🔌 Provider clients closed")
+
+    @property
+    def groq(self) -> AsyncGroq:
+        # Opened lazily when used outside the app lifespan (scripts, benchmarks)
+        if self._groq is None:
+            self.open()
+        return self._groq
+
+    @groq.setter
+    def groq(self, client):
+        self._groq = client
+
+    @property
+    def anthropic(self) -> AsyncAnthropic:
+        if self._anthropic is None:
+            self.open()
+        return self._anthropic
+
+    @anthropic.setter
+    def anthropic(self, client):
+        self._anthropic = client
+
+provider_clients = ProviderClients()
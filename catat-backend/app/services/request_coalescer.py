@@ -0,0 +1,115 @@
+from app.models.letter import Language, LetterType, ContactOverrides
+from app.services.telemetry import provider_calls, request_timings, COALESCED_REQUESTS, COALESCED_CALLS_SAVED
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+def generation_key(
+    audio_bytes: bytes,
+    language: Language,
+    letter_type: LetterType,
+    overrides: ContactOverrides,
+    latency_budget_seconds: Optional[float] = None
+) -> str:
+    """Audio hash plus the form fields, whitespace-normalized so retyped-identical forms match"""
+    fields = {
+        name: (" ".join(value.split()) or None) if isinstance(value, str) else value
+        for name, value in overrides.model_dump().items()
+    }
+    form = json.dumps(
+        [language.value, letter_type.value, fields, latency_budget_seconds],
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(audio_bytes + b"\0" + form.encode("utf-8")).hexdigest()
+
+class _Flight:
+    def __init__(self, task: asyncio.Task, calls: Counter):
+        self.task = task
+        self.calls = calls
+        self.waiters = 0
+
+class RequestCoalescer:
+    """
+    Joins concurrent identical requests onto one pipeline run.
+    The first request for a key starts the pipeline as a task; identical requests
+    arriving while it runs await the same task and get its result or its error.
+    The run is cancelled and its key released once every waiter has gone away.
+
+    Followers get the leader's response object itself, so they share its
+    generation_id and letter_id: one session and one stored letter per run.
+    Stage timings are recorded on the leader's request only; a follower's
+    Server-Timing has a single "coalesced" entry for the time it waited.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.calls_saved: Counter = Counter()
+
+    @staticmethod
+    async def _counted(factory: Callable[[], Awaitable[T]], calls: Counter) -> T:
+        # Runs inside the task's own context copy, so only this pipeline's calls are counted
+        provider_calls.set(calls)
+        return await factory()
+
+    def _release(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _finished(self, key: str, flight: _Flight, task: asyncio.Task):
+        self._release(key, flight)
+        # Waiters re-raise it themselves; this only stops asyncio warning when none are left
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            calls = Counter()
+            flight = _Flight(asyncio.create_task(self._counted(factory, calls)), calls)
+            flight.task.add_done_callback(lambda task: self._finished(key, flight, task))
+            self._flights[key] = flight
+            self.leaders += 1
+        else:
+            self.followers += 1
+            COALESCED_REQUESTS.inc()
+            logger.info(f"🔗 Joined in-flight generation {key[:12]} ({flight.waiters} already waiting)")
+
+        flight.waiters += 1
+        joined = time.perf_counter()
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            timings = request_timings.get()
+            if not leader and timings is not None:
+                timings.append(("coalesced", time.perf_counter() - joined))
+            if not flight.task.done() and flight.waiters == 0:
+                # Everyone disconnected: stop paying for a result nobody will read
+                logger.info(f"🛑 Cancelling generation {key[:12]}, no requests left waiting")
+                self._release(key, flight)
+                flight.task.cancel()
+            elif not leader and flight.task.done() and not flight.task.cancelled():
+                for stage, count in flight.calls.items():
+                    self.calls_saved[stage] += count
+                    COALESCED_CALLS_SAVED.inc(count, stage=stage)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "calls_saved": dict(self.calls_saved)
+        }
+
+request_coalescer = RequestCoalescer()
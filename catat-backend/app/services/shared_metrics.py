@@ -0,0 +1,72 @@
+from app.config import settings
+from app.services.shared_state import SharedState, shared_state
+from app.services.telemetry import registry
+from app.utils.metrics import Registry
+from typing import Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+class SharedMetrics:
+    """
+    Each worker publishes a snapshot of its metrics to the shared state on an
+    interval (and whenever it serves /metrics); /metrics then sums the fresh
+    snapshots of every other worker into its own, so one scrape covers all workers.
+    """
+
+    HASH = "metrics:workers"
+
+    def __init__(self, registry: Registry, store: SharedState, interval_seconds: float):
+        self.registry = registry
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def publish(self):
+        snapshot = {"at": time.time(), "samples": self.registry.snapshot()}
+        await self.store.hset(self.HASH, self.worker_id, json.dumps(snapshot).encode("utf-8"))
+
+    async def _others(self) -> List[Dict[str, list]]:
+        snapshots = []
+        stale_before = time.time() - 3 * self.interval_seconds
+        for worker_id, raw in (await self.store.hgetall(self.HASH)).items():
+            if worker_id == self.worker_id:
+                continue
+            snapshot = json.loads(raw)
+            if snapshot["at"] < stale_before:
+                # Worker exited (or restarted under a new pid)
+                await self.store.hdel(self.HASH, worker_id)
+                continue
+            snapshots.append(snapshot["samples"])
+        return snapshots
+
+    async def render(self) -> str:
+        if not self.store.shared:
+            return self.registry.render()
+        await self.publish()
+        return self.registry.render(await self._others())
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.publish()
+            except Exception as e:
+                logger.warning(f"Metrics publish skipped: {e}")
+
+    def start(self):
+        if self.store.shared and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await self.store.hdel(self.HASH, self.worker_id)
+shared_metrics = SharedMetrics(registry, shared_state, settings.SHARED_METRICS_INTERVAL_SECONDS)
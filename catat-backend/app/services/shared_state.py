@@ -0,0 +1,389 @@
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.services.telemetry import SHARED_STATE_SECONDS, SHARED_STATE_ERRORS
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # redis is optional; only the redis backend needs it
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Spend one token; returns 0 on success or the seconds until one is available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+class SharedState:
+    """
+    Key-value, token-bucket and hash storage that uvicorn workers can share.
+    Every operation is timed and bounded by SHARED_STATE_TIMEOUT_MS; a slow or
+    failed backend degrades to a cache miss or an unanswered token request, never an error.
+    """
+
+    name = "base"
+    # False for the in-process backend: tiered caches skip their second level
+    shared = True
+    # False when a timed-out call would keep running anyway (a thread can't be
+    # cancelled); such backends bound their own calls instead
+    cancellable = True
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout_seconds = timeout_seconds
+        self.ops = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    async def _run(self, op: str, coro, default=None):
+        started = time.perf_counter()
+        try:
+            if not self.cancellable:
+                return await coro
+            return await asyncio.wait_for(coro, self.timeout_seconds)
+        except Exception as e:
+            self.errors += 1
+            SHARED_STATE_ERRORS.inc(backend=self.name, op=op, error=type(e).__name__)
+            logger.warning(f"Shared state {op} skipped ({self.name}): {type(e).__name__}: {e}")
+            return default
+        finally:
+            elapsed = time.perf_counter() - started
+            self.ops += 1
+            self.total_ms += elapsed * 1000
+            self.max_ms = max(self.max_ms, elapsed * 1000)
+            SHARED_STATE_SECONDS.observe(elapsed, backend=self.name, op=op)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run("get", self._get(key))
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float):
+        await self._run("set", self._set(key, value, ttl_seconds))
+
+    async def take_token(self, key: str, capacity: float, refill_per_second: float) -> Optional[float]:
+        """Seconds until a token is available, 0 when one was taken, None when the backend failed"""
+        return await self._run("take_token", self._take_token(key, capacity, refill_per_second))
+
+    async def hset(self, name: str, field: str, value: bytes):
+        await self._run("hset", self._hset(name, field, value))
+
+    async def hgetall(self, name: str) -> Dict[str, bytes]:
+        return await self._run("hgetall", self._hgetall(name), default={})
+
+    async def hdel(self, name: str, field: str):
+        await self._run("hdel", self._hdel(name, field))
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "ops": self.ops,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.ops, 3) if self.ops else 0.0,
+            "max_ms": round(self.max_ms, 3)
+        }
+
+class MemoryState(SharedState):
+    """Per-process state, the single-worker default"""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self, timeout_seconds: float, max_keys: int = 10000):
+        super().__init__(timeout_seconds)
+        self.values = TTLCache(max_size=max_keys, ttl_seconds=float("inf"))
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._hashes: Dict[str, Dict[str, bytes]] = {}
+
+    async def _get(self, key):
+        entry = self.values.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    async def _set(self, key, value, ttl_seconds):
+        self.values.set(key, (value, time.monotonic() + ttl_seconds))
+
+    async def _take_token(self, key, capacity, refill_per_second):
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(capacity, refill_per_second, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(now)
+
+    async def _hset(self, name, field, value):
+        self._hashes.setdefault(name, {})[field] = value
+
+    async def _hgetall(self, name):
+        return dict(self._hashes.get(name, {}))
+
+    async def _hdel(self, name, field):
+        self._hashes.get(name, {}).pop(field, None)
+
+    # Per-process already; no need to time or guard these
+    async def take_token(self, key: str, capacity: float, refill_per_second: float) -> Optional[float]:
+        return await self._take_token(key, capacity, refill_per_second)
+
+class SQLiteState(SharedState):
+    """
+    One SQLite file (WAL mode) shared by every worker on the box.
+    Each process keeps one connection; token buckets update inside an immediate transaction.
+    Calls run in a thread, so they aren't cut off at the operation timeout; the
+    timeout given here is SQLite's busy timeout, which bounds the wait for
+    another worker's write lock.
+    """
+
+    name = "sqlite"
+    cancellable = False
+    PURGE_EVERY = 1000
+
+    def __init__(self, timeout_seconds: float, path: str):
+        super().__init__(timeout_seconds)
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=self.timeout_seconds, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS kv "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, idle_after REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS hashes "
+                "(name TEXT NOT NULL, field TEXT NOT NULL, value BLOB NOT NULL, PRIMARY KEY (name, field))"
+            )
+            self._db = db
+        return self._db
+
+    def _call(self, func: Callable[[sqlite3.Connection], Any]):
+        with self._lock:
+            return func(self._connect())
+
+    def _purge(self, db: sqlite3.Connection, now: float):
+        # Amortized cleanup; full buckets carry no state, so idle ones can go
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            db.execute("DELETE FROM kv WHERE expires_at < ?", (now,))
+            db.execute("DELETE FROM buckets WHERE updated + idle_after < ?", (now,))
+
+    async def _get(self, key):
+        def get(db):
+            row = db.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+            return row[0] if row is not None and row[1] >= time.time() else None
+        return await asyncio.to_thread(self._call, get)
+
+    async def _set(self, key, value, ttl_seconds):
+        def put(db):
+            now = time.time()
+            db.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl_seconds)
+            )
+            self._purge(db, now)
+        await asyncio.to_thread(self._call, put)
+
+    async def _take_token(self, key, capacity, refill_per_second):
+        def take(db):
+            now = time.time()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                bucket = TokenBucket(capacity, refill_per_second, now)
+                if row is not None:
+                    bucket.tokens, bucket.updated = row
+                wait = bucket.take(now)
+                db.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated, idle_after) VALUES (?, ?, ?, ?)",
+                    (key, bucket.tokens, bucket.updated, capacity / refill_per_second)
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._purge(db, now)
+            return wait
+        return await asyncio.to_thread(self._call, take)
+
+    async def _hset(self, name, field, value):
+        await asyncio.to_thread(self._call, lambda db: db.execute(
+            "INSERT OR REPLACE INTO hashes (name, field, value) VALUES (?, ?, ?)", (name, field, value)
+        ))
+
+    async def _hgetall(self, name):
+        rows = await asyncio.to_thread(self._call, lambda db: db.execute(
+            "SELECT field, value FROM hashes WHERE name = ?", (name,)
+        ).fetchall())
+        return {field: value for field, value in rows}
+
+    async def _hdel(self, name, field):
+        await asyncio.to_thread(self._call, lambda db: db.execute(
+            "DELETE FROM hashes WHERE name = ? AND field = ?", (name, field)
+        ))
+
+    async def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+# Runs atomically inside Redis; the caller passes its clock so every worker agrees on "now"
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+class RedisState(SharedState):
+    """Redis (or anything speaking its protocol) for workers on one or more boxes"""
+
+    name = "redis"
+
+    def __init__(self, timeout_seconds: float, url: str, prefix: str = "catat:"):
+        super().__init__(timeout_seconds)
+        if aioredis is None:
+            raise RuntimeError("SHARED_STATE_BACKEND=redis needs the redis package")
+        self.prefix = prefix
+        # RESP2 keeps replies plain (HGETALL as pairs) and works with older servers and Redis-compatible stores
+        self.client = aioredis.from_url(
+            url, protocol=2, socket_timeout=timeout_seconds, max_connections=settings.HTTP_MAX_CONNECTIONS
+        )
+        self._take = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def _get(self, key):
+        return await self.client.get(self.prefix + key)
+
+    async def _set(self, key, value, ttl_seconds):
+        await self.client.set(self.prefix + key, value, px=max(1, int(ttl_seconds * 1000)))
+
+    async def _take_token(self, key, capacity, refill_per_second):
+        wait = await self._take(keys=[self.prefix + "bucket:" + key], args=[capacity, refill_per_second, time.time()])
+        return float(wait)
+
+    async def _hset(self, name, field, value):
+        await self.client.hset(self.prefix + name, field, value)
+
+    async def _hgetall(self, name):
+        values = await self.client.hgetall(self.prefix + name)
+        return {field.decode(): value for field, value in values.items()}
+
+    async def _hdel(self, name, field):
+        await self.client.hdel(self.prefix + name, field)
+
+    async def close(self):
+        await self.client.aclose()
+
+def create_shared_state() -> SharedState:
+    timeout = settings.SHARED_STATE_TIMEOUT_MS / 1000
+    backend = settings.SHARED_STATE_BACKEND
+    if backend == "sqlite":
+        return SQLiteState(settings.SHARED_STATE_SQLITE_BUSY_TIMEOUT_MS / 1000, settings.SHARED_STATE_SQLITE_PATH)
+    if backend == "redis":
+        return RedisState(timeout, settings.SHARED_STATE_REDIS_URL)
+    if backend != "memory":
+        raise ValueError(f"Unknown SHARED_STATE_BACKEND: {backend}")
+    return MemoryState(timeout)
+
+class TieredCache(Generic[T]):
+    """
+    Per-process TTLCache in front of the shared state, so workers reuse each
+    other's results. Values cross the process boundary through encode/decode.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int,
+        ttl_seconds: float,
+        store: Optional[SharedState],
+        encode: Callable[[T], bytes],
+        decode: Callable[[bytes], T]
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.memory = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        # The in-process backend would only duplicate the memory tier
+        self.store = store if store is not None and store.shared else None
+        self.encode = encode
+        self.decode = decode
+        self.shared_hits = 0
+
+    async def get(self, key: str) -> Optional[T]:
+        value = self.memory.get(key)
+        if value is not None or self.store is None:
+            return value
+
+        raw = await self.store.get(f"{self.namespace}:{key}")
+        if raw is None:
+            return None
+        try:
+            value = self.decode(raw)
+        except Exception as e:
+            logger.warning(f"Dropped unreadable {self.namespace} entry: {e}")
+            return None
+        # Promote to memory; the memory tier already counted this lookup as a miss
+        self.shared_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: T):
+        self.memory.set(key, value)
+        if self.store is not None:
+            await self.store.set(f"{self.namespace}:{key}", self.encode(value), self.ttl_seconds)
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        stats["shared_hits"] = self.shared_hits
+        stats["misses"] = stats["misses"] - self.shared_hits
+        stats["hits"] = stats["hits"] + self.shared_hits
+        stats["shared"] = self.store.name if self.store is not None else None
+        return stats
+
+shared_state = create_shared_state()
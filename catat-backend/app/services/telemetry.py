@@ -0,0 +1,178 @@
+from app.utils.metrics import Registry
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import List, Optional, Tuple
+import time
+
+registry = Registry()
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 30, 60)
+
+STAGE_SECONDS = registry.histogram(
+    "catat_stage_duration_seconds", "Pipeline stage wall time, cache hits included",
+    ["stage"], LATENCY_BUCKETS
+)
+PROVIDER_SECONDS = registry.histogram(
+    "catat_provider_call_duration_seconds", "Upstream provider call latency",
+    ["stage", "provider", "model"], LATENCY_BUCKETS
+)
+PROVIDER_ERRORS = registry.counter(
+    "catat_provider_errors_total", "Failed upstream provider calls",
+    ["stage", "provider", "model", "error"]
+)
+LLM_TOKENS = registry.counter(
+    "catat_llm_tokens_total", "Tokens reported in provider usage fields",
+    ["provider", "model", "direction"]
+)
+AUDIO_BYTES = registry.histogram(
+    "catat_audio_upload_bytes", "Size of accepted audio uploads",
+    buckets=(16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216, 33_554_432)
+)
+AUDIO_SECONDS = registry.histogram(
+    "catat_audio_duration_seconds", "Audio duration billed by Whisper",
+    buckets=(5, 10, 30, 60, 120, 300, 600, 1200)
+)
+LETTER_REPAIRS = registry.counter(
+    "catat_letter_repairs_total", "Deviations from the letter schema found in model output",
+    ["issue"]
+)
+STRUCTURE_OUTCOMES = registry.counter(
+    "catat_structure_outcomes_total", "LLM structuring results: valid, coerced, repaired or fallback",
+    ["outcome"]
+)
+STRUCTURE_PATH = registry.counter(
+    "catat_structure_path_total", "How structuring requests were served",
+    ["path"]
+)
+LETTER_REVISIONS = registry.counter(
+    "catat_letter_revisions_total", "Revisions of stored generations by what was rerun",
+    ["mode"]
+)
+COALESCED_REQUESTS = registry.counter(
+    "catat_coalesced_requests_total", "Requests answered by joining an identical in-flight pipeline"
+)
+COALESCED_CALLS_SAVED = registry.counter(
+    "catat_coalesced_calls_saved_total", "Upstream calls avoided by coalesced requests",
+    ["stage"]
+)
+SHARED_STATE_SECONDS = registry.histogram(
+    "catat_shared_state_duration_seconds", "Shared state backend operation latency",
+    ["backend", "op"], (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+)
+SHARED_STATE_ERRORS = registry.counter(
+    "catat_shared_state_errors_total", "Shared state operations that failed or timed out",
+    ["backend", "op", "error"]
+)
+RATE_LIMIT_FAIL_OPEN = registry.counter(
+    "catat_rate_limit_fail_open_total", "Requests let through because the rate limit store didn't answer"
+)
+LETTER_WRITES = registry.counter(
+    "catat_letter_writes_total", "Generated letters by persistence outcome: queued, written, dropped or failed",
+    ["result"]
+)
+LETTER_WRITE_BATCH = registry.histogram(
+    "catat_letter_write_batch_rows", "Rows per letter persistence batch",
+    buckets=(1, 2, 5, 10, 25, 50, 100)
+)
+LETTER_WRITE_SECONDS = registry.histogram(
+    "catat_letter_write_duration_seconds", "Letter persistence batch write latency",
+    ["backend"], (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+LETTER_WRITE_QUEUE = registry.gauge(
+    "catat_letter_write_queue_rows", "Letters waiting to be persisted"
+)
+PROFILES = registry.counter(
+    "catat_request_profiles_total", "Requests profiled, by what triggered the profile",
+    ["trigger"]
+)
+CACHE_REQUESTS = registry.counter(
+    "catat_cache_requests_total", "Cache lookups by result",
+    ["cache", "result"]
+)
+HTTP_REQUESTS = registry.counter(
+    "catat_http_requests_total", "Completed HTTP requests",
+    ["method", "status"]
+)
+HTTP_SECONDS = registry.histogram(
+    "catat_http_request_duration_seconds", "HTTP request wall time",
+    ["method"], LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "catat_http_requests_in_flight", "HTTP requests currently being handled"
+)
+PROVIDER_IN_FLIGHT = registry.gauge(
+    "catat_provider_calls_in_flight", "Upstream calls currently holding a limiter slot",
+    ["provider"]
+)
+PROVIDER_CONCURRENCY_LIMIT = registry.gauge(
+    "catat_provider_concurrency_limit", "Current adaptive concurrency limit",
+    ["provider"]
+)
+
+# (stage, seconds) pairs for the current request, reported in Server-Timing
+request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+# stage → upstream calls made by the current pipeline run, when something is counting
+provider_calls: ContextVar[Optional[Counter]] = ContextVar("provider_calls", default=None)
+
+@contextmanager
+def track_stage(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def timed_stage(stage: str):
+    """Decorator form of track_stage for async service methods"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track_stage(stage):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def track_call(stage: str, provider: str, model: str):
+    started = time.perf_counter()
+    calls = provider_calls.get()
+    if calls is not None:
+        calls[stage] += 1
+    try:
+        yield
+    except Exception as e:
+        PROVIDER_ERRORS.inc(stage=stage, provider=provider, model=model, error=type(e).__name__)
+        raise
+    finally:
+        PROVIDER_SECONDS.observe(time.perf_counter() - started, stage=stage, provider=provider, model=model)
+
+def record_tokens(provider: str, model: str, usage):
+    """
+    Accepts Groq (prompt/completion) and Anthropic (input/output) usage objects.
+    Anthropic prompt cache reads and writes are counted under their own directions.
+    """
+    if usage is None:
+        return
+    input_tokens = getattr(usage, "input_tokens", None) or getattr(usage, "prompt_tokens", None)
+    output_tokens = getattr(usage, "output_tokens", None) or getattr(usage, "completion_tokens", None)
+    cache_read = getattr(usage, "cache_read_input_tokens", None)
+    cache_creation = getattr(usage, "cache_creation_input_tokens", None)
+    if input_tokens:
+        LLM_TOKENS.inc(input_tokens, provider=provider, model=model, direction="input")
+    if output_tokens:
+        LLM_TOKENS.inc(output_tokens, provider=provider, model=model, direction="output")
+    if cache_read:
+        LLM_TOKENS.inc(cache_read, provider=provider, model=model, direction="cache_read")
+    if cache_creation:
+        LLM_TOKENS.inc(cache_creation, provider=provider, model=model, direction="cache_creation")
+
+def server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
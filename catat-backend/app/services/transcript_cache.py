@@ -0,0 +1,41 @@
+from app.config import settings
+from app.services.shared_state import SharedState, SQLiteState, TieredCache, shared_state
+from typing import Optional
+import hashlib
+
+class TranscriptCache(TieredCache[str]):
+    """
+    Content-addressed transcript cache.
+    Memory LRU tier in front of the shared state (or a dedicated SQLite file when
+    TRANSCRIPT_CACHE_DB_PATH is set), so transcripts survive restarts and are
+    reused across workers.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, store: Optional[SharedState] = None):
+        super().__init__(
+            "transcript",
+            max_size=max_size,
+            ttl_seconds=ttl_seconds,
+            store=store,
+            encode=lambda transcript: transcript.encode("utf-8"),
+            decode=lambda raw: raw.decode("utf-8")
+        )
+
+    @staticmethod
+    def key(audio_bytes: bytes, language: str, model: str) -> str:
+        digest = hashlib.sha256(audio_bytes).hexdigest()
+        return f"{model}:{language}:{digest}"
+
+    async def close(self):
+        # The app-wide shared state is closed by the lifespan; a dedicated file is ours
+        if self.store is not None and self.store is not shared_state:
+            await self.store.close()
+
+transcript_cache = TranscriptCache(
+    max_size=settings.TRANSCRIPT_CACHE_SIZE,
+    ttl_seconds=settings.TRANSCRIPT_CACHE_TTL_SECONDS,
+    store=(
+        SQLiteState(settings.SHARED_STATE_SQLITE_BUSY_TIMEOUT_MS / 1000, settings.TRANSCRIPT_CACHE_DB_PATH)
+        if settings.TRANSCRIPT_CACHE_DB_PATH else shared_state
+    )
+)
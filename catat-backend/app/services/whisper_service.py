@@ -1,17 +1,29 @@
-from groq import Groq
 from app.config import settings
+from app.services.provider_clients import provider_clients
+from app.services.transcript_cache import transcript_cache
+from app.services.long_audio import may_be_long, split_long_audio, stitch_transcripts
+from app.services.audio_preprocessor import audio_preprocessor
+from app.services.adaptive_limiter import whisper_limiter
+from app.services.model_router import record_model
+from app.services.telemetry import timed_stage, track_call, AUDIO_SECONDS
 from fastapi import HTTPException
+from functools import lru_cache
+from typing import List, Tuple
+import asyncio
 import logging
-import tempfile
-import os
 
 logger = logging.getLogger(__name__)
 
 class WhisperService:
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
         self.model = "whisper-large-v3"
+        self.cache = transcript_cache
     
+    @property
+    def client(self):
+        return provider_clients.groq
+    
+    @timed_stage("transcribe")
     async def transcribe_audio(
         self, 
         audio_bytes: bytes, 
@@ -20,43 +32,52 @@ class WhisperService:
     ) -> str:
         """
         Transcribe audio using Groq Whisper
+        Identical audio (same bytes, language and model) is served from cache
         """
+        cache_key = self.cache.key(audio_bytes, language, self.model)
+        cached = await self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Transcript cache hit: {len(cached)} characters")
+            record_model("transcribe", self.model)
+            return cached
+        
         try:
-            logger.info(f"🎙️ Transcribing with Groq Whisper (model: {self.model})")
+            audio_bytes, filename = await audio_preprocessor.process(audio_bytes, filename)
+            
+            segments = None
+            if settings.LONG_AUDIO_ENABLED and may_be_long(
+                len(audio_bytes), filename, settings.LONG_AUDIO_THRESHOLD_SECONDS
+            ):
+                # Decoding and the energy scan hold the GIL; in a thread they would stall the event loop
+                segments = await audio_preprocessor.run(
+                    split_long_audio,
+                    audio_bytes,
+                    settings.LONG_AUDIO_THRESHOLD_SECONDS,
+                    settings.LONG_AUDIO_SEGMENT_SECONDS,
+                    settings.LONG_AUDIO_OVERLAP_SECONDS
+                )
+            
+            if segments:
+                transcript = await self._transcribe_segments(segments, language)
+            else:
+                transcript = await self._transcribe_once(
+                    audio_bytes, language, f"recording{self._get_extension(filename)}"
+                )
             
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=self._get_extension(filename)) as temp_file:
-                temp_file.write(audio_bytes)
-                temp_file_path = temp_file.name
+            if not transcript or len(transcript.strip()) < 5:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Transcription too short. Please record more details."
+                )
             
-            try:
-                # Transcribe
-                with open(temp_file_path, "rb") as audio_file:
-                    transcription = self.client.audio.transcriptions.create(
-                        file=audio_file,
-                        model=self.model,
-                        language=language if language != "mixed" else "en",
-                        response_format="text",
-                        temperature=0.0
-                    )
-                
-                transcript = transcription if isinstance(transcription, str) else transcription.text
-                
-                if not transcript or len(transcript.strip()) < 5:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Transcription too short. Please record more details."
-                    )
-                
-                logger.info(f"✅ Transcription successful: {len(transcript)} characters")
-                return transcript.strip()
-                
-            finally:
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
-                
+            logger.info(f"✅ Transcription successful: {len(transcript)} characters")
+            transcript = transcript.strip()
+            await self.cache.set(cache_key, transcript)
+            record_model("transcribe", self.model)
+            return transcript
+            
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"❌ Transcription failed: {str(e)}")
             
@@ -67,9 +88,49 @@ class WhisperService:
             else:
                 raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
     
+    async def _transcribe_once(self, audio_bytes: bytes, language: str, filename: str) -> str:
+        logger.info(f"🎙️ Transcribing with Groq Whisper (model: {self.model})")
+        
+        # Upload straight from memory; no temp file round trip
+        async def call():
+            with track_call("transcribe", "groq", self.model):
+                return await self.client.audio.transcriptions.create(
+                    file=(filename, audio_bytes),
+                    model=self.model,
+                    language=language if language != "mixed" else "en",
+                    # verbose_json reports the billed audio duration alongside the text
+                    response_format="verbose_json",
+                    temperature=0.0
+                )
+        
+        transcription = await whisper_limiter.run(call)
+        if isinstance(transcription, str):
+            return transcription
+        
+        duration = getattr(transcription, "duration", None)
+        if duration:
+            AUDIO_SECONDS.observe(float(duration))
+        return transcription.text
+    
+    async def _transcribe_segments(self, segments: List[Tuple[bytes, str]], language: str) -> str:
+        """Transcribe overlapping segments concurrently and stitch them in order"""
+        semaphore = asyncio.Semaphore(settings.LONG_AUDIO_MAX_CONCURRENCY)
+        
+        async def transcribe(index: int, segment: bytes, extension: str) -> str:
+            async with semaphore:
+                return await self._transcribe_once(segment, language, f"segment{index}{extension}")
+        
+        parts = await asyncio.gather(*(
+            transcribe(i, segment, extension) for i, (segment, extension) in enumerate(segments)
+        ))
+        return stitch_transcripts([part.strip() for part in parts])
+    
     def _get_extension(self, filename: str) -> str:
         if '.' in filename:
             return '.' + filename.split('.')[-1]
         return '.webm'
 
-whisper_service = WhisperService()
\ No newline at end of file
+# Built on first use (the app lifespan does that at startup); routers take it via Depends
+@lru_cache()
+def get_whisper_service() -> WhisperService:
+    return WhisperService()
\ No newline at end of file
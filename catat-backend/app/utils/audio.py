@@ -0,0 +1,149 @@
+"""
+PCM helpers for server-side audio work (long-audio splitting, preprocessing).
+All functions are synchronous and CPU-bound; call them from a worker process or thread.
+"""
+from array import array
+from typing import List, Optional, Tuple
+import io
+import math
+
+try:
+    import av
+except ImportError:  # PyAV is optional; audio features switch off without it
+    av = None
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # s16le mono
+
+def audio_available() -> bool:
+    return av is not None
+
+def probe_duration(audio_bytes: bytes) -> Optional[float]:
+    """
+    Duration in seconds without decoding: from the container metadata, or
+    for containers that don't record one (MediaRecorder WebM) from the last
+    packet's timestamp, which only needs the packets demuxed.
+    None when neither is available.
+    """
+    with av.open(io.BytesIO(audio_bytes)) as container:
+        if container.duration:
+            return container.duration / av.time_base
+        stream = next(iter(container.streams.audio), None)
+        if stream is None or not stream.time_base:
+            return None
+        if stream.duration:
+            return float(stream.duration * stream.time_base)
+        end = None
+        for packet in container.demux(stream):
+            if packet.pts is not None:
+                end = max(end or 0, packet.pts + (packet.duration or 0))
+        return float(end * stream.time_base) if end else None
+
+def decode_pcm(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Decode any container/codec PyAV understands to 16-bit mono PCM"""
+    pcm = bytearray()
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+    with av.open(io.BytesIO(audio_bytes)) as container:
+        for frame in container.decode(audio=0):
+            for out in resampler.resample(frame):
+                pcm += bytes(out.planes[0])[:out.samples * SAMPLE_WIDTH]
+    for out in resampler.resample(None):
+        pcm += bytes(out.planes[0])[:out.samples * SAMPLE_WIDTH]
+    return bytes(pcm)
+
+def encode_pcm(pcm: bytes, sample_rate: int = SAMPLE_RATE, codec: str = "flac") -> Tuple[bytes, str]:
+    """Encode 16-bit mono PCM as FLAC or Opus; returns (bytes, file extension)"""
+    opus = codec == "opus"
+    container_format, extension = ("ogg", ".ogg") if opus else ("flac", ".flac")
+
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format=container_format) as container:
+        # libopus accepts 16 kHz directly; 24 kbps is plenty for speech
+        stream = container.add_stream("libopus" if opus else "flac", rate=sample_rate, layout="mono")
+        if opus:
+            stream.codec_context.bit_rate = 24000
+        frame_samples = stream.codec_context.frame_size or 4096
+        step = frame_samples * SAMPLE_WIDTH
+        pts = 0
+        for offset in range(0, len(pcm), step):
+            chunk = pcm[offset:offset + step]
+            samples = len(chunk) // SAMPLE_WIDTH
+            if samples < frame_samples and opus:
+                # Opus has a fixed frame size, so pad the last frame with silence
+                chunk = chunk + b"\x00" * ((frame_samples - samples) * SAMPLE_WIDTH)
+                samples = frame_samples
+            frame = av.AudioFrame(format="s16", layout="mono", samples=samples)
+            frame.planes[0].update(chunk)
+            frame.sample_rate = sample_rate
+            frame.pts = pts
+            pts += samples
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue(), extension
+
+def pcm_duration(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> float:
+    return len(pcm) / (SAMPLE_WIDTH * sample_rate)
+
+def frame_energies(pcm: bytes, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30, stride: int = 4) -> List[float]:
+    """
+    RMS level per frame. Every `stride`-th sample is enough to tell speech
+    from silence and keeps this pure-Python loop cheap.
+    """
+    samples = array("h")
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % SAMPLE_WIDTH])
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+
+    energies = []
+    for start in range(0, len(samples), frame_len):
+        frame = samples[start:start + frame_len:stride]
+        if frame:
+            energies.append(math.sqrt(sum(x * x for x in frame) / len(frame)))
+    return energies
+
+def find_silences(
+    energies: List[float],
+    frame_ms: int = 30,
+    threshold: float = 500.0,
+    min_silence_ms: int = 300
+) -> List[Tuple[float, float]]:
+    """(start, end) seconds of runs quieter than `threshold` lasting at least `min_silence_ms`"""
+    silences = []
+    min_frames = max(1, min_silence_ms // frame_ms)
+    run_start = None
+
+    for i, energy in enumerate(energies + [threshold]):
+        if energy < threshold:
+            if run_start is None:
+                run_start = i
+        elif run_start is not None:
+            if i - run_start >= min_frames:
+                silences.append((run_start * frame_ms / 1000, i * frame_ms / 1000))
+            run_start = None
+    return silences
+
+def slice_pcm(pcm: bytes, start: float, end: float, sample_rate: int = SAMPLE_RATE) -> bytes:
+    first = int(start * sample_rate) * SAMPLE_WIDTH
+    last = int(end * sample_rate) * SAMPLE_WIDTH
+    return pcm[first:last]
+
+def trim_silence(
+    pcm: bytes,
+    sample_rate: int = SAMPLE_RATE,
+    frame_ms: int = 30,
+    threshold: float = 500.0,
+    pad_ms: int = 200
+) -> bytes:
+    """Drop leading and trailing frames quieter than `threshold`, keeping `pad_ms` either side"""
+    energies = frame_energies(pcm, sample_rate, frame_ms)
+    voiced = [i for i, energy in enumerate(energies) if energy >= threshold]
+    if not voiced:
+        # Nothing above the threshold; let Whisper judge the recording as-is
+        return pcm
+
+    frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+    pad_bytes = sample_rate * pad_ms // 1000 * SAMPLE_WIDTH
+    start = max(0, voiced[0] * frame_bytes - pad_bytes)
+    end = min(len(pcm), (voiced[-1] + 1) * frame_bytes + pad_bytes)
+    return pcm[start:end]
@@ -0,0 +1,273 @@
+"""
+Letter HTML to A4 PDF/DOCX in Malaysian format: sender block, rule, recipient
+block, date, salutation, bold underlined subject, justified body, closing and
+signature. All functions are synchronous and CPU-bound; call them from a worker.
+"""
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+from xml.sax.saxutils import escape
+import io
+import re
+import zipfile
+
+try:
+    from reportlab.lib.enums import TA_JUSTIFY, TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import mm
+    from reportlab.platypus import HRFlowable, Paragraph, SimpleDocTemplate, Spacer
+except ImportError:  # reportlab is optional; PDF rendering switches off without it
+    A4 = None
+
+# Bump whenever the layout below changes so cached renders are not reused
+TEMPLATE_VERSION = "1"
+
+MARGIN_MM = 25
+FONT_SIZE = 11
+
+SUBJECT_PREFIXES = ("subject:", "perkara:", "re:", "rujukan:")
+SALUTATIONS = {"dear sir/madam,", "dear sir or madam,", "dear sir,", "dear madam,", "tuan/puan,", "tuan/puan"}
+CLOSINGS = {"yours faithfully,", "yours sincerely,", "sekian, terima kasih.", "yang benar,", "yang ikhlas,"}
+LETTER_DATE = re.compile(r"^\d{1,2} [A-Za-z]{3,9} \d{4}$")
+
+LETTER_TYPE_NAMES = {
+    "complaint": "Complaint Letter",
+    "proposal": "Proposal",
+    "mc": "MC Letter",
+    "general": "General Letter",
+    "official": "Official Letter"
+}
+LANGUAGE_NAMES = {"en": "English", "ms": "Bahasa Malaysia", "mixed": "Mixed"}
+
+# Block kinds, in the order they appear on the page
+SENDER, RULE, RECIPIENT, DATE, SALUTATION, SUBJECT, BODY, CLOSING, SIGNATURE = (
+    "sender", "rule", "recipient", "date", "salutation", "subject", "body", "closing", "signature"
+)
+
+class _BlockParser(HTMLParser):
+    """Flattens letter HTML into paragraph texts and <hr> markers"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[Optional[str]] = []  # None marks an <hr>
+        self._text: List[str] = []
+
+    def _flush(self):
+        text = " ".join("".join(self._text).split())
+        if text:
+            self.blocks.append(text)
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "hr":
+            self._flush()
+            self.blocks.append(None)
+        elif tag in ("p", "div", "br", "li", "h1", "h2", "h3"):
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in ("p", "div", "li", "h1", "h2", "h3"):
+            self._flush()
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+def parse_letter(html: str) -> List[Tuple[str, str]]:
+    """Classify each paragraph of an assembled letter as (kind, text)"""
+    parser = _BlockParser()
+    parser.feed(html)
+    parser.close()
+
+    # Without a rule there is no reliable sender block; everything starts at the recipient
+    section = SENDER if None in parser.blocks else RECIPIENT
+    layout = []
+    for text in parser.blocks:
+        if text is None:
+            layout.append((RULE, ""))
+            section = RECIPIENT
+            continue
+
+        key = text.lower()
+        if section in (SENDER, RECIPIENT) and LETTER_DATE.match(text):
+            kind = DATE
+        elif section in (SENDER, RECIPIENT) and key in SALUTATIONS:
+            kind, section = SALUTATION, BODY
+        elif section == BODY and key.startswith(SUBJECT_PREFIXES) and not any(k == SUBJECT for k, _ in layout):
+            kind = SUBJECT
+        elif section in (BODY, CLOSING) and key in CLOSINGS:
+            kind, section = CLOSING, CLOSING
+        elif section == CLOSING:
+            kind, section = SIGNATURE, SIGNATURE
+        else:
+            kind = BODY if section == SIGNATURE else section
+        layout.append((kind, text))
+    return layout
+
+def footer_text(letter_type: str, language: str) -> str:
+    # No date here: the letter carries its own, and the render must be reproducible for caching
+    return (
+        f"Generated by Catat • {LETTER_TYPE_NAMES.get(letter_type, 'Letter')} • "
+        f"{LANGUAGE_NAMES.get(language, 'English')}"
+    )
+
+def pdf_available() -> bool:
+    return A4 is not None
+
+def render_pdf(html: str, letter_type: str, language: str) -> bytes:
+    """A4 PDF with 25 mm margins and a grey footer on every page"""
+    base = ParagraphStyle("letter", fontName="Helvetica", fontSize=FONT_SIZE, leading=FONT_SIZE * 1.4)
+    styles = {
+        SENDER: base,
+        RECIPIENT: base,
+        DATE: ParagraphStyle("date", base, alignment=TA_RIGHT, spaceBefore=4, spaceAfter=10),
+        SALUTATION: ParagraphStyle("salutation", base, spaceAfter=10),
+        SUBJECT: ParagraphStyle("subject", base, fontName="Helvetica-Bold", spaceAfter=10),
+        BODY: ParagraphStyle("body", base, alignment=TA_JUSTIFY, spaceAfter=8),
+        CLOSING: ParagraphStyle("closing", base, spaceBefore=4),
+        SIGNATURE: ParagraphStyle("signature", base, spaceBefore=28)
+    }
+
+    story = []
+    for kind, text in parse_letter(html):
+        if kind == RULE:
+            story += [Spacer(1, 4), HRFlowable(width="100%", thickness=0.5, color="black"), Spacer(1, 8)]
+            continue
+        markup = escape(text)
+        if kind == SUBJECT:
+            markup = f"<u>{markup}</u>"
+        story.append(Paragraph(markup, styles[kind]))
+
+    footer = footer_text(letter_type, language)
+
+    def draw_footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillGray(0.6)
+        canvas.drawCentredString(A4[0] / 2, 15 * mm, footer)
+        canvas.restoreState()
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=MARGIN_MM * mm,
+        rightMargin=MARGIN_MM * mm,
+        topMargin=MARGIN_MM * mm,
+        bottomMargin=MARGIN_MM * mm,
+        title="Letter",
+        creator="Catat",
+        invariant=True
+    )
+    doc.build(story, onFirstPage=draw_footer, onLaterPages=draw_footer)
+    return buffer.getvalue()
+
+# Minimal WordprocessingML package: just enough parts for Word, LibreOffice and Google Docs
+DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/footer1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.footer+xml"/>'
+    '</Types>'
+)
+DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+DOCX_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/footer" '
+    'Target="footer1.xml"/>'
+    '</Relationships>'
+)
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+R_NS = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+
+# Twentieths of a point; A4 is 11906 x 16838, 25 mm is 1417
+TWIPS_PER_MM = 56.7
+
+def _docx_paragraph(text: str, align: str = "left", bold: bool = False, underline: bool = False,
+                    after: int = 0, before: int = 0, size: int = FONT_SIZE, color: Optional[str] = None,
+                    border: bool = False) -> str:
+    props = f'<w:jc w:val="{align}"/><w:spacing w:before="{before * 20}" w:after="{after * 20}"/>'
+    if border:
+        props = '<w:pBdr><w:bottom w:val="single" w:sz="4" w:space="1" w:color="000000"/></w:pBdr>' + props
+    run = '<w:rFonts w:ascii="Arial" w:hAnsi="Arial" w:cs="Arial"/>'
+    run += "<w:b/>" if bold else ""
+    run += '<w:u w:val="single"/>' if underline else ""
+    run += f'<w:color w:val="{color}"/>' if color else ""
+    run += f'<w:sz w:val="{size * 2}"/>'
+    body = f'<w:r><w:rPr>{run}</w:rPr><w:t xml:space="preserve">{escape(text)}</w:t></w:r>' if text else ""
+    return f"<w:p><w:pPr>{props}</w:pPr>{body}</w:p>"
+
+def render_docx(html: str, letter_type: str, language: str) -> bytes:
+    """A4 DOCX with the same layout as the PDF"""
+    paragraphs = []
+    for kind, text in parse_letter(html):
+        if kind == RULE:
+            paragraphs.append(_docx_paragraph("", border=True, after=8))
+        elif kind == DATE:
+            paragraphs.append(_docx_paragraph(text, align="right", before=4, after=10))
+        elif kind == SALUTATION:
+            paragraphs.append(_docx_paragraph(text, after=10))
+        elif kind == SUBJECT:
+            paragraphs.append(_docx_paragraph(text, bold=True, underline=True, after=10))
+        elif kind == BODY:
+            paragraphs.append(_docx_paragraph(text, align="both", after=8))
+        elif kind == CLOSING:
+            paragraphs.append(_docx_paragraph(text, before=4))
+        elif kind == SIGNATURE:
+            paragraphs.append(_docx_paragraph(text, before=28))
+        else:
+            paragraphs.append(_docx_paragraph(text))
+
+    margin = round(MARGIN_MM * TWIPS_PER_MM)
+    footer_distance = round(15 * TWIPS_PER_MM)
+    document = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document {W_NS} {R_NS}><w:body>'
+        + "".join(paragraphs)
+        + '<w:sectPr><w:footerReference w:type="default" r:id="rId1"/>'
+        f'<w:pgSz w:w="11906" w:h="16838"/>'
+        f'<w:pgMar w:top="{margin}" w:right="{margin}" w:bottom="{margin}" w:left="{margin}" '
+        f'w:header="{footer_distance}" w:footer="{footer_distance}" w:gutter="0"/>'
+        "</w:sectPr></w:body></w:document>"
+    )
+    footer = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:ftr {W_NS}>'
+        + _docx_paragraph(footer_text(letter_type, language), align="center", size=8, color="999999")
+        + "</w:ftr>"
+    )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as package:
+        # Fixed timestamps keep the bytes identical for identical input
+        for name, content in (
+            ("[Content_Types].xml", DOCX_CONTENT_TYPES),
+            ("_rels/.rels", DOCX_RELS),
+            ("word/_rels/document.xml.rels", DOCX_DOCUMENT_RELS),
+            ("word/document.xml", document),
+            ("word/footer1.xml", footer)
+        ):
+            package.writestr(
+                zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0)), content, compress_type=zipfile.ZIP_DEFLATED
+            )
+    return buffer.getvalue()
+
+RENDERERS = {"pdf": render_pdf, "docx": render_docx}
+
+def render_letter(html: str, fmt: str, letter_type: str, language: str) -> bytes:
+    """Module-level so it can be pickled into a process pool"""
+    return RENDERERS[fmt](html, letter_type, language)
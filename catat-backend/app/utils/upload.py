@@ -0,0 +1,23 @@
+from fastapi import UploadFile, HTTPException
+from app.config import settings
+from app.services.telemetry import AUDIO_BYTES
+
+async def read_audio_upload(audio: UploadFile) -> bytes:
+    """
+    Validate type and size from the parsed upload before touching its bytes.
+    The upload is read once from Starlette's spooled buffer and handed to the
+    provider straight from memory.
+    """
+    if audio.content_type not in settings.ALLOWED_AUDIO_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {audio.content_type}")
+    
+    max_bytes = settings.MAX_AUDIO_SIZE_MB * 1024 * 1024
+    if audio.size is not None and audio.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File too large. Max: {settings.MAX_AUDIO_SIZE_MB}MB")
+    
+    audio_bytes = await audio.read(max_bytes + 1)
+    if len(audio_bytes) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File too large. Max: {settings.MAX_AUDIO_SIZE_MB}MB")
+    
+    AUDIO_BYTES.observe(len(audio_bytes))
+    return audio_bytes
@@ -0,0 +1,62 @@
+"""
+Concurrent /api/generate-letter requests against slow stub providers.
+
+With non-blocking provider clients, N concurrent requests should finish in
+about one pipeline latency rather than N of them. Each request's audio differs
+by a trailing index, so request coalescing can't fold them into one run.
+
+Usage: python -m benchmarks.bench_concurrency [N]
+"""
+import asyncio
+import os
+import sys
+import time
+from typing import Tuple
+
+import httpx
+
+# Every request comes from one client; the per-client limit would turn most into 429s
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+
+from benchmarks.stub_providers import StubGroq, StubAnthropic, install
+
+
+async def run(concurrency: int, whisper: float, llm: float, claude: float) -> Tuple[float, int]:
+    groq = StubGroq(whisper_latency=whisper, llm_latency=llm)
+    install(groq, StubAnthropic(latency=claude))
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            response = await client.post(
+                "/api/generate-letter",
+                data={"language": "ms", "letter_type": "complaint"},
+                files={"audio": (f"rec{i}.webm", b"\x1a\x45\xdf\xa3" * 256 + str(i).encode(), "audio/webm")}
+            )
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+        return time.perf_counter() - start, groq.audio.transcriptions.count
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    whisper, llm, claude = 0.2, 0.3, 0.5
+    pipeline = whisper + llm + claude
+
+    elapsed, pipelines = asyncio.run(run(concurrency, whisper, llm, claude))
+    print(f"{concurrency} concurrent requests: {elapsed:.2f}s (one pipeline: {pipeline:.2f}s, serial: {pipeline * concurrency:.2f}s)")
+
+    if pipelines != concurrency:
+        print(f"❌ Only {pipelines} pipelines ran; requests were coalesced")
+        sys.exit(1)
+    if elapsed > pipeline * 2:
+        print("❌ Requests are being serialized")
+        sys.exit(1)
+    print("✅ Requests overlap")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Write-behind letter persistence: what a request pays to enqueue a letter, and
+how long the writer takes to drain a burst, batched versus one row per write.
+
+Runs against a temporary SQLite stand-in of the letters table unless --db-url
+points at a Postgres database (which must already have the letters table).
+
+Usage: python -m benchmarks.bench_letter_store [--letters 2000] [--concurrency 64] [--db-url postgresql://...]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+from app.config import settings
+from app.models.letter import GenerateLetterResponse, Language, LetterMetadata, LetterType, StructuredData
+from app.services.letter_store import LetterStore, create_letter_db
+from benchmarks.load_test import summarize
+from benchmarks.stub_providers import LETTER_HTML, STRUCTURED_JSON
+
+
+def sample_response() -> GenerateLetterResponse:
+    structured_data = StructuredData.model_validate_json(STRUCTURED_JSON)
+    return GenerateLetterResponse(
+        success=True,
+        transcript="Lampu jalan rosak di taman kami lah",
+        structured_data=structured_data,
+        letter=LETTER_HTML,
+        metadata=LetterMetadata(
+            language=Language.MALAY,
+            letter_type=LetterType.COMPLAINT,
+            tone_detected=structured_data.tone_detected,
+            urgency=structured_data.urgency_level
+        )
+    )
+
+
+async def run(db_url: str, letters: int, concurrency: int, batch_size: int) -> dict:
+    settings.LETTER_PERSIST_BATCH_SIZE = batch_size
+    settings.LETTER_PERSIST_QUEUE_SIZE = max(letters, 1)
+    store = LetterStore(create_letter_db(db_url))
+    store.start()
+    response = sample_response()
+    semaphore = asyncio.Semaphore(concurrency)
+    enqueue_ms = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await store.save(uuid.uuid4().hex, response)
+            enqueue_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(letters)))
+    await store.stop()
+    elapsed = time.perf_counter() - start
+    stats = store.stats()
+    return {"enqueue_ms": summarize(enqueue_ms), "elapsed_s": elapsed, **stats}
+
+
+def report(label: str, result: dict):
+    enqueue = result["enqueue_ms"]
+    print(
+        f"{label:<12} enqueue p50 {enqueue['p50']:.3f}  p99 {enqueue['p99']:.3f} ms  "
+        f"drained in {result['elapsed_s']:.2f}s ({result['written'] / result['elapsed_s']:.0f} rows/s) "
+        f"in {result['batches']} batches, failed {result['failed']}, dropped {result['dropped']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--letters", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=settings.LETTER_PERSIST_BATCH_SIZE)
+    parser.add_argument("--db-url", help="Postgres to write to instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, batch_size in (("per-row", 1), (f"batch={args.batch_size}", args.batch_size)):
+            db_url = args.db_url or f"sqlite:///{os.path.join(tmp, f'letters-{batch_size}.db')}"
+            report(label, asyncio.run(run(db_url, args.letters, args.concurrency, batch_size)))
+
+
+if __name__ == "__main__":
+    main()
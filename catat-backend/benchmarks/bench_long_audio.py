@@ -0,0 +1,90 @@
+"""
+Long-audio transcription wall time against a stub transcriber whose latency
+grows with the seconds of audio it receives.
+
+With parallel segment transcription, wall time should stay roughly flat as
+the recording gets longer (until segments exceed the concurrency limit).
+
+Usage: python -m benchmarks.bench_long_audio
+Requires PyAV.
+"""
+import asyncio
+import io
+import math
+import os
+import time
+import wave
+from array import array
+from types import SimpleNamespace
+
+os.environ.setdefault("LONG_AUDIO_MAX_CONCURRENCY", "16")
+
+from benchmarks.stub_providers import StubGroq, install
+from app.utils import audio
+
+PER_SECOND_LATENCY = 0.01
+
+
+class _PerSecondTranscriptions:
+    def __init__(self):
+        self.count = 0
+        self.audio_seconds = 0.0
+
+    async def create(self, file, **kwargs):
+        self.count += 1
+        _, segment = file
+        duration = audio.pcm_duration(await asyncio.to_thread(audio.decode_pcm, segment))
+        self.audio_seconds += duration
+        await asyncio.sleep(duration * PER_SECOND_LATENCY)
+        return "saya ingin membuat aduan tentang lampu jalan yang rosak"
+
+
+def make_recording(seconds: int) -> bytes:
+    """4s tone bursts separated by 0.6s of silence, 16 kHz mono WAV"""
+    rate = audio.SAMPLE_RATE
+    samples = array("h")
+    burst = array("h", (int(6000 * math.sin(2 * math.pi * 220 * i / rate)) for i in range(4 * rate)))
+    gap = array("h", bytes(int(0.6 * rate) * 2))
+    while len(samples) < seconds * rate:
+        samples.extend(burst)
+        samples.extend(gap)
+    del samples[seconds * rate:]
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+async def run():
+    from app.services.whisper_service import get_whisper_service
+    whisper_service = get_whisper_service()
+
+    print(f"{'audio':>8} {'segments':>9} {'serial':>8} {'wall':>8}")
+    for minutes in (3, 6, 12, 24):
+        stub = StubGroq()
+        stub.audio = SimpleNamespace(transcriptions=_PerSecondTranscriptions())
+        install(groq=stub)
+        whisper_service.cache.memory.clear()
+
+        recording = make_recording(minutes * 60)
+        start = time.perf_counter()
+        await whisper_service.transcribe_audio(recording, language="ms", filename="long.wav")
+        elapsed = time.perf_counter() - start
+
+        calls = stub.audio.transcriptions
+        serial = calls.audio_seconds * PER_SECOND_LATENCY
+        print(f"{minutes:>6}m {calls.count:>9} {serial:>7.2f}s {elapsed:>7.2f}s")
+
+
+def main():
+    if not audio.audio_available():
+        raise SystemExit("PyAV is not installed")
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Letter sanitizer throughput on pathological inputs, whole and streamed.
+
+Each input is run at doubling sizes and the growth exponent is fitted from
+the smallest to the largest run: about 1.0 for a linear sanitizer, 2.0 or
+worse for regex backtracking or repeated string rebuilding.
+
+Usage: python -m benchmarks.bench_sanitizer
+"""
+import math
+import sys
+import time
+
+from benchmarks import stub_providers  # noqa: F401  (sets the provider keys)
+from app.models.letter import Language
+from app.services.letter_sanitizer import LetterSanitizer
+
+SIZES = (50_000, 100_000, 200_000, 400_000)
+CHUNK = 16
+
+PATHOLOGICAL = {
+    "angle brackets": lambda n: "<" * n,
+    "unterminated tag": lambda n: "<p" + "a" * n,
+    "open comment": lambda n: "<!--" + "-" * n,
+    "nested paragraphs": lambda n: "<p>" * (n // 3),
+    "digit runs": lambda n: "1 " * (n // 2),
+    "near-dates": lambda n: "6 Decembe " * (n // 10),
+    "dates": lambda n: "06/12/2025 " * (n // 11),
+    "blank lines": lambda n: "\n" * n,
+    "one long word": lambda n: "a" * n,
+    "inline tags": lambda n: "<b>x</b>" * (n // 8),
+    "leaked closings": lambda n: "<p>Yours faithfully,</p>" * (n // 24),
+}
+
+
+def run(text: str, chunked: bool) -> float:
+    sanitizer = LetterSanitizer(Language.ENGLISH, "Ahmad bin Ali")
+    start = time.perf_counter()
+    if chunked:
+        for i in range(0, len(text), CHUNK):
+            sanitizer.feed(text[i:i + CHUNK])
+    else:
+        sanitizer.feed(text)
+    sanitizer.close()
+    return time.perf_counter() - start
+
+
+def main():
+    worst = 0.0
+    print(f"{'input':<18} {'mode':<8} " + " ".join(f"{size // 1000:>7}k" for size in SIZES) + "  exponent")
+    for name, make in PATHOLOGICAL.items():
+        for chunked in (False, True):
+            # Best of three keeps GC pauses from looking like superlinear growth
+            timings = [min(run(make(size), chunked) for _ in range(3)) for size in SIZES]
+            exponent = math.log(timings[-1] / timings[0]) / math.log(SIZES[-1] / SIZES[0])
+            worst = max(worst, exponent)
+            cells = " ".join(f"{t * 1000:>6.1f}ms" for t in timings)
+            print(f"{name:<18} {'stream' if chunked else 'whole':<8} {cells}  {exponent:>8.2f}")
+
+    if worst > 1.4:
+        print(f"❌ Superlinear growth (worst exponent {worst:.2f})")
+        sys.exit(1)
+    print(f"✅ Linear (worst exponent {worst:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Per-operation latency of each shared-state backend, and a check that a token
+bucket shared by several worker processes admits exactly its capacity.
+
+The redis backend runs against benchmarks.redis_stub unless --redis-url is given,
+so its numbers are client and protocol overhead only.
+
+Usage: python -m benchmarks.bench_shared_state [--ops 2000] [--workers 4] [--redis-url redis://...]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from app.services.shared_state import MemoryState, RedisState, SQLiteState, SharedState, aioredis
+from benchmarks.load_test import summarize
+
+TIMEOUT = 1.0
+CAPACITY = 50
+
+
+def make_state(backend: str, target: str) -> SharedState:
+    if backend == "sqlite":
+        return SQLiteState(TIMEOUT, target)
+    if backend == "redis":
+        return RedisState(TIMEOUT, target, prefix=f"bench{os.getppid()}:")
+    return MemoryState(TIMEOUT)
+
+
+async def time_ops(state: SharedState, ops: int) -> dict:
+    value = os.urandom(2048)
+    results = {}
+    for name, op in (
+        ("set", lambda i: state.set(f"k{i}", value, 60)),
+        ("get", lambda i: state.get(f"k{i}")),
+        ("take_token", lambda i: state.take_token(f"b{i % 100}", 60, 1)),
+        ("hset", lambda i: state.hset("h", f"f{i % 8}", value))
+    ):
+        samples: List[float] = []
+        for i in range(ops):
+            start = time.perf_counter()
+            await op(i)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(samples)
+    return results
+
+
+def drain_bucket(backend: str, target: str, attempts: int, queue):
+    async def run():
+        state = make_state(backend, target)
+        # Refill of one token a day: any admission past the capacity is a lost update
+        taken = 0
+        for _ in range(attempts):
+            if await state.take_token("shared-bucket", CAPACITY, 1 / 86400) == 0:
+                taken += 1
+        errors = state.errors
+        await state.close()
+        return taken, errors
+
+    queue.put(asyncio.run(run()))
+
+
+def check_bucket(backend: str, target: str, workers: int) -> bool:
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=drain_bucket, args=(backend, target, CAPACITY, queue))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    taken = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    ok = taken == CAPACITY and errors == 0
+    print(f"    {workers} workers x {CAPACITY} attempts on one bucket: admitted {taken} (capacity {CAPACITY}, errors {errors}) "
+          f"{'✅' if ok else '❌'}")
+    return ok
+
+
+async def bench(backend: str, target: str, ops: int) -> None:
+    state = make_state(backend, target)
+    results = await time_ops(state, ops)
+    await state.close()
+    print(f"{backend}:")
+    for op, stats in results.items():
+        print(f"    {op:<11} p50 {stats['p50']:7.3f}  p95 {stats['p95']:7.3f}  p99 {stats['p99']:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--redis-url", help="real Redis to use instead of the stand-in")
+    parser.add_argument("--stub-port", type=int, default=6390)
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(bench("memory", "", args.ops))
+
+        path = os.path.join(tmp, "shared_state.db")
+        asyncio.run(bench("sqlite", path, args.ops))
+        ok &= check_bucket("sqlite", path, args.workers)
+
+    if aioredis is None:
+        print("redis: skipped (redis package not installed)")
+    else:
+        stub = None
+        url = args.redis_url
+        if url is None:
+            stub = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.redis_stub", "--port", str(args.stub_port)],
+                cwd=Path(__file__).parent.parent
+            )
+            time.sleep(0.5)
+            url = f"redis://127.0.0.1:{args.stub_port}/0"
+        try:
+            asyncio.run(bench("redis", url, args.ops))
+            ok &= check_bucket("redis", url, args.workers)
+        finally:
+            if stub is not None:
+                stub.terminate()
+                stub.wait()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
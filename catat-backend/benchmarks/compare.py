@@ -0,0 +1,51 @@
+"""
+Compare two load-test result files level by level.
+
+Prints p50/p95/p99 latency and throughput for each concurrency level both
+runs share, with the relative change from the baseline.
+
+Usage: python -m benchmarks.compare baseline.json candidate.json
+"""
+import json
+import sys
+from typing import Optional
+
+METRICS = (("p50", "latency_ms"), ("p95", "latency_ms"), ("p99", "latency_ms"))
+
+
+def _change(before: Optional[float], after: Optional[float]) -> str:
+    if not before or after is None:
+        return "      -"
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def main():
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(2)
+
+    with open(sys.argv[1]) as f:
+        baseline = json.load(f)
+    with open(sys.argv[2]) as f:
+        candidate = json.load(f)
+    print(f"{baseline['label']} ({baseline.get('commit')}) → {candidate['label']} ({candidate.get('commit')})")
+
+    before_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    for after in candidate["levels"]:
+        before = before_levels.get(after["concurrency"])
+        if before is None:
+            continue
+
+        cells = []
+        for name, group in METRICS:
+            old, new = before[group][name], after[group][name]
+            cells.append(f"{name} {new or 0:7.0f}ms {_change(old, new)}")
+        cells.append(
+            f"{after['throughput_rps']:6.2f} req/s {_change(before['throughput_rps'], after['throughput_rps'])}"
+        )
+        errors = f"  errors {before['errors']} → {after['errors']}" if before["errors"] or after["errors"] else ""
+        print(f"c={after['concurrency']:<4} " + "  ".join(cells) + errors)
+
+
+if __name__ == "__main__":
+    main()
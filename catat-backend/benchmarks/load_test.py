@@ -0,0 +1,260 @@
+"""
+Load test for /api/generate-letter against the local provider stub servers.
+
+Starts benchmarks.stub_servers in a subprocess, points the backend's Groq and
+Anthropic clients at it and drives the endpoint at increasing concurrency.
+Each level reports p50/p95/p99 latency, throughput, errors, injected 429s and
+a per-stage breakdown taken from the Server-Timing header.
+
+By default the app runs in-process; pass --target to load a running server
+instead (start it with GROQ_BASE_URL/ANTHROPIC_BASE_URL set to --stub-url).
+
+Results are written as JSON to benchmarks/results/; compare two runs with
+python -m benchmarks.compare.
+
+Usage: python -m benchmarks.load_test [--levels 1,4,16,32] [--requests 40] [--label name]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import stub_providers  # noqa: F401  (sets the provider keys)
+from benchmarks.stub_servers import add_arguments
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Linear interpolation between closest ranks"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else None,
+        "max": max(values) if values else None
+    }
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """
+    Stage → milliseconds; repeated stages (parallel segments, retries) are summed.
+    Streamed responses send headers before any stage runs, so they have none.
+    """
+    stages = defaultdict(float)
+    for entry in header.split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        # A proxy in front of --target may add entries with desc before or after dur
+        durations = [param[4:] for param in params if param.startswith("dur=")]
+        if durations and name != "total":
+            stages[name] += float(durations[0])
+    return stages
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, requests: int, stream: bool) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, first_chunks = [], []
+    stages = defaultdict(list)
+    statuses = Counter()
+
+    async def one(i: int):
+        # Unique audio per request so the transcript cache can't answer it
+        audio = b"\x1a\x45\xdf\xa3" + os.urandom(4096)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with client.stream(
+                    "POST",
+                    "/api/generate-letter/stream" if stream else "/api/generate-letter",
+                    data={"language": "ms", "letter_type": "complaint"},
+                    files={"audio": (f"load{i}.webm", audio, "audio/webm")}
+                ) as response:
+                    first_chunk = None
+                    async for chunk in response.aiter_bytes():
+                        if stream and first_chunk is None and b"event: letter_chunk" in chunk:
+                            first_chunk = (time.perf_counter() - start) * 1000
+                    status = response.status_code
+                    timing = response.headers.get("server-timing", "")
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        statuses[str(status)] += 1
+        if first_chunk is not None:
+            first_chunks.append(first_chunk)
+        if status == 200:
+            for stage, ms in parse_server_timing(timing).items():
+                stages[stage].append(ms)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    ok = statuses.get("200", 0)
+    result = {
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": ok,
+        "errors": requests - ok,
+        "statuses": dict(statuses),
+        "elapsed_s": elapsed,
+        "throughput_rps": ok / elapsed if elapsed else 0.0,
+        "latency_ms": summarize(latencies),
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stages.items())}
+    }
+    if stream:
+        result["first_chunk_ms"] = summarize(first_chunks)
+    return result
+
+
+def start_stub_server(args) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.stub_servers", "--port", str(args.stub_port),
+            "--whisper-latency", args.whisper_latency,
+            "--groq-latency", args.groq_latency,
+            "--claude-latency", args.claude_latency,
+            "--rate-limit", str(args.rate_limit),
+            "--retry-after", str(args.retry_after)
+        ],
+        cwd=Path(__file__).parent.parent
+    )
+    url = f"http://127.0.0.1:{args.stub_port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/health", timeout=0.5)
+            return process
+        except httpx.HTTPError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Stub server did not start")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, stub_url: str) -> List[dict]:
+    if args.target:
+        client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout)
+        lifespan = None
+    else:
+        # Settings are read at import, so the stub endpoints must be in the env first
+        os.environ["GROQ_BASE_URL"] = stub_url
+        os.environ["ANTHROPIC_BASE_URL"] = stub_url
+        os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+        from app.main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load", timeout=args.timeout)
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+
+    levels = []
+    try:
+        async with httpx.AsyncClient(base_url=stub_url) as stub:
+            for concurrency in args.levels:
+                before = (await stub.get("/health")).json()
+                result = await run_level(client, concurrency, max(args.requests, concurrency), args.stream)
+                after = (await stub.get("/health")).json()
+                result["provider_calls"] = {name: after[name] - before.get(name, 0) for name in after}
+                levels.append(result)
+                report(result)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+    return levels
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value:8.0f}" if value is not None else "       -"
+
+
+def report(level: dict):
+    latency = level["latency_ms"]
+    print(
+        f"c={level['concurrency']:<4} ok={level['ok']:<4} err={level['errors']:<3} "
+        f"{level['throughput_rps']:6.2f} req/s  p50{_ms(latency['p50'])}  p95{_ms(latency['p95'])}  "
+        f"p99{_ms(latency['p99'])} ms  429s={sum(v for k, v in level['provider_calls'].items() if k.endswith('_429'))}"
+    )
+    for stage, stats in level["stages_ms"].items():
+        print(f"    {stage:<12} p50{_ms(stats['p50'])}  p95{_ms(stats['p95'])}  p99{_ms(stats['p99'])} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", default="1,2,4,8,16,32", type=lambda v: [int(c) for c in v.split(",")])
+    parser.add_argument("--requests", type=int, default=40, help="requests per level (at least the concurrency)")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="drive /api/generate-letter/stream instead (first-chunk times need --target: in-process responses are buffered)"
+    )
+    parser.add_argument("--target", help="URL of a running backend; default runs the app in-process")
+    parser.add_argument("--stub-url", help="use an already running stub server")
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    stub = None if args.stub_url else start_stub_server(args)
+    stub_url = args.stub_url or f"http://127.0.0.1:{args.stub_port}"
+    try:
+        levels = asyncio.run(run(args, stub_url))
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
+
+    results = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": {
+            "endpoint": "/api/generate-letter/stream" if args.stream else "/api/generate-letter",
+            "target": args.target or "in-process",
+            "requests_per_level": args.requests,
+            "whisper_latency": args.whisper_latency,
+            "groq_latency": args.groq_latency,
+            "claude_latency": args.claude_latency,
+            "rate_limit": args.rate_limit,
+            "retry_after": args.retry_after
+        },
+        "levels": levels
+    }
+    args.out.mkdir(parents=True, exist_ok=True)
+    path = args.out / f"{datetime.now():%Y%m%d-%H%M%S}-{args.label}.json"
+    path.write_text(json.dumps(results, indent=2))
+    print(f"📄 Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Minimal in-memory stand-in for Redis, for exercising SHARED_STATE_BACKEND=redis
+without a Redis server.
+
+Speaks RESP2 over TCP and implements only the commands the shared state uses:
+GET, SET (PX/EX), DEL, HSET, HGET, HMGET, HGETALL, HDEL, PEXPIRE, plus
+SCRIPT LOAD/EVAL/EVALSHA for the token-bucket script, which runs natively
+(there is no Lua here). Latency is a single event loop hop, so it measures
+the client and protocol overhead, not a real server's.
+
+Usage: python -m benchmarks.redis_stub [--port 6390]
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+from typing import Dict, List, Optional, Union
+
+from app.services.shared_state import TOKEN_BUCKET_SCRIPT
+
+Reply = Union[None, int, bytes, str, list, Exception]
+
+
+class RedisStub:
+    def __init__(self):
+        self.values: Dict[bytes, Union[bytes, Dict[bytes, bytes]]] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.scripts: Dict[str, str] = {}
+        self.commands = 0
+
+    def _alive(self, key: bytes) -> bool:
+        expires = self.expires.get(key)
+        if expires is not None and expires < time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    def _hash(self, key: bytes) -> Dict[bytes, bytes]:
+        if not self._alive(key):
+            self.values[key] = {}
+        return self.values[key]
+
+    def _token_bucket(self, key: bytes, capacity: float, rate: float, now: float) -> bytes:
+        state = self._hash(key)
+        tokens = float(state.get(b"tokens", capacity))
+        updated = float(state.get(b"updated", now))
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        state[b"tokens"] = repr(tokens).encode()
+        state[b"updated"] = repr(now).encode()
+        self.expires[key] = time.monotonic() + capacity / rate
+        return repr(wait).encode()
+
+    def _eval(self, sha: str, args: List[bytes]) -> Reply:
+        if self.scripts.get(sha) != TOKEN_BUCKET_SCRIPT:
+            return Exception("NOSCRIPT No matching script. Please use EVAL.")
+        numkeys = int(args[0])
+        keys, argv = args[1:1 + numkeys], args[1 + numkeys:]
+        return self._token_bucket(keys[0], float(argv[0]), float(argv[1]), float(argv[2]))
+
+    def execute(self, args: List[bytes]) -> Reply:
+        self.commands += 1
+        command = args[0].upper()
+        if command == b"PING":
+            return "PONG"
+        if command in (b"CLIENT", b"SELECT"):
+            return "OK"
+        if command == b"GET":
+            return self.values.get(args[1]) if self._alive(args[1]) else None
+        if command == b"SET":
+            key, value = args[1], args[2]
+            self.values[key] = value
+            self.expires.pop(key, None)
+            options = [a.upper() for a in args[3:]]
+            for unit, scale in ((b"PX", 1000), (b"EX", 1)):
+                if unit in options:
+                    self.expires[key] = time.monotonic() + int(args[3 + options.index(unit) + 1]) / scale
+            return "OK"
+        if command == b"DEL":
+            return sum(1 for key in args[1:] if self._alive(key) and self.values.pop(key) is not None)
+        if command == b"PEXPIRE":
+            if not self._alive(args[1]):
+                return 0
+            self.expires[args[1]] = time.monotonic() + int(args[2]) / 1000
+            return 1
+        if command == b"HSET":
+            state = self._hash(args[1])
+            pairs = args[2:]
+            added = sum(1 for field in pairs[::2] if field not in state)
+            state.update(zip(pairs[::2], pairs[1::2]))
+            return added
+        if command == b"HGET":
+            return self._hash(args[1]).get(args[2])
+        if command == b"HMGET":
+            state = self._hash(args[1])
+            return [state.get(field) for field in args[2:]]
+        if command == b"HGETALL":
+            return [item for pair in self._hash(args[1]).items() for item in pair]
+        if command == b"HDEL":
+            state = self._hash(args[1])
+            return sum(1 for field in args[2:] if state.pop(field, None) is not None)
+        if command == b"SCRIPT" and args[1].upper() == b"LOAD":
+            script = args[2].decode()
+            sha = hashlib.sha1(args[2]).hexdigest()
+            self.scripts[sha] = script
+            return sha.encode()
+        if command == b"EVALSHA":
+            return self._eval(args[1].decode().lower(), args[2:])
+        if command == b"EVAL":
+            sha = hashlib.sha1(args[1]).hexdigest()
+            self.scripts[sha] = args[1].decode()
+            return self._eval(sha, args[2:])
+        return Exception(f"ERR unknown command '{command.decode()}'")
+
+
+def encode(reply: Reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return f"-{reply}\r\n".encode()
+    if isinstance(reply, str):
+        return f"+{reply}\r\n".encode()
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    return b"*%d\r\n" % len(reply) + b"".join(encode(item) for item in reply)
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()
+    args = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def serve(host: str, port: int, stub: Optional[RedisStub] = None) -> asyncio.AbstractServer:
+    stub = stub or RedisStub()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while (args := await read_command(reader)) is not None:
+                if args[0].upper() == b"HELLO":
+                    # RESP2 only; the backend's client is pinned to protocol 2
+                    writer.write(encode(Exception("NOPROTO unsupported protocol version")))
+                else:
+                    writer.write(encode(stub.execute(args)))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    async def run():
+        server = await serve(args.host, args.port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
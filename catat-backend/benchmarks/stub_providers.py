@@ -0,0 +1,99 @@
+"""
+In-process stand-ins for the async Groq and Anthropic clients.
+Each call sleeps for a fixed latency instead of hitting the network.
+"""
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+# Provider clients refuse to open without keys; benchmarks never reach real providers
+for _key in ("GROQ_API_KEY", "ANTHROPIC_API_KEY"):
+    os.environ.setdefault(_key, "benchmark")
+
+STRUCTURED_JSON = json.dumps({
+    "letter_type": "complaint",
+    "sender": {"name": "Ahmad bin Ali", "address": "Jalan Ampang, Kuala Lumpur", "contact": "012-3456789"},
+    "recipient": {"name": "Pengarah", "title": "Pengarah", "organization": "DBKL", "address": "Jalan Raja Laut"},
+    "subject": "Aduan lampu jalan rosak",
+    "key_points": ["Lampu jalan rosak sejak dua minggu", "Kawasan gelap dan tidak selamat"],
+    "tone_detected": "casual",
+    "language_preference": "ms",
+    "dates_mentioned": [],
+    "urgency_level": "medium"
+})
+
+# Claude only writes the subject and body; the header and closing are rendered locally
+LETTER_HTML = (
+    "<p>Perkara: Aduan Lampu Jalan Rosak</p>\n\n"
+    "<p>Dengan segala hormatnya, saya ingin memaklumkan bahawa lampu jalan di taman kami telah rosak.</p>\n\n"
+    "<p>Saya memohon pihak tuan mengambil tindakan segera.</p>"
+)
+
+
+class _Calls:
+    def __init__(self, latency: float, result):
+        self.latency = latency
+        self.result = result
+        self.count = 0
+
+    async def create(self, **kwargs):
+        self.count += 1
+        await asyncio.sleep(self.latency)
+        return self.result(kwargs) if callable(self.result) else self.result
+
+
+class StubGroq:
+    def __init__(self, whisper_latency: float = 0.5, llm_latency: float = 0.8, transcript: str = "Lampu jalan rosak di taman kami lah"):
+        self.audio = SimpleNamespace(transcriptions=_Calls(whisper_latency, transcript))
+        completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=STRUCTURED_JSON))])
+        self.chat = SimpleNamespace(completions=_Calls(llm_latency, completion))
+
+    async def close(self):
+        pass
+
+
+class _Stream:
+    def __init__(self, latency: float, text: str, chunk_size: int = 16):
+        self.latency = latency
+        self.text = text
+        self.chunk_size = chunk_size
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        chunks = [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+        for chunk in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield chunk
+
+    async def get_final_message(self):
+        return SimpleNamespace(content=[SimpleNamespace(text=self.text)], usage=None)
+
+
+class _Messages(_Calls):
+    def stream(self, **kwargs):
+        self.count += 1
+        return _Stream(self.latency, LETTER_HTML)
+
+
+class StubAnthropic:
+    def __init__(self, latency: float = 3.0):
+        message = SimpleNamespace(content=[SimpleNamespace(text=LETTER_HTML)])
+        self.messages = _Messages(latency, message)
+
+    async def close(self):
+        pass
+
+
+def install(groq=None, anthropic=None):
+    """Swap the shared provider clients for stubs"""
+    from app.services.provider_clients import provider_clients
+    provider_clients.groq = groq or StubGroq()
+    provider_clients.anthropic = anthropic or StubAnthropic()
+    return provider_clients
@@ -0,0 +1,217 @@
+"""
+Local HTTP stand-ins for the Groq and Anthropic APIs, for load tests that
+exercise the real SDK clients, connection pools and retry paths.
+
+Serves Groq's /openai/v1/audio/transcriptions and /openai/v1/chat/completions
+and Anthropic's /v1/messages (plain and streamed) on one port. Each endpoint
+sleeps for a latency drawn from its distribution and answers 429 with the
+configured probability.
+
+Point the backend at it with GROQ_BASE_URL and ANTHROPIC_BASE_URL.
+
+Usage: python -m benchmarks.stub_servers [--port 9100] [--claude-latency lognormal:3,0.3] [--rate-limit 0.05]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import uuid
+from typing import Callable
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stub_providers import STRUCTURED_JSON, LETTER_HTML
+
+TRANSCRIPT = "Lampu jalan rosak di taman kami lah"
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Latency distribution in seconds: "0.5" or "fixed:0.5", "uniform:0.2,0.8",
+    "normal:mean,stddev" or "lognormal:median,sigma" (heavy tail, like real providers).
+    """
+    kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        median, sigma = values
+        return lambda: random.lognormvariate(0, sigma) * median
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def create_app(
+    whisper_latency: str = "0.5",
+    groq_latency: str = "0.8",
+    claude_latency: str = "3.0",
+    rate_limit: float = 0.0,
+    retry_after: float = 1.0,
+    stream_chunk: int = 16
+) -> FastAPI:
+    app = FastAPI(title="Catat provider stubs")
+    latencies = {
+        "whisper": parse_latency(whisper_latency),
+        "groq": parse_latency(groq_latency),
+        "claude": parse_latency(claude_latency)
+    }
+    counts = {name: 0 for name in latencies}
+    counts.update({f"{name}_429": 0 for name in latencies})
+    # Distinct transcripts keep the backend's structuring cache from short-circuiting runs
+    sequence = itertools.count()
+
+    def throttled(name: str):
+        if rate_limit and random.random() < rate_limit:
+            counts[f"{name}_429"] += 1
+            return True
+        counts[name] += 1
+        return False
+
+    def groq_429():
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (stub)", "type": "tokens", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": str(retry_after)}
+        )
+
+    def anthropic_429():
+        return JSONResponse(
+            {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limit reached (stub)"}},
+            status_code=429,
+            headers={"retry-after": str(retry_after)}
+        )
+
+    @app.get("/health")
+    async def health():
+        return counts
+
+    # Model listings are what the backend's connection warmup calls
+    @app.get("/openai/v1/models")
+    async def groq_models():
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}]}
+
+    @app.get("/v1/models")
+    async def anthropic_models():
+        return {
+            "data": [{"type": "model", "id": "stub", "display_name": "Stub", "created_at": "2025-01-01T00:00:00Z"}],
+            "has_more": False, "first_id": "stub", "last_id": "stub"
+        }
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        audio = await form["file"].read()
+        if throttled("whisper"):
+            return groq_429()
+        await asyncio.sleep(latencies["whisper"]())
+        text = f"{TRANSCRIPT} ({next(sequence)})"
+        if form.get("response_format") == "text":
+            return JSONResponse(text)
+        return {
+            "text": text,
+            "language": form.get("language", "en"),
+            # Roughly what a 32 kbps Opus upload of this size would last
+            "duration": round(len(audio) / 4000, 2),
+            "segments": []
+        }
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if throttled("groq"):
+            return groq_429()
+        await asyncio.sleep(latencies["groq"]())
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STRUCTURED_JSON},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 600, "completion_tokens": 200, "total_tokens": 800}
+        }
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        if throttled("claude"):
+            return anthropic_429()
+        latency = latencies["claude"]()
+        message = {
+            "id": f"msg_{uuid.uuid4().hex}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "stub"),
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": 900, "output_tokens": 1, "cache_read_input_tokens": 800}
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            message["content"] = [{"type": "text", "text": LETTER_HTML}]
+            message["stop_reason"] = "end_turn"
+            message["usage"]["output_tokens"] = len(LETTER_HTML) // 4
+            return message
+
+        def event(name: str, data: dict) -> str:
+            return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+        async def stream():
+            chunks = [LETTER_HTML[i:i + stream_chunk] for i in range(0, len(LETTER_HTML), stream_chunk)]
+            # A fifth of the latency before the first token, the rest spread over the chunks
+            await asyncio.sleep(latency * 0.2)
+            yield event("message_start", {"type": "message_start", "message": message})
+            yield event("content_block_start", {
+                "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+            })
+            for chunk in chunks:
+                await asyncio.sleep(latency * 0.8 / len(chunks))
+                yield event("content_block_delta", {
+                    "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}
+                })
+            yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield event("message_delta", {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": len(LETTER_HTML) // 4}
+            })
+            yield event("message_stop", {"type": "message_stop"})
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--whisper-latency", default="lognormal:0.5,0.3")
+    parser.add_argument("--groq-latency", default="lognormal:0.8,0.3")
+    parser.add_argument("--claude-latency", default="lognormal:3.0,0.3")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="probability of answering 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    app = create_app(args.whisper_latency, args.groq_latency, args.claude_latency, args.rate_limit, args.retry_after)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
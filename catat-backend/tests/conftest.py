@@ -0,0 +1,28 @@
+"""
+Settings for the test run, set before anything imports app.config.
+Provider clients are replaced with the in-process stubs from benchmarks.stub_providers.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix="catat-tests-")
+
+os.environ.setdefault("PROVIDER_WARMUP_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "0")
+os.environ.setdefault("SHARED_STATE_BACKEND", "memory")
+os.environ.setdefault("JOB_DB_PATH", os.path.join(_tmp, "jobs.db"))
+os.environ.setdefault("LETTER_DB_URL", "")
+
+
+@pytest.fixture(scope="session")
+def run():
+    """
+    Run a coroutine on the one loop shared by the whole session, as the app runs on one.
+    The provider limiters are module-level and bind to the loop they first wait on.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.adaptive_limiter import AdaptiveLimiter
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str = "0.01"):
+        super().__init__("rate_limit_exceeded")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+def test_concurrent_calls_never_exceed_the_limit(run):
+    limiter = AdaptiveLimiter("test", max_concurrency=3)
+    peak = []
+
+    async def call():
+        peak.append(limiter.in_flight)
+        await asyncio.sleep(0.02)
+
+    async def scenario():
+        await asyncio.gather(*(limiter.run(call) for _ in range(12)))
+
+    run(scenario())
+    assert max(peak) == 3
+    assert limiter.stats() == {"limit": 3, "in_flight": 0, "throttled": 0}
+
+
+def test_a_429_halves_the_limit_once_and_successes_grow_it_back(run):
+    limiter = AdaptiveLimiter("test", max_concurrency=8)
+
+    async def throttled():
+        raise RateLimited()
+
+    async def scenario():
+        # Calls in flight together when the provider pushes back count as one decrease
+        for _ in range(3):
+            with pytest.raises(RateLimited):
+                async with limiter.slot():
+                    await throttled()
+
+    run(scenario())
+    assert limiter.limit == 4 and limiter.throttled == 3
+
+    async def ok():
+        return "ok"
+
+    async def recover():
+        for _ in range(40):
+            await limiter.run(ok)
+
+    run(recover())
+    assert limiter.limit == 8
+
+
+def test_rate_limits_are_retried_after_the_provider_asks(monkeypatch, run):
+    monkeypatch.setattr(settings, "PROVIDER_RATE_LIMIT_RETRIES", 2)
+    limiter = AdaptiveLimiter("test", max_concurrency=4)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited()
+        return "ok"
+
+    assert run(limiter.run(flaky)) == "ok"
+    assert len(attempts) == 3
+
+    attempts.clear()
+    monkeypatch.setattr(settings, "PROVIDER_RATE_LIMIT_RETRIES", 1)
+    with pytest.raises(RateLimited):
+        run(limiter.run(flaky))
+
+
+def test_callers_queued_past_the_timeout_get_a_503(monkeypatch, run):
+    monkeypatch.setattr(settings, "PROVIDER_QUEUE_TIMEOUT_SECONDS", 0.05)
+    limiter = AdaptiveLimiter("Claude", max_concurrency=1)
+
+    async def slow():
+        await asyncio.sleep(0.2)
+
+    async def scenario():
+        holder = asyncio.create_task(limiter.run(slow))
+        await asyncio.sleep(0.01)
+        try:
+            await limiter.run(slow)
+        finally:
+            await holder
+
+    with pytest.raises(HTTPException) as raised:
+        run(scenario())
+    assert raised.value.status_code == 503
+    assert raised.value.detail == "Claude is busy. Please retry shortly."
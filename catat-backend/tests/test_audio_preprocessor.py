@@ -0,0 +1,76 @@
+import io
+import math
+import wave
+from array import array
+
+import pytest
+
+from app.config import settings
+from app.services.audio_preprocessor import AudioPreprocessor
+from app.utils import audio
+
+pytestmark = pytest.mark.skipif(not audio.audio_available(), reason="PyAV is not installed")
+
+RATE = audio.SAMPLE_RATE
+
+
+def _padded_tone(silence: float, tone: float) -> bytes:
+    """`tone` seconds of 220 Hz between two runs of `silence` seconds, 16-bit mono PCM"""
+    quiet = bytes(int(silence * RATE) * 2)
+    voiced = array("h", (int(6000 * math.sin(2 * math.pi * 220 * i / RATE)) for i in range(int(tone * RATE))))
+    return quiet + voiced.tobytes() + quiet
+
+
+def _wav(pcm: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        out.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def test_leading_and_trailing_silence_is_trimmed_with_padding():
+    trimmed = audio.trim_silence(_padded_tone(silence=2, tone=1))
+
+    # 0.2s of padding either side, rounded to 30ms frames
+    assert audio.pcm_duration(trimmed) == pytest.approx(1.4, abs=0.06)
+
+
+def test_silence_alone_is_left_for_whisper_to_judge():
+    pcm = bytes(RATE * 2)
+    assert audio.trim_silence(pcm) == pcm
+
+
+@pytest.fixture
+def preprocessor(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_PREPROCESS_ENABLED", True)
+    monkeypatch.setattr(settings, "AUDIO_PREPROCESS_WORKERS", 0)
+    preprocessor = AudioPreprocessor()
+    yield preprocessor
+    preprocessor.close()
+
+
+@pytest.mark.parametrize("codec, extension", [("flac", ".flac"), ("opus", ".ogg")])
+def test_recordings_are_trimmed_and_reencoded(preprocessor, monkeypatch, run, codec, extension):
+    monkeypatch.setattr(settings, "AUDIO_PREPROCESS_CODEC", codec)
+    original = _wav(_padded_tone(silence=3, tone=2))
+
+    processed, filename = run(preprocessor.process(original, "rec.wav"))
+
+    assert filename == f"recording{extension}"
+    assert len(processed) < len(original)
+    # Opus pads the last frame, so decoded length runs a little long
+    assert audio.pcm_duration(audio.decode_pcm(processed)) == pytest.approx(2.4, abs=0.2)
+    assert preprocessor.stats()["seconds_trimmed"] == pytest.approx(5.6, abs=0.1)
+
+
+def test_undecodable_audio_is_uploaded_as_is(preprocessor, run):
+    assert run(preprocessor.process(b"not audio at all", "rec.webm")) == (b"not audio at all", "rec.webm")
+    assert preprocessor.stats()["runs"] == 0
+
+
+def test_nothing_changes_while_disabled(run):
+    original = _wav(_padded_tone(silence=3, tone=2))
+    assert run(AudioPreprocessor().process(original, "rec.wav")) == (original, "rec.wav")
@@ -0,0 +1,64 @@
+import json
+import os
+
+import httpx
+
+from app.config import settings
+from benchmarks.stub_providers import StubGroq, StubAnthropic, install
+
+
+def _transcribe(kwargs) -> str:
+    _, audio = kwargs["file"]
+    return "hm" if audio.startswith(b"short") else "Lampu jalan rosak di taman kami lah"
+
+
+def _events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _post_batch(run, recordings: list, items: list = None) -> httpx.Response:
+    from app.main import app
+    data = {"language": "ms", "letter_type": "complaint"}
+    if items is not None:
+        data["items"] = json.dumps(items)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(
+                "/api/generate-letters/batch",
+                data=data,
+                files=[("audio", (f"rec{i}.webm", audio, "audio/webm")) for i, audio in enumerate(recordings)]
+            )
+    return run(scenario())
+
+
+def test_every_recording_gets_its_own_result_then_a_summary(run):
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01, transcript=_transcribe), StubAnthropic(latency=0.01))
+    recordings = [os.urandom(1024), b"short" + os.urandom(1024), os.urandom(1024)]
+    items = [{"sender_name": "Siti"}, {}, {"sender_name": "Ravi"}]
+
+    events = _events(_post_batch(run, recordings, items).text)
+
+    assert [name for name, _ in events] == ["item"] * 3 + ["done"]
+    assert events[-1][1] == {"total": 3, "succeeded": 2, "failed": 1}
+    results = {data["index"]: data for _, data in events[:-1]}
+    assert results[1]["success"] is False and results[1]["status_code"] == 400
+    # Overrides stay with the recording they were sent for, whatever order items finish in
+    assert results[0]["result"]["structured_data"]["sender"]["name"] == "Siti"
+    assert results[2]["result"]["structured_data"]["sender"]["name"] == "Ravi"
+    assert results[0]["filename"] == "rec0.webm"
+
+
+def test_oversized_batches_and_misaligned_items_are_rejected(monkeypatch, run):
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01), StubAnthropic(latency=0.01))
+    monkeypatch.setattr(settings, "BATCH_MAX_ITEMS", 2)
+
+    too_many = _post_batch(run, [os.urandom(64)] * 3)
+    assert too_many.status_code == 400 and too_many.json()["detail"] == "Too many recordings. Max: 2"
+
+    extra_items = _post_batch(run, [os.urandom(64)], items=[{}, {}])
+    assert extra_items.status_code == 400 and extra_items.json()["detail"] == "More items than recordings"
@@ -0,0 +1,45 @@
+from itertools import product
+from types import SimpleNamespace
+
+from app.models.letter import Language, LetterType, StructuredData
+from app.services.claude_service import SYSTEM_PROMPT, ClaudeService
+from app.services.telemetry import LLM_TOKENS
+from benchmarks.stub_providers import LETTER_HTML, STRUCTURED_JSON, StubGroq, StubAnthropic, install
+
+
+def _recording_anthropic(sent: list, usage=None) -> StubAnthropic:
+    anthropic = StubAnthropic(latency=0.01)
+    message = SimpleNamespace(content=[SimpleNamespace(text=LETTER_HTML)], usage=usage)
+    anthropic.messages.result = lambda kwargs: sent.append(kwargs) or message
+    return anthropic
+
+
+def test_one_shared_block_is_cached_ahead_of_the_per_letter_rules():
+    service = ClaudeService()
+    prompts = [service._build_system_prompt(*key) for key in product(Language, LetterType)]
+
+    assert {blocks[0]["text"] for blocks in prompts} == {SYSTEM_PROMPT}
+    assert all(blocks[0]["cache_control"] == {"type": "ephemeral"} for blocks in prompts)
+    assert all("cache_control" not in block for blocks in prompts for block in blocks[1:])
+    # Sonnet caches nothing under 1024 tokens; every word is at least one token
+    assert len(SYSTEM_PROMPT.split()) >= 1024
+
+
+def test_requests_send_the_cached_prefix_and_count_cache_tokens(run):
+    sent = []
+    usage = SimpleNamespace(input_tokens=180, output_tokens=400, cache_read_input_tokens=1400, cache_creation_input_tokens=0)
+    install(StubGroq(), _recording_anthropic(sent, usage))
+    service = ClaudeService()
+    structured = StructuredData.model_validate_json(STRUCTURED_JSON)
+    before = LLM_TOKENS.snapshot().get(("anthropic", service.model, "cache_read"), 0)
+
+    async def scenario():
+        await service.generate_letter(structured, Language.MALAY, LetterType.COMPLAINT)
+        await service.generate_letter(structured, Language.ENGLISH, LetterType.PROPOSAL)
+
+    run(scenario())
+
+    assert [request["system"][0]["text"] for request in sent] == [SYSTEM_PROMPT, SYSTEM_PROMPT]
+    # The per-request data stays out of the system prompt
+    assert all(structured.subject not in block["text"] for request in sent for block in request["system"])
+    assert LLM_TOKENS.snapshot()[("anthropic", service.model, "cache_read")] - before == 2800
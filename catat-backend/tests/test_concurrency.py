@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+
+import httpx
+from anthropic import AsyncAnthropic
+from groq import AsyncGroq
+
+from app.config import settings
+from app.services.provider_clients import ProviderClients
+from app.services.whisper_service import get_whisper_service
+from app.services.groq_service import get_groq_service
+from app.services.claude_service import get_claude_service
+from benchmarks.stub_providers import StubGroq, StubAnthropic, install
+
+WHISPER, LLM, CLAUDE = 0.2, 0.3, 0.5
+PIPELINE = WHISPER + LLM + CLAUDE
+
+
+def test_concurrent_generations_overlap(run):
+    """N requests against slow providers finish in about one pipeline, not N of them"""
+    concurrency = 10
+    groq = StubGroq(whisper_latency=WHISPER, llm_latency=LLM)
+    install(groq, StubAnthropic(latency=CLAUDE))
+    from app.main import app
+
+    # Distinct audio per request, so neither the transcript cache nor coalescing folds them
+    prefix = os.urandom(16)
+
+    async def scenario() -> float:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async def one(i: int):
+                response = await client.post(
+                    "/api/generate-letter",
+                    data={"language": "ms", "letter_type": "complaint"},
+                    files={"audio": (f"rec{i}.webm", prefix + b"\x1a\x45\xdf\xa3" * 256 + str(i).encode(), "audio/webm")}
+                )
+                assert response.status_code == 200, response.text
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(concurrency)))
+            return time.perf_counter() - start
+
+    elapsed = run(scenario())
+
+    assert groq.audio.transcriptions.count == concurrency
+    # Serialized requests would take concurrency * PIPELINE (10s)
+    assert elapsed < PIPELINE * 2, f"{concurrency} requests took {elapsed:.2f}s, one pipeline is {PIPELINE:.2f}s"
+
+
+def test_health_answers_while_generations_wait_on_providers(run):
+    install(StubGroq(whisper_latency=WHISPER, llm_latency=LLM), StubAnthropic(latency=CLAUDE))
+    from app.main import app
+
+    async def scenario() -> float:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            generations = [
+                asyncio.create_task(client.post(
+                    "/api/generate-letter",
+                    data={"language": "ms", "letter_type": "complaint"},
+                    files={"audio": (f"rec{i}.webm", os.urandom(1024), "audio/webm")}
+                ))
+                for i in range(5)
+            ]
+            await asyncio.sleep(WHISPER / 2)
+            start = time.perf_counter()
+            health = await client.get("/health")
+            elapsed = time.perf_counter() - start
+            assert health.status_code == 200
+            assert all(not task.done() for task in generations)
+            await asyncio.gather(*generations)
+            return elapsed
+
+    # A blocking provider call would hold /health until the pipelines finished
+    assert run(scenario()) < WHISPER
+
+
+def test_services_share_one_pooled_client_per_provider(run, monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "test")
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "test")
+    monkeypatch.setattr(settings, "HTTP_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(settings, "HTTP_MAX_KEEPALIVE_CONNECTIONS", 3)
+    clients = ProviderClients()
+    clients.open()
+
+    assert isinstance(clients.groq, AsyncGroq) and isinstance(clients.anthropic, AsyncAnthropic)
+    for client in (clients.groq, clients.anthropic):
+        pool = client._client._transport._pool
+        assert (pool._max_connections, pool._max_keepalive_connections) == (7, 3)
+        assert client.max_retries == 0
+    run(clients.close())
+
+    install()
+    assert get_whisper_service().client is get_groq_service().client
+    assert get_claude_service().client is not get_groq_service().client
@@ -0,0 +1,56 @@
+import json
+import os
+
+import httpx
+
+from benchmarks.stub_providers import StubGroq, StubAnthropic, install
+
+FORM = {"language": "ms", "letter_type": "complaint", "sender_name": "Siti binti Omar"}
+
+
+def _events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _post(run, path: str, audio: bytes) -> httpx.Response:
+    from app.main import app
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(path, data=FORM, files={"audio": ("rec.webm", audio, "audio/webm")})
+    return run(scenario())
+
+
+def test_stages_stream_in_order_and_add_up_to_the_letter(run):
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01), StubAnthropic(latency=0.05))
+    audio = os.urandom(2048)
+
+    response = _post(run, "/api/generate-letter/stream", audio)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    names = [name for name, _ in events]
+    assert names[:2] == ["transcript", "structured"]
+    assert set(names[2:-1]) == {"letter_chunk"} and len(names) > 4
+    assert names[-1] == "complete"
+
+    complete = events[-1][1]
+    assert "".join(data["text"] for name, data in events if name == "letter_chunk") == complete["letter"]
+    assert events[1][1]["structured_data"]["sender"]["name"] == "Siti binti Omar"
+    # Same letter the buffered endpoint returns
+    assert _post(run, "/api/generate-letter", audio).json()["letter"] == complete["letter"]
+
+
+def test_a_failed_stage_ends_the_stream_with_an_error_event(run):
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01, transcript="hm"), StubAnthropic(latency=0.01))
+
+    response = _post(run, "/api/generate-letter/stream", os.urandom(2048))
+
+    assert response.status_code == 200
+    assert _events(response.text) == [
+        ("error", {"status_code": 400, "detail": "Transcription too short. Please record more details."})
+    ]
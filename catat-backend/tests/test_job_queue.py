@@ -0,0 +1,120 @@
+import asyncio
+import os
+
+from benchmarks.stub_providers import StubGroq, StubAnthropic, install
+
+
+def _fields(job_id: str) -> dict:
+    return dict(
+        id=job_id, status="queued", stage="transcribe", language="ms", letter_type="complaint",
+        overrides="{}", filename="rec.webm", audio=b"\x1a\x45\xdf\xa3" + job_id.encode()
+    )
+
+
+def test_claim_is_won_by_one_worker_until_the_lease_runs_out(tmp_path, run):
+    from app.services.job_store import JobStore
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    async def scenario():
+        await store.create(**_fields("a"))
+        assert await store.claim("a", "w1", lease_seconds=60)
+        assert not await store.claim("a", "w2", lease_seconds=60)
+        assert await store.unfinished() == []
+
+        # w1 stops renewing: the lease lapses and w2 takes the job over
+        await store.update("a", "w1", lease_until=0)
+        assert await store.unfinished() == ["a"]
+        assert await store.claim("a", "w2", lease_seconds=60)
+
+        # w1's late writes and renewals are refused from now on
+        assert not await store.update("a", "w1", transcript="stale")
+        assert not await store.renew("a", "w1", lease_seconds=60)
+        assert await store.update("a", "w2", transcript="fresh")
+        assert await store.renew("a", "w2", lease_seconds=60)
+        job = await store.get("a")
+        assert job["transcript"] == "fresh"
+        assert "audio" not in job
+
+    try:
+        run(scenario())
+    finally:
+        store.close()
+
+
+def test_release_lets_the_next_start_resume_at_once(tmp_path, run):
+    from app.services.job_store import JobStore
+    store = JobStore(str(tmp_path / "jobs.db"))
+
+    async def scenario():
+        await store.create(**_fields("a"))
+        assert await store.claim("a", "w1", lease_seconds=60)
+        await store.release("a", "w2")
+        assert await store.unfinished() == []
+        await store.release("a", "w1")
+        assert await store.unfinished() == ["a"]
+
+    try:
+        run(scenario())
+    finally:
+        store.close()
+
+
+def test_queues_sharing_a_database_run_each_job_once(tmp_path, run):
+    """Every process resubmits the unfinished jobs on start; the claim decides who runs them"""
+    groq = StubGroq(whisper_latency=0.05, llm_latency=0.05)
+    install(groq, StubAnthropic(latency=0.05))
+    from app.services.job_store import JobStore
+    from app.services.job_queue import JobQueue
+
+    path = str(tmp_path / "jobs.db")
+    seed = JobStore(path)
+    first, second = JobQueue(JobStore(path)), JobQueue(JobStore(path))
+    jobs = [os.urandom(8).hex() for _ in range(8)]
+
+    async def scenario():
+        for job_id in jobs:
+            await seed.create(**_fields(job_id))
+        await asyncio.gather(first.start(), second.start())
+        await asyncio.gather(first._queue.join(), second._queue.join())
+        await asyncio.gather(first.stop(), second.stop())
+        return [await seed.get(job_id) for job_id in jobs]
+
+    try:
+        finished = run(scenario())
+    finally:
+        seed.close()
+
+    assert [job["status"] for job in finished] == ["completed"] * len(jobs)
+    assert groq.audio.transcriptions.count == len(jobs)
+
+
+def test_a_lost_lease_cancels_the_run(tmp_path, monkeypatch, run):
+    install(StubGroq(whisper_latency=0.5, llm_latency=0.05), StubAnthropic(latency=0.05))
+    from app.config import settings
+    from app.services.job_store import JobStore
+    from app.services.job_queue import JobQueue
+
+    # Renewals every 0.1s
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.3)
+    store = JobStore(str(tmp_path / "jobs.db"))
+    queue = JobQueue(store)
+
+    async def scenario():
+        await store.create(**_fields("a"))
+        runner = asyncio.create_task(queue._run("a"))
+        await asyncio.sleep(0.05)
+        # Another worker takes the job over while the transcription is still running
+        await store.update("a", queue.worker_id, lease_until=0)
+        assert await store.claim("a", "other", lease_seconds=60)
+        # Cancelled at the next renewal, long before the transcription would return
+        await asyncio.wait_for(runner, timeout=0.3)
+        return await store.get("a")
+
+    try:
+        job = run(scenario())
+    finally:
+        store.close()
+
+    assert job["claimed_by"] == "other"
+    assert job["status"] == "running"
+    assert job["transcript"] is None
@@ -0,0 +1,87 @@
+import io
+import zipfile
+from datetime import date
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.models.letter import Language, StructuredData
+from app.services.letter_renderer import LetterRenderer
+from app.services.letter_template import render_closing, render_header
+from app.utils import documents
+from benchmarks.stub_providers import LETTER_HTML, STRUCTURED_JSON
+
+STRUCTURED = StructuredData.model_validate_json(STRUCTURED_JSON)
+LETTER = (
+    render_header(STRUCTURED, Language.MALAY, today=date(2025, 12, 6))
+    + LETTER_HTML
+    + render_closing(STRUCTURED, Language.MALAY)
+)
+
+
+def test_paragraphs_are_laid_out_by_their_place_in_the_letter():
+    kinds = [kind for kind, _ in documents.parse_letter(LETTER)]
+
+    assert kinds == [
+        "sender", "sender", "sender", "rule", "recipient", "recipient", "recipient", "recipient",
+        "date", "salutation", "subject", "body", "body", "closing", "closing", "signature"
+    ]
+
+
+def test_docx_is_a_reproducible_word_package():
+    rendered = documents.render_docx(LETTER, "complaint", "ms")
+
+    assert rendered == documents.render_docx(LETTER, "complaint", "ms")
+    with zipfile.ZipFile(io.BytesIO(rendered)) as package:
+        assert "word/document.xml" in package.namelist()
+        document = package.read("word/document.xml").decode()
+        footer = package.read("word/footer1.xml").decode()
+    assert "Perkara: Aduan Lampu Jalan Rosak" in document
+    assert "6 DISEMBER 2025" in document
+    assert "Generated by Catat" in footer
+
+
+@pytest.mark.skipif(not documents.pdf_available(), reason="reportlab is not installed")
+def test_pdf_is_reproducible():
+    rendered = documents.render_pdf(LETTER, "complaint", "ms")
+
+    assert rendered.startswith(b"%PDF")
+    assert rendered == documents.render_pdf(LETTER, "complaint", "ms")
+
+
+def test_renders_are_cached_by_content_and_format(monkeypatch, run):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 0)
+    renderer = LetterRenderer(max_size=10, ttl_seconds=60)
+
+    async def scenario():
+        first, key = await renderer.render(LETTER, "docx", "complaint", "ms")
+        again, same_key = await renderer.render(LETTER, "docx", "complaint", "ms")
+        _, english_key = await renderer.render(LETTER, "docx", "complaint", "en")
+        return first, again, key, same_key, english_key
+
+    first, again, key, same_key, english_key = run(scenario())
+    renderer.close()
+
+    assert first == again and key == same_key
+    assert english_key != key
+    assert renderer.renders == 2
+
+
+def test_an_unchanged_letter_answers_304(monkeypatch, run):
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 0)
+    from app.main import app
+    body = {"letter": LETTER, "language": "ms", "letter_type": "complaint", "format": "docx"}
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            rendered = await client.post("/api/letters/render", json=body)
+            cached = await client.post("/api/letters/render", json=body, headers={"If-None-Match": rendered.headers["ETag"]})
+            return rendered, cached
+
+    rendered, cached = run(scenario())
+
+    assert rendered.status_code == 200
+    assert rendered.headers["content-disposition"] == 'attachment; filename="letter.docx"'
+    assert int(rendered.headers["content-length"]) == len(rendered.content)
+    assert cached.status_code == 304 and cached.content == b""
@@ -0,0 +1,58 @@
+import pytest
+
+from app.models.letter import Language
+from app.services.letter_sanitizer import LetterSanitizer, sanitize_letter_body
+
+LEAKY = (
+    "Dear Sir/Madam,\n\n<p>Re: Broken street lamp</p>\n"
+    "<p>The lamp has been out since <b>06/12/2025</b>.<script>alert(1)</script></p>"
+    "<hr><p>Please repair it before December 20th, 2025.</p>"
+    "<p>Yours faithfully,</p><p>Ahmad bin Ali</p>"
+)
+CLEAN = (
+    "<p>Subject: Broken street lamp</p>\n\n"
+    "<p>The lamp has been out since 6 DECEMBER 2025.</p>\n\n"
+    "<p>Please repair it before 20 DECEMBER 2025.</p>"
+)
+
+
+def test_leaked_header_and_closing_are_dropped_and_dates_repaired():
+    html, issues = sanitize_letter_body(LEAKY, Language.ENGLISH, "Ahmad  bin Ali")
+
+    assert html == CLEAN
+    assert issues["leaked_header_or_closing"] == 3
+    assert issues["subject_prefix_repaired"] == 1
+    assert issues["date_format"] == 2
+    assert issues["hr_in_body"] == 1
+
+
+def test_dates_use_the_letter_language():
+    html, issues = sanitize_letter_body("<p>Perkara: Lampu</p><p>Pada 6/12/2025 lampu rosak.</p>", Language.MALAY)
+
+    assert html == "<p>Perkara: Lampu</p>\n\n<p>Pada 6 DISEMBER 2025 lampu rosak.</p>"
+    assert issues == {"date_format": 1}
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 64])
+def test_streamed_output_matches_the_whole_text(size):
+    """A tag, leak or date split across chunks comes out as if the text arrived at once"""
+    sanitizer = LetterSanitizer(Language.ENGLISH, "Ahmad bin Ali")
+    html = "".join(sanitizer.feed(LEAKY[i:i + size]) for i in range(0, len(LEAKY), size)) + sanitizer.close()
+
+    assert html == CLEAN
+    assert sanitizer.issues == sanitize_letter_body(LEAKY, Language.ENGLISH, "Ahmad bin Ali")[1]
+
+
+def test_stray_brackets_are_escaped_not_parsed():
+    html, issues = sanitize_letter_body("<p>Subject: Fees</p><p>Fees went from <5 to >10 ringgit.</p>", Language.ENGLISH)
+
+    assert html == "<p>Subject: Fees</p>\n\n<p>Fees went from &lt;5 to >10 ringgit.</p>"
+    # "<5" is prose, not a malformed tag
+    assert "stray_angle_bracket" not in issues
+
+
+def test_an_empty_body_is_flagged():
+    html, issues = sanitize_letter_body("<p>Yours sincerely,</p>", Language.ENGLISH)
+
+    assert html == ""
+    assert issues["empty_body"] == 1
@@ -0,0 +1,104 @@
+import sqlite3
+import uuid
+
+from app.config import settings
+from app.models.letter import GenerateLetterResponse, Language, LetterMetadata, LetterType, StructuredData
+from app.services.letter_store import LetterStore, SQLiteLetterDB, letter_row
+from app.services.telemetry import LETTER_WRITES
+from benchmarks.stub_providers import LETTER_HTML, STRUCTURED_JSON
+
+
+def _response(letter: str = LETTER_HTML) -> GenerateLetterResponse:
+    structured_data = StructuredData.model_validate_json(STRUCTURED_JSON)
+    return GenerateLetterResponse(
+        success=True,
+        transcript="Lampu jalan rosak di taman kami lah",
+        structured_data=structured_data,
+        letter=letter,
+        metadata=LetterMetadata(language=Language.MALAY, letter_type=LetterType.COMPLAINT)
+    )
+
+
+def _rows(path: str) -> list:
+    db = sqlite3.connect(path)
+    try:
+        return db.execute("SELECT id, content, created_at, updated_at FROM letters ORDER BY created_at").fetchall()
+    finally:
+        db.close()
+
+
+def test_a_revision_in_the_same_batch_keeps_the_first_created_at(tmp_path, monkeypatch, run):
+    monkeypatch.setattr(settings, "LETTER_PERSIST_BATCH_WAIT_MS", 200)
+    path = str(tmp_path / "letters.db")
+    store = LetterStore(SQLiteLetterDB(path))
+    generation_id = uuid.uuid4().hex
+    before = LETTER_WRITES.snapshot().get(("queued",), 0)
+
+    async def scenario():
+        store.start()
+        first = await store.save(generation_id, _response("<p>v1</p>"))
+        second = await store.save(generation_id, _response("<p>v2</p>"))
+        other = await store.save(uuid.uuid4().hex, _response())
+        await store.stop()
+        return first, second, other
+
+    first, second, other = run(scenario())
+
+    assert first == second == str(uuid.UUID(generation_id))
+    rows = _rows(path)
+    assert [(row[0], row[1]) for row in rows] == [(first, "<p>v2</p>"), (other, LETTER_HTML)]
+    assert rows[0][2] < rows[0][3]
+    assert store.stats() == {
+        "backend": "sqlite", "queue": 0, "batches": 1, "queued": 3, "written": 3, "dropped": 0, "failed": 0
+    }
+    assert LETTER_WRITES.snapshot()[("queued",)] - before == 3
+
+
+def test_an_older_version_never_overwrites_a_newer_one(tmp_path, run):
+    path = str(tmp_path / "letters.db")
+    db = SQLiteLetterDB(path)
+    letter_id = str(uuid.uuid4())
+    older = letter_row(letter_id, _response("<p>generated</p>"))
+    newer = {**letter_row(letter_id, _response("<p>edited</p>")), "updated_at": older["updated_at"] + 1}
+
+    async def scenario():
+        # A batch flushed late lands after the edit the user saved meanwhile
+        await db.write([newer])
+        await db.write([older])
+        await db.close()
+
+    run(scenario())
+
+    assert [row[1] for row in _rows(path)] == ["<p>edited</p>"]
+
+
+def test_a_failing_database_counts_the_batch_as_failed(monkeypatch, run):
+    monkeypatch.setattr(settings, "LETTER_PERSIST_RETRIES", 0)
+
+    class Down:
+        name = "down"
+
+        async def write(self, rows):
+            raise ConnectionError("database unreachable")
+
+        async def close(self):
+            pass
+
+    store = LetterStore(Down())
+
+    async def scenario():
+        store.start()
+        saved = await store.save(uuid.uuid4().hex, _response())
+        await store.stop()
+        return saved
+
+    # The request still gets its id; only the stored copy is lost
+    assert run(scenario()) is not None
+    assert store.counts == {"queued": 1, "written": 0, "dropped": 0, "failed": 1}
+
+
+def test_a_disabled_store_saves_nothing(run):
+    store = LetterStore(None)
+    store.start()
+    assert run(store.save(uuid.uuid4().hex, _response())) is None
+    assert store.stats()["backend"] is None
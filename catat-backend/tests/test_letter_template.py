@@ -0,0 +1,66 @@
+from datetime import date
+
+from app.models.letter import Language, LetterType, StructuredData
+from app.services.claude_service import ClaudeService
+from app.services.letter_template import assemble_letter, format_letter_date, letter_body, render_closing, render_header
+from benchmarks.stub_providers import LETTER_HTML, STRUCTURED_JSON, StubGroq, StubAnthropic, install
+
+BODY = "<p>Perkara: Aduan Lampu Jalan Rosak</p>\n\n<p>Lampu jalan di taman kami telah rosak.</p>"
+
+
+def _structured(**sender) -> StructuredData:
+    structured = StructuredData.model_validate_json(STRUCTURED_JSON)
+    structured.sender = structured.sender.model_copy(update=sender)
+    return structured
+
+
+def test_dates_are_written_in_capitals_without_a_leading_zero():
+    assert format_letter_date(date(2025, 12, 6), Language.MALAY) == "6 DISEMBER 2025"
+    assert format_letter_date(date(2025, 3, 6), Language.ENGLISH) == "6 MARCH 2025"
+    assert format_letter_date(date(2025, 3, 6), Language.MIXED) == "6 MARCH 2025"
+
+
+def test_header_and_closing_follow_the_letter_language():
+    structured = _structured(name="Ahmad <bin> Ali", contact=None)
+
+    header = render_header(structured, Language.MALAY, today=date(2025, 12, 6))
+    assert header == (
+        "<p>Ahmad &lt;bin&gt; Ali</p>\n\n<p>Jalan Ampang, Kuala Lumpur</p>\n\n<hr>\n\n"
+        "<p>Pengarah</p>\n\n<p>Pengarah</p>\n\n<p>DBKL</p>\n\n<p>Jalan Raja Laut</p>\n\n"
+        "<p>6 DISEMBER 2025</p>\n\n<p>Tuan/Puan,</p>\n\n"
+    )
+    assert render_closing(structured, Language.MALAY) == (
+        "\n\n<p>Sekian, terima kasih.</p>\n\n<p>Yang benar,</p>\n\n<p>Ahmad &lt;bin&gt; Ali</p>"
+    )
+    assert render_closing(_structured(name=None), Language.ENGLISH) == (
+        "\n\n<p>Yours faithfully,</p>\n\n<p>[Sender Name]</p>"
+    )
+
+
+def test_the_body_is_recovered_from_an_assembled_letter():
+    for language in (Language.MALAY, Language.ENGLISH):
+        letter = assemble_letter(_structured(), language, BODY)
+        assert letter_body(letter, language) == BODY
+
+
+def test_claude_is_asked_for_the_subject_and_body_only():
+    service = ClaudeService()
+    structured = _structured()
+
+    prompt = service._build_user_prompt(structured, Language.MALAY, LetterType.COMPLAINT)
+    rules = service._build_system_prompt(Language.MALAY, LetterType.COMPLAINT)[1]["text"]
+
+    assert prompt.rstrip().endswith("Write the subject line and body paragraphs now.")
+    assert "complete" not in prompt.lower()
+    assert rules.startswith("Write the subject and body of a professional complaint letter in Bahasa Malaysia.")
+
+
+def test_generated_letters_wrap_claudes_body_in_the_local_blocks(run):
+    install(StubGroq(), StubAnthropic(latency=0.01))
+    structured = _structured(name="Ahmad bin Ali")
+
+    letter = run(ClaudeService().generate_letter(structured, Language.MALAY, LetterType.COMPLAINT))
+
+    assert letter.startswith("<p>Ahmad bin Ali</p>")
+    assert letter.endswith("<p>Yang benar,</p>\n\n<p>Ahmad bin Ali</p>")
+    assert letter_body(letter, Language.MALAY) == LETTER_HTML
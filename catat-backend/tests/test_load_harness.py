@@ -0,0 +1,119 @@
+import anthropic
+import groq
+import httpx
+import pytest
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient as AnthropicHttpClient
+from groq import AsyncGroq, DefaultAsyncHttpxClient as GroqHttpClient
+
+from benchmarks.load_test import percentile, summarize, parse_server_timing, run_level
+from benchmarks.stub_providers import StubGroq, StubAnthropic, install, STRUCTURED_JSON, LETTER_HTML
+from benchmarks.stub_servers import create_app, parse_latency
+
+
+def _clients(stub) -> tuple:
+    # The real SDKs, as the backend builds them, with the stub app as the network
+    transport = httpx.ASGITransport(app=stub)
+    groq_client = AsyncGroq(
+        api_key="test", base_url="http://stub", max_retries=0,
+        http_client=GroqHttpClient(transport=transport)
+    )
+    anthropic_client = AsyncAnthropic(
+        api_key="test", base_url="http://stub", max_retries=0,
+        http_client=AnthropicHttpClient(transport=transport)
+    )
+    return groq_client, anthropic_client
+
+
+def test_percentiles_interpolate_between_ranks():
+    assert percentile([], 50) is None
+    assert percentile([10.0], 99) == 10.0
+    assert percentile([4.0, 1.0, 3.0, 2.0], 50) == 2.5
+    assert summarize([1.0, 2.0, 3.0])["mean"] == 2.0
+    assert summarize([])["p95"] is None
+
+
+def test_server_timing_sums_repeated_stages_and_drops_the_total():
+    header = "transcribe;dur=120.5, transcribe;dur=80, structure;dur=40;desc=\"llm\", edge;desc=cdn;dur=5, total;dur=300, cache"
+
+    assert parse_server_timing(header) == {"transcribe": 200.5, "structure": 40.0, "edge": 5.0}
+    assert parse_server_timing("") == {}
+
+
+def test_latency_specs():
+    assert parse_latency("0.5")() == 0.5
+    assert parse_latency("fixed:0.25")() == 0.25
+    assert 0.2 <= parse_latency("uniform:0.2,0.8")() <= 0.8
+    assert parse_latency("normal:0,1")() >= 0.0
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1")
+
+
+def test_the_sdks_parse_every_stub_endpoint(run):
+    stub = create_app(whisper_latency="0", groq_latency="0", claude_latency="0", stream_chunk=64)
+    groq_client, anthropic_client = _clients(stub)
+
+    async def scenario():
+        transcript = await groq_client.audio.transcriptions.create(
+            file=("rec.webm", b"\x1a\x45\xdf\xa3" + bytes(4000)), model="whisper-large-v3", language="ms"
+        )
+        completion = await groq_client.chat.completions.create(
+            model="llama", messages=[{"role": "user", "content": "hi"}]
+        )
+        message = await anthropic_client.messages.create(
+            model="claude", max_tokens=100, messages=[{"role": "user", "content": "hi"}]
+        )
+        async with anthropic_client.messages.stream(
+            model="claude", max_tokens=100, messages=[{"role": "user", "content": "hi"}]
+        ) as stream:
+            streamed = "".join([text async for text in stream.text_stream])
+        await groq_client.models.list()
+        await anthropic_client.models.list()
+        return transcript, completion, message, streamed
+
+    transcript, completion, message, streamed = run(scenario())
+
+    assert transcript.text.startswith("Lampu jalan rosak")
+    assert completion.choices[0].message.content == STRUCTURED_JSON
+    assert message.content[0].text == LETTER_HTML
+    assert message.usage.cache_read_input_tokens == 800
+    assert streamed == LETTER_HTML
+
+
+def test_injected_429s_reach_the_sdk_as_rate_limit_errors(run):
+    stub = create_app(whisper_latency="0", groq_latency="0", claude_latency="0", rate_limit=1.0, retry_after=2.5)
+    groq_client, anthropic_client = _clients(stub)
+
+    async def scenario():
+        with pytest.raises(groq.RateLimitError) as groq_error:
+            await groq_client.chat.completions.create(model="llama", messages=[{"role": "user", "content": "hi"}])
+        with pytest.raises(anthropic.RateLimitError) as anthropic_error:
+            await anthropic_client.messages.create(
+                model="claude", max_tokens=100, messages=[{"role": "user", "content": "hi"}]
+            )
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub), base_url="http://stub") as client:
+            counts = (await client.get("/health")).json()
+        return groq_error.value, anthropic_error.value, counts
+
+    groq_error, anthropic_error, counts = run(scenario())
+
+    assert groq_error.response.headers["retry-after"] == "2.5"
+    assert anthropic_error.response.status_code == 429
+    assert counts["groq_429"] == 1 and counts["claude_429"] == 1
+    assert counts["groq"] == 0 and counts["claude"] == 0
+
+
+def test_a_load_level_reports_latency_and_stage_breakdown(run):
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01), StubAnthropic(latency=0.01))
+    from app.main import app
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load") as client:
+            return await run_level(client, concurrency=2, requests=4, stream=False)
+
+    result = run(scenario())
+
+    assert result["ok"] == 4 and result["errors"] == 0
+    assert result["statuses"] == {"200": 4}
+    assert result["latency_ms"]["p50"] > 0
+    assert result["stages_ms"]
+    assert all(stage["p50"] is not None for stage in result["stages_ms"].values())
@@ -0,0 +1,112 @@
+import io
+import math
+import wave
+from array import array
+
+import pytest
+
+from app.services.long_audio import may_be_long, plan_segments, split_long_audio, stitch_transcripts
+from app.utils import audio
+
+needs_av = pytest.mark.skipif(not audio.audio_available(), reason="PyAV is not installed")
+
+
+def _speech(seconds: float) -> bytes:
+    """4s tone bursts separated by 0.6s of silence, 16-bit mono PCM"""
+    rate = audio.SAMPLE_RATE
+    burst = array("h", (int(6000 * math.sin(2 * math.pi * 220 * i / rate)) for i in range(4 * rate)))
+    gap = array("h", bytes(int(0.6 * rate) * 2))
+    samples = array("h")
+    while len(samples) < seconds * rate:
+        samples.extend(burst)
+        samples.extend(gap)
+    return samples[:int(seconds * rate)].tobytes()
+
+
+def _wav(pcm: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(audio.SAMPLE_RATE)
+        out.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _live_webm(pcm: bytes) -> bytes:
+    """Opus in WebM without a duration in the header, as MediaRecorder writes it"""
+    import av
+    buffer = io.BytesIO()
+    with av.open(buffer, "w", format="webm", options={"live": "1"}) as container:
+        stream = container.add_stream("libopus", rate=audio.SAMPLE_RATE, layout="mono")
+        step, pts = 320, 0
+        for offset in range(0, len(pcm), step * 2):
+            chunk = pcm[offset:offset + step * 2].ljust(step * 2, b"\0")
+            frame = av.AudioFrame(format="s16", layout="mono", samples=step)
+            frame.planes[0].update(chunk)
+            frame.sample_rate = audio.SAMPLE_RATE
+            frame.pts = pts
+            pts += step
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+
+def test_small_uploads_never_count_as_long():
+    # 60s of Opus needs at least 120KB, 60s of 8 kHz PCM WAV 960KB
+    assert not may_be_long(100_000, "rec.webm", 60)
+    assert may_be_long(200_000, "rec.webm", 60)
+    assert not may_be_long(500_000, "rec.WAV", 60)
+    assert may_be_long(1_000_000, "rec.wav", 60)
+    assert may_be_long(200_000, "recording", 60)
+
+
+def test_cuts_snap_back_to_the_nearest_silence():
+    plan = plan_segments(100, silences=[(25, 27), (52, 54), (90, 91)], segment_seconds=30, overlap_seconds=1)
+
+    assert plan == [(0.0, 27.0), (25.0, 54.0), (52.0, 84.0), (82.0, 100)]
+
+
+def test_cuts_fall_on_the_grid_without_silences():
+    assert plan_segments(50, [], segment_seconds=20, overlap_seconds=0) == [(0, 20), (20, 40), (40, 50)]
+    assert plan_segments(15, [], segment_seconds=20, overlap_seconds=1) == [(0.0, 15)]
+
+
+def test_overlapping_words_are_kept_once():
+    parts = ["saya ingin membuat aduan tentang", "Aduan tentang lampu jalan", "jalan yang rosak."]
+
+    assert stitch_transcripts(parts) == "saya ingin membuat aduan tentang lampu jalan yang rosak."
+
+
+@needs_av
+def test_webm_duration_comes_from_packet_timestamps():
+    recording = _live_webm(_speech(3))
+
+    assert audio.probe_duration(recording) == pytest.approx(3, abs=0.05)
+
+
+@needs_av
+@pytest.mark.parametrize("encode", [_wav, _live_webm])
+def test_short_recordings_are_left_whole_without_decoding(encode, monkeypatch):
+    recording = encode(_speech(10))
+    decoded = []
+    monkeypatch.setattr(audio, "decode_pcm", lambda *args: decoded.append(1))
+
+    # Big enough to pass the size check, so the probe is what keeps it whole
+    assert may_be_long(len(recording), "rec.webm", 15)
+    assert split_long_audio(recording, threshold_seconds=15, segment_seconds=10, overlap_seconds=1) is None
+    assert decoded == []
+
+
+@needs_av
+def test_long_recordings_are_split_into_flac_segments():
+    segments = split_long_audio(_wav(_speech(30)), threshold_seconds=20, segment_seconds=15, overlap_seconds=0.5)
+
+    assert len(segments) >= 2
+    assert {extension for _, extension in segments} == {".flac"}
+    durations = [audio.pcm_duration(audio.decode_pcm(data)) for data, _ in segments]
+    assert all(duration <= 15 + 1 for duration in durations)
+    # Every second is covered, plus the overlap at each cut
+    assert sum(durations) == pytest.approx(30 + (len(segments) - 1), abs=0.1)
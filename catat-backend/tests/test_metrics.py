@@ -0,0 +1,61 @@
+import json
+import os
+
+import httpx
+
+from app.utils.metrics import Registry
+from benchmarks.stub_providers import StubGroq, StubAnthropic, install
+
+
+def test_exposition_format_and_worker_snapshots_are_summed():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ["status"])
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    requests.inc(status='5"00')
+    requests.inc(2, status="200")
+    for seconds in (0.05, 0.5, 5):
+        latency.observe(seconds)
+
+    # Another worker's snapshot, after the round trip through the shared state
+    other = json.loads(json.dumps(registry.snapshot()))
+
+    assert registry.render([other]).splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{status="5\\"00"} 2',
+        'requests_total{status="200"} 4',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 4',
+        'latency_seconds_bucket{le="+Inf"} 6',
+        "latency_seconds_sum 11.1",
+        "latency_seconds_count 6"
+    ]
+
+
+def test_responses_carry_stage_timings_and_metrics_count_them(run):
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01), StubAnthropic(latency=0.01))
+    from app.main import app
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            generated = await client.post(
+                "/api/generate-letter",
+                data={"language": "en", "letter_type": "complaint"},
+                files={"audio": ("rec.webm", os.urandom(2048), "audio/webm")}
+            )
+            return generated, await client.get("/metrics")
+
+    generated, metrics = run(scenario())
+
+    assert generated.status_code == 200
+    stages = [entry.split(";")[0] for entry in generated.headers["Server-Timing"].split(", ")]
+    assert {"transcribe", "structure", "generate"} <= set(stages)
+    assert stages[-1] == "total"
+
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = metrics.text.splitlines()
+    for stage in ("transcribe", "structure", "generate"):
+        assert any(line.startswith(f'catat_stage_duration_seconds_count{{stage="{stage}"}}') for line in lines)
+    assert any(line.startswith('catat_http_requests_total{method="POST",status="200"}') for line in lines)
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.adaptive_limiter import AdaptiveLimiter
+from app.services.model_router import ModelRouter, latency_budget
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _router() -> ModelRouter:
+    return ModelRouter("generate", "primary", "fallback", AdaptiveLimiter("test", 8))
+
+
+def _provider(calls: list, behaviour: dict):
+    """behaviour maps a model to its latency, or to an error it raises"""
+    async def call(model: str) -> str:
+        calls.append(model)
+        outcome = behaviour[model]
+        if isinstance(outcome, Exception):
+            raise outcome
+        await asyncio.sleep(outcome)
+        return f"letter from {model}"
+    return call
+
+
+@pytest.mark.parametrize("status_code", [400, 401, 404])
+def test_non_transient_primary_errors_are_raised_without_fallback(status_code, run):
+    router, calls = _router(), []
+    call = _provider(calls, {"primary": ProviderError(status_code), "fallback": 0})
+
+    with pytest.raises(ProviderError):
+        run(router.run(call))
+    assert calls == ["primary"]
+
+
+def test_transient_primary_errors_are_retried_then_fall_back(monkeypatch, run):
+    monkeypatch.setattr(settings, "PROVIDER_TRANSIENT_RETRIES", 1)
+    router, calls = _router(), []
+    call = _provider(calls, {"primary": ProviderError(503), "fallback": 0})
+
+    assert run(router.run(call)) == ("letter from fallback", "fallback")
+    assert calls == ["primary", "primary", "fallback"]
+    assert router.fallback_wins == 1
+
+
+def test_a_slow_primary_is_hedged_to_the_fallback(run):
+    router, calls = _router(), []
+    call = _provider(calls, {"primary": 1.0, "fallback": 0.01})
+
+    async def scenario():
+        # Without latency history the hedge fires at half the remaining budget
+        with latency_budget(0.4):
+            return await router.run(call)
+
+    assert run(scenario()) == ("letter from fallback", "fallback")
+    assert router.hedged == 1
+
+
+def test_a_fast_primary_is_never_hedged(run):
+    router, calls = _router(), []
+    call = _provider(calls, {"primary": 0.01, "fallback": 0.01})
+
+    async def scenario():
+        with latency_budget(1.0):
+            return await router.run(call)
+
+    assert run(scenario()) == ("letter from primary", "primary")
+    assert calls == ["primary"]
+
+
+def test_running_out_of_budget_is_a_504(run):
+    router = _router()
+    call = _provider([], {"primary": 1.0, "fallback": 1.0})
+
+    async def scenario():
+        with latency_budget(0.1):
+            return await router.run(call)
+
+    with pytest.raises(HTTPException) as raised:
+        run(scenario())
+    assert raised.value.status_code == 504
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import httpx
+from starlette.responses import PlainTextResponse, StreamingResponse
+
+from app.config import settings
+from app.middleware.profiling import ProfilingMiddleware
+from app.services.profiler import ProfileStore, profile_store
+
+TOKEN = "profile-secret"
+
+
+def _burn(seconds: float):
+    # Holds the loop thread, as blocking serialization or regex work would
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _generate(scope, receive, send):
+    # Reading the body first, as the routes do, lets the loop lag monitor start
+    await receive()
+    await asyncio.sleep(0)
+    _burn(0.08)
+    await asyncio.sleep(0.02)
+    response = PlainTextResponse("letter", headers={"server-timing": "generate;dur=80.0, total;dur=100.0"})
+    await response(scope, receive, send)
+
+
+async def _generate_stream(scope, receive, send):
+    async def chunks():
+        for _ in range(4):
+            await asyncio.sleep(0.05)
+            yield b"chunk"
+    await StreamingResponse(chunks(), media_type="text/event-stream")(scope, receive, send)
+
+
+def _request(run, app, path="/api/generate-letter", headers=None, method="POST") -> httpx.Response:
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.request(method, path, headers=headers or {})
+    return run(scenario())
+
+
+def _middleware(inner, store=None, sample_rate=0.0) -> ProfilingMiddleware:
+    return ProfilingMiddleware(
+        inner, store or ProfileStore(10, 3600), token=TOKEN, sample_rate=sample_rate, path_prefix="/api/generate-letter"
+    )
+
+
+def test_only_requests_with_the_token_or_in_the_sample_are_profiled(run):
+    profiled = _middleware(_generate)
+
+    assert "x-profile-id" not in _request(run, profiled).headers
+    assert "x-profile-id" not in _request(run, profiled, headers={"X-Profile": "guess"}).headers
+    assert "x-profile-id" not in _request(run, profiled, "/api/jobs", headers={"X-Profile": TOKEN}).headers
+    assert "x-profile-id" not in _request(run, profiled, headers={"X-Profile": TOKEN}, method="GET").headers
+    assert "x-profile-id" in _request(run, profiled, headers={"X-Profile": TOKEN}).headers
+    assert "x-profile-id" in _request(run, _middleware(_generate, sample_rate=1.0)).headers
+
+
+def test_the_report_shows_where_the_loop_was_blocked(run, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_INTERVAL_MS", 2.0)
+    store = ProfileStore(10, 3600)
+
+    response = _request(run, _middleware(_generate, store), headers={"X-Profile": TOKEN})
+    report = run(store.get(response.headers["x-profile-id"]))
+
+    assert response.text == "letter"
+    assert report["trigger"] == "header" and report["status"] == 200
+    assert report["server_timing"] == "generate;dur=80.0, total;dur=100.0"
+    assert report["duration_ms"] >= 100
+    assert report["samples"]["busy"] > 0
+    assert report["top_self"][0]["function"].startswith("_burn (")
+    assert report["loop_lag"]["blocked_ms"] > 0
+    assert any("_burn (" in line for line in report["folded"])
+
+
+def test_streamed_responses_are_profiled_to_the_last_chunk(run):
+    store = ProfileStore(10, 3600)
+
+    response = _request(run, _middleware(_generate_stream, store), headers={"X-Profile": TOKEN})
+    report = run(store.get(response.headers["x-profile-id"]))
+
+    assert response.text == "chunk" * 4
+    assert report["duration_ms"] >= 200
+
+
+def test_one_profile_runs_at_a_time(run):
+    store = ProfileStore(10, 3600)
+    profiled = _middleware(_generate_stream, store)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=profiled), base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.post("/api/generate-letter", headers={"X-Profile": TOKEN}) for _ in range(3)
+            ))
+
+    responses = run(scenario())
+
+    assert sum("x-profile-id" in response.headers for response in responses) == 1
+    assert store.active is False
+
+
+def test_the_store_lists_newest_first_and_keeps_the_newest(run):
+    store = ProfileStore(2, 3600)
+    profiled = _middleware(_generate_stream, store)
+
+    ids = [_request(run, profiled, headers={"X-Profile": TOKEN}).headers["x-profile-id"] for _ in range(3)]
+    listed = [summary["id"] for summary in run(store.list())]
+
+    assert listed[:2] == ids[:0:-1]
+    assert ids[0] not in listed
+
+
+def test_admin_routes_serve_reports_only_with_the_admin_token(run, monkeypatch):
+    from app.main import app
+
+    profile_id = _request(run, _middleware(_generate, profile_store), headers={"X-Profile": TOKEN}).headers["x-profile-id"]
+    path = f"/api/admin/profiles/{profile_id}"
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert _request(run, app, path, method="GET").status_code == 404
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    assert _request(run, app, path, headers={"X-Admin-Token": "guess"}, method="GET").status_code == 403
+
+    admin = {"X-Admin-Token": "admin-secret"}
+    assert _request(run, app, path, headers=admin, method="GET").json()["id"] == profile_id
+    folded = _request(run, app, f"{path}?format=folded", headers=admin, method="GET")
+    assert folded.headers["content-type"].startswith("text/plain") and "_burn (" in folded.text
+    listing = _request(run, app, "/api/admin/profiles", headers=admin, method="GET").json()["profiles"]
+    assert profile_id in [summary["id"] for summary in listing]
+    assert _request(run, app, "/api/admin/profiles/missing", headers=admin, method="GET").status_code == 404
@@ -0,0 +1,70 @@
+import httpx
+from starlette.responses import PlainTextResponse
+
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.shared_state import MemoryState, SharedState
+from app.services.telemetry import RATE_LIMIT_FAIL_OPEN
+
+
+async def _ok(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def _scope(headers=(), client=("10.0.0.1", 5000)) -> dict:
+    return {"headers": [(name.encode(), value.encode()) for name, value in headers], "client": client}
+
+
+def test_only_configured_api_keys_pick_the_bucket():
+    limiter = RateLimitMiddleware(_ok, 5, MemoryState(1.0), api_keys=["team-key"])
+
+    keyed = limiter._client_key(_scope([("x-api-key", "team-key")]))
+    assert keyed.startswith("key:") and "team-key" not in keyed
+    # A made-up key would otherwise buy a fresh bucket per request
+    assert limiter._client_key(_scope([("x-api-key", "anything")])) == "ip:10.0.0.1"
+
+
+def test_forwarded_for_is_read_only_behind_trusted_proxies():
+    headers = [("x-forwarded-for", "6.6.6.6, 1.2.3.4, 10.0.0.2")]
+
+    direct = RateLimitMiddleware(_ok, 5, MemoryState(1.0))
+    assert direct._client_key(_scope(headers)) == "ip:10.0.0.1"
+
+    # One proxy: its own hop is the last one, the client's address the one it appended
+    one = RateLimitMiddleware(_ok, 5, MemoryState(1.0), trusted_proxies=1)
+    assert one._client_key(_scope(headers)) == "ip:10.0.0.2"
+    two = RateLimitMiddleware(_ok, 5, MemoryState(1.0), trusted_proxies=2)
+    assert two._client_key(_scope(headers)) == "ip:1.2.3.4"
+    # Fewer hops than proxies means the request skipped one of them
+    assert two._client_key(_scope([("x-forwarded-for", "1.2.3.4")])) == "ip:10.0.0.1"
+
+
+def test_requests_past_the_limit_get_429(run):
+    app = RateLimitMiddleware(_ok, 3, MemoryState(1.0))
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            posts = [(await client.post("/api/generate-letter")).status_code for _ in range(4)]
+            # Reads and non-API paths are never limited
+            get = await client.get("/api/generate-letter")
+            other = await client.post("/metrics")
+            return posts, get, other
+
+    posts, get, other = run(scenario())
+    assert posts == [200, 200, 200, 429]
+    assert get.status_code == 200 and other.status_code == 200
+
+
+def test_an_unavailable_store_lets_requests_through(run):
+    class Broken(SharedState):
+        async def _take_token(self, key, capacity, refill_per_second):
+            raise ConnectionError("store down")
+
+    app = RateLimitMiddleware(_ok, 1, Broken(1.0))
+    before = RATE_LIMIT_FAIL_OPEN.snapshot().get((), 0)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [(await client.post("/api/generate-letter")).status_code for _ in range(3)]
+
+    assert run(scenario()) == [200, 200, 200]
+    assert RATE_LIMIT_FAIL_OPEN.snapshot()[()] - before == 3
@@ -0,0 +1,94 @@
+import asyncio
+
+from app.models.letter import ContactOverrides, Language, LetterType
+from app.services.request_coalescer import RequestCoalescer, generation_key
+from app.services.telemetry import provider_calls
+
+
+def _pipeline(started: list, delay: float = 0.05, error: Exception = None):
+    async def pipeline():
+        started.append(1)
+        provider_calls.get()["transcribe"] += 1
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return object()
+    return pipeline
+
+
+def test_identical_requests_share_one_run(run):
+    coalescer = RequestCoalescer()
+    started = []
+
+    async def scenario():
+        return await asyncio.gather(*(coalescer.run("k", _pipeline(started)) for _ in range(5)))
+
+    results = run(scenario())
+
+    assert len(started) == 1
+    assert all(result is results[0] for result in results)
+    assert coalescer.stats() == {"in_flight": 0, "leaders": 1, "followers": 4, "calls_saved": {"transcribe": 4}}
+
+
+def test_different_keys_run_separately(run):
+    coalescer = RequestCoalescer()
+    started = []
+
+    async def scenario():
+        await asyncio.gather(coalescer.run("a", _pipeline(started)), coalescer.run("b", _pipeline(started)))
+
+    run(scenario())
+    assert len(started) == 2
+
+
+def test_an_error_reaches_every_waiter_and_frees_the_key(run):
+    coalescer = RequestCoalescer()
+    started = []
+
+    async def scenario():
+        failing = _pipeline(started, error=ValueError("provider down"))
+        results = await asyncio.gather(*(coalescer.run("k", failing) for _ in range(3)), return_exceptions=True)
+        # The next request for the key starts a fresh run instead of replaying the error
+        await coalescer.run("k", _pipeline(started))
+        return results
+
+    results = run(scenario())
+
+    assert [type(result) for result in results] == [ValueError] * 3
+    assert len(started) == 2
+
+
+def test_the_run_survives_until_its_last_waiter_leaves(run):
+    coalescer = RequestCoalescer()
+    started = []
+
+    async def scenario():
+        leader = asyncio.create_task(coalescer.run("k", _pipeline(started, delay=0.2)))
+        follower = asyncio.create_task(coalescer.run("k", _pipeline(started, delay=0.2)))
+        await asyncio.sleep(0.05)
+        flight = coalescer._flights["k"]
+
+        # One client disconnecting leaves the run to the other
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        assert not flight.task.done()
+
+        follower.cancel()
+        await asyncio.gather(leader, follower, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flight
+
+    flight = run(scenario())
+
+    assert flight.task.cancelled()
+    assert coalescer.stats()["in_flight"] == 0
+    assert len(started) == 1
+
+
+def test_keys_ignore_whitespace_in_the_form_but_not_the_audio():
+    def key(audio: bytes, name: str, budget=None) -> str:
+        return generation_key(audio, Language.MALAY, LetterType.COMPLAINT, ContactOverrides(sender_name=name), budget)
+
+    assert key(b"audio", "Ahmad bin Ali") == key(b"audio", "  Ahmad   bin Ali ")
+    assert key(b"audio", "Ahmad bin Ali") != key(b"audio!", "Ahmad bin Ali")
+    assert key(b"audio", "Ahmad bin Ali") != key(b"audio", "Ahmad bin Ali", budget=5.0)
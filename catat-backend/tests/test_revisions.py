@@ -0,0 +1,102 @@
+import os
+from types import SimpleNamespace
+
+import httpx
+
+from app.models.letter import Language
+from app.services.letter_template import letter_body
+from benchmarks.stub_providers import LETTER_HTML, StubGroq, StubAnthropic, install
+
+REWRITTEN = "<p>Saya memohon pihak tuan membaiki lampu tersebut dalam tempoh seminggu.</p>"
+
+
+def _anthropic(prompts: list) -> StubAnthropic:
+    """Claude stub: paragraph rewrites get REWRITTEN, everything else the stock letter"""
+    anthropic = StubAnthropic(latency=0.01)
+
+    def reply(kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        prompts.append(prompt)
+        text = REWRITTEN if "Rewrite ONLY paragraph" in prompt else LETTER_HTML
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=None)
+
+    anthropic.messages.result = reply
+    return anthropic
+
+
+def _session(run, *requests):
+    """Generate a letter, then send each (path suffix, JSON body) revision in turn"""
+    from app.main import app
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            generated = await client.post(
+                "/api/generate-letter",
+                data={"language": "ms", "letter_type": "complaint", "sender_name": "Ahmad bin Ali"},
+                files={"audio": ("rec.webm", os.urandom(2048), "audio/webm")}
+            )
+            generation_id = generated.json()["generation_id"]
+            revisions = [
+                await client.post(f"/api/letters/{generation_id if suffix is None else suffix}/revise", json=body)
+                for suffix, body in requests
+            ]
+            return generated.json(), revisions
+    return run(scenario())
+
+
+def test_contact_changes_are_rendered_without_any_model_call(run):
+    prompts = []
+    groq = StubGroq(whisper_latency=0.01, llm_latency=0.01)
+    install(groq, _anthropic(prompts))
+
+    generated, [revised] = _session(run, (None, {"contacts": {"sender_name": "Siti binti Omar"}}))
+
+    assert revised.status_code == 200
+    letter = revised.json()["letter"]
+    assert letter.endswith("<p>Siti binti Omar</p>") and "Ahmad bin Ali" not in letter
+    assert letter_body(letter, Language.MALAY) == letter_body(generated["letter"], Language.MALAY)
+    assert len(prompts) == 1 and groq.audio.transcriptions.count == 1
+
+
+def test_instructions_rewrite_from_the_previous_body(run):
+    prompts = []
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01), _anthropic(prompts))
+
+    generated, [revised] = _session(run, (None, {"instructions": "Make it firmer"}))
+
+    assert revised.status_code == 200
+    assert revised.json()["generation_id"] == generated["generation_id"]
+    assert "Make it firmer" in prompts[-1]
+    assert letter_body(generated["letter"], Language.MALAY) in prompts[-1]
+
+
+def test_a_paragraph_rewrite_leaves_the_others_alone(run):
+    prompts = []
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01), _anthropic(prompts))
+
+    generated, [revised] = _session(run, (None, {"paragraph": 2, "instructions": "Give a deadline"}))
+
+    before = letter_body(generated["letter"], Language.MALAY).split("\n\n")
+    after = letter_body(revised.json()["letter"], Language.MALAY).split("\n\n")
+    assert after == before[:2] + [REWRITTEN]
+
+
+def test_bad_revisions_are_rejected(run):
+    install(StubGroq(whisper_latency=0.01, llm_latency=0.01), _anthropic([]))
+
+    _, responses = _session(
+        run,
+        ("0" * 32, {"instructions": "Shorter"}),
+        (None, {}),
+        (None, {"paragraph": 1}),
+        (None, {"paragraph": 9, "instructions": "Shorter"}),
+        (None, {"paragraph": 1, "instructions": "Shorter", "language": "en"})
+    )
+
+    assert [(response.status_code, response.json()["detail"]) for response in responses] == [
+        (404, "Letter session not found or expired"),
+        (400, "Nothing to revise"),
+        (400, "A paragraph rewrite needs instructions"),
+        (400, "Paragraph out of range. Letter has 3"),
+        (400, "Changing the language rewrites the whole letter; omit paragraph")
+    ]
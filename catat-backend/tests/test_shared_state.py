@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+
+from app.services.shared_state import MemoryState, RedisState, SQLiteState, TieredCache, TokenBucket
+from benchmarks.redis_stub import serve
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(capacity=2, refill_per_second=1, now=0)
+
+    assert bucket.take(0) == 0 and bucket.take(0) == 0
+    assert bucket.take(0) == pytest.approx(1.0)
+    assert bucket.take(0.5) == pytest.approx(0.5)
+    assert bucket.take(1.0) == 0
+    # Idle time never banks more than the capacity
+    assert [bucket.take(100) for _ in range(3)][-1] > 0
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def workers(request, tmp_path, run):
+    """Two connections to one backend, standing in for two uvicorn workers"""
+    if request.param == "sqlite":
+        states = [SQLiteState(1.0, str(tmp_path / "state.db")) for _ in range(2)]
+        yield states
+    else:
+        server = run(serve("127.0.0.1", 0))
+        url = f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        states = [RedisState(1.0, url, prefix=f"{tmp_path.name}:") for _ in range(2)]
+        yield states
+        server.close()
+        run(server.wait_closed())
+    for state in states:
+        run(state.close())
+
+
+def test_workers_draw_from_one_bucket(workers, run):
+    async def scenario():
+        return [await workers[i % 2].take_token("rate:ip:1.2.3.4", 4, 4 / 60) for i in range(8)]
+
+    waits = run(scenario())
+
+    assert waits[:4] == [0] * 4
+    assert all(wait > 0 for wait in waits[4:])
+
+
+def test_workers_share_cached_values(workers, run):
+    first, second = (
+        TieredCache("transcript", 10, 60, state, str.encode, bytes.decode) for state in workers
+    )
+
+    async def scenario():
+        await first.set("k", "Lampu jalan rosak")
+        return await second.get("k"), await second.get("missing")
+
+    assert run(scenario()) == ("Lampu jalan rosak", None)
+    assert second.stats()["shared_hits"] == 1
+
+
+def test_memory_state_is_not_used_as_a_second_tier():
+    cache = TieredCache("transcript", 10, 60, MemoryState(1.0), str.encode, bytes.decode)
+    assert cache.store is None
+
+
+def test_a_locked_database_is_an_unanswered_token_request(tmp_path, run):
+    """Another worker holding the write lock past the busy timeout fails open, not with an error"""
+    path = str(tmp_path / "state.db")
+    state = SQLiteState(0.05, path)
+    run(state.take_token("warm", 1, 1))
+    holder = sqlite3.connect(path, isolation_level=None)
+    try:
+        holder.execute("BEGIN IMMEDIATE")
+        assert run(state.take_token("rate:ip:1.2.3.4", 4, 1)) is None
+        assert state.errors == 1
+        holder.execute("ROLLBACK")
+        assert run(state.take_token("rate:ip:1.2.3.4", 4, 1)) == 0
+    finally:
+        holder.close()
+        run(state.close())
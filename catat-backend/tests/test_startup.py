@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient as AnthropicHttpClient
+from groq import AsyncGroq, DefaultAsyncHttpxClient as GroqHttpClient
+
+from app.config import settings
+from app.services.provider_clients import ProviderClients, provider_clients
+from app.services.whisper_service import get_whisper_service
+from app.services.groq_service import get_groq_service
+from app.services.claude_service import get_claude_service
+from benchmarks.stub_servers import create_app
+
+
+def _connect(clients: ProviderClients, stub):
+    # Real SDK clients, so warmup's model listings go through the stub app's routes
+    transport = httpx.ASGITransport(app=stub)
+    clients.groq = AsyncGroq(
+        api_key="test", base_url="http://stub", max_retries=0, http_client=GroqHttpClient(transport=transport)
+    )
+    clients.anthropic = AsyncAnthropic(
+        api_key="test", base_url="http://stub", max_retries=0, http_client=AnthropicHttpClient(transport=transport)
+    )
+
+
+def test_the_app_imports_without_provider_keys():
+    env = {name: value for name, value in os.environ.items() if name not in ("GROQ_API_KEY", "ANTHROPIC_API_KEY")}
+
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=Path(__file__).parent.parent, env=env, capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr
+
+
+def test_missing_keys_are_reported_when_the_clients_open(monkeypatch):
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "")
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "")
+
+    with pytest.raises(RuntimeError, match="GROQ_API_KEY, ANTHROPIC_API_KEY"):
+        ProviderClients().open()
+
+
+def test_warmup_opens_the_configured_connections(run, monkeypatch):
+    monkeypatch.setattr(settings, "PROVIDER_WARMUP_CONNECTIONS", 3)
+    clients = ProviderClients()
+    _connect(clients, create_app())
+
+    stats = run(clients.warmup())
+
+    assert stats["groq"]["connections"] == 3 and stats["groq"]["failed"] == 0
+    assert stats["anthropic"]["connections"] == 3 and stats["anthropic"]["failed"] == 0
+    assert clients.warmup_stats is stats
+
+
+def test_warmup_failures_are_counted_not_raised(run, monkeypatch):
+    monkeypatch.setattr(settings, "PROVIDER_WARMUP_CONNECTIONS", 2)
+    clients = ProviderClients()
+    _connect(clients, create_app())
+
+    async def refuse():
+        raise httpx.ConnectError("unreachable")
+    clients.anthropic.models.list = refuse
+
+    stats = run(clients.warmup())
+
+    assert stats["groq"] == {"connections": 2, "failed": 0, "ms": stats["groq"]["ms"]}
+    assert stats["anthropic"]["connections"] == 0 and stats["anthropic"]["failed"] == 2
+
+
+def test_lifespan_builds_services_warms_up_and_reports_timings(run, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "test")
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "test")
+    monkeypatch.setattr(settings, "PROVIDER_WARMUP_ENABLED", True)
+    monkeypatch.setattr(settings, "PROVIDER_WARMUP_CONNECTIONS", 2)
+    _connect(provider_clients, create_app())
+
+    async def scenario():
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return (await client.get("/health")).json()
+
+    health = run(scenario())
+
+    startup = health["startup"]
+    assert startup["import_ms"] > 0 and startup["startup_ms"] > 0
+    assert startup["warmup"]["groq"]["connections"] == 2
+    assert startup["warmup"]["anthropic"]["connections"] == 2
+    for getter in (get_whisper_service, get_groq_service, get_claude_service):
+        assert getter.cache_info().currsize == 1
@@ -0,0 +1,163 @@
+import json
+from types import SimpleNamespace
+
+from app.config import settings
+from app.models.letter import ContactOverrides
+from app.services.groq_service import GroqService
+from app.services.local_extractor import local_extractor
+from benchmarks.stub_providers import STRUCTURED_JSON, StubGroq, install
+
+TRANSCRIPT = "Saya nak buat aduan pasal lampu jalan rosak di taman kami lah"
+
+
+def _service() -> GroqService:
+    return GroqService()
+
+
+def test_structuring_is_memoized_per_transcript_and_letter_type(run):
+    groq = StubGroq(llm_latency=0.01)
+    install(groq)
+    service = _service()
+
+    async def scenario():
+        first = await service.structure_letter(TRANSCRIPT, "complaint")
+        # Whitespace differences in the transcript don't change the result
+        second = await service.structure_letter("  " + TRANSCRIPT.replace(" ", "\n  "), "complaint")
+        other_type = await service.structure_letter(TRANSCRIPT, "proposal")
+        return first, second, other_type
+
+    first, second, _ = run(scenario())
+
+    assert groq.chat.completions.count == 2
+    assert first == second
+    # Each caller gets its own copy to merge overrides into
+    second.sender.name = "Someone else"
+    assert run(service.structure_letter(TRANSCRIPT, "complaint")).sender.name == first.sender.name
+
+
+def test_a_prompt_change_retires_cached_results(run):
+    groq = StubGroq(llm_latency=0.01)
+    install(groq)
+    before, after = _service(), _service()
+    # What an edit to the system prompt or schema does to the version
+    after.prompt_version = "edited"
+    after.cache = before.cache
+
+    run(before.structure_letter(TRANSCRIPT, "complaint"))
+    run(after.structure_letter(TRANSCRIPT, "complaint"))
+
+    assert groq.chat.completions.count == 2
+
+
+SPOKEN = (
+    "Nama saya Ahmad bin Ali. Saya nak buat aduan kepada DBKL pasal lampu jalan rosak sejak 3 Mac 2025 lah. "
+    "Telefon saya 012-3456789. Tolong baiki segera, bahaya!"
+)
+
+
+def test_local_extraction_finds_what_was_said():
+    extracted = local_extractor.extract(SPOKEN, "complaint")
+
+    assert extracted.sender.name == "Ahmad bin Ali"
+    assert extracted.sender.contact == "012-3456789"
+    assert extracted.recipient.organization == "Dewan Bandaraya Kuala Lumpur (DBKL)"
+    assert extracted.dates_mentioned == ["3 Mac 2025"]
+    assert (extracted.tone_detected.value, extracted.language_preference.value, extracted.urgency_level.value) == (
+        "manglish", "ms", "high"
+    )
+
+
+def test_a_form_covering_the_contacts_skips_the_llm(run):
+    groq = StubGroq(llm_latency=0.01)
+    install(groq)
+    service = _service()
+    # Name, phone and agency come from the transcript; the two addresses from the form
+    covered = ContactOverrides(sender_address="Jalan Ampang, Kuala Lumpur", recipient_address="Jalan Raja Laut")
+    partial = ContactOverrides(sender_address="Jalan Ampang, Kuala Lumpur")
+
+    structured = run(service.structure_letter(SPOKEN, "complaint", covered))
+    assert groq.chat.completions.count == 0
+    assert structured.sender.name == "Ahmad bin Ali"
+
+    run(service.structure_letter(SPOKEN, "complaint", partial))
+    assert groq.chat.completions.count == 1
+
+
+def test_the_fast_path_can_be_switched_off(monkeypatch, run):
+    monkeypatch.setattr(settings, "STRUCTURE_FAST_PATH_ENABLED", False)
+    groq = StubGroq(llm_latency=0.01)
+    install(groq)
+    full = ContactOverrides(
+        sender_name="Ahmad", sender_address="Jalan Ampang", sender_contact="012-3456789",
+        recipient_organization="DBKL", recipient_address="Jalan Raja Laut"
+    )
+
+    run(_service().structure_letter(SPOKEN, "complaint", full))
+    assert groq.chat.completions.count == 1
+
+
+def _completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _replying(*contents: str) -> StubGroq:
+    """Groq stub whose chat completions return each of `contents` in turn"""
+    groq = StubGroq(llm_latency=0.01)
+    groq.requests = []
+    replies = iter(contents)
+    groq.chat.completions.result = lambda kwargs: groq.requests.append(kwargs) or _completion(next(replies))
+    return groq
+
+
+def test_near_miss_values_are_coerced():
+    near_miss = {
+        "letter_type": "Aduan", "sender": "Ahmad bin Ali",
+        "recipient": {"name": "Pengarah", "address": ["Jalan Raja Laut", "Kuala Lumpur"]},
+        "subject": 42, "key_points": "Lampu rosak", "tone_detected": "Informal",
+        "language_preference": "Bahasa Melayu", "dates_mentioned": None, "urgency_level": "URGENT"
+    }
+
+    structured, coerced = _service()._parse("Here you go:\n```json\n" + json.dumps(near_miss) + "\n```", "complaint")
+
+    assert coerced
+    assert structured.letter_type.value == "complaint"
+    assert structured.sender.name == "Ahmad bin Ali"
+    assert structured.recipient.address == "Jalan Raja Laut, Kuala Lumpur"
+    assert (structured.subject, structured.key_points, structured.dates_mentioned) == ("42", ["Lampu rosak"], [])
+    assert (structured.tone_detected.value, structured.language_preference.value, structured.urgency_level.value) == (
+        "casual", "ms", "high"
+    )
+
+
+def test_unknown_values_fall_back_to_defaults_and_the_chosen_letter_type():
+    structured, _ = _service()._parse(
+        json.dumps({"letter_type": "invoice", "subject": "Lampu", "tone_detected": "angry", "urgency_level": 3}),
+        "proposal"
+    )
+
+    assert structured.letter_type.value == "proposal"
+    assert (structured.tone_detected.value, structured.urgency_level.value) == ("casual", "low")
+
+
+def test_invalid_output_gets_one_repair_round(run):
+    groq = _replying("not json at all", STRUCTURED_JSON)
+    install(groq)
+
+    structured = run(_service().structure_letter(TRANSCRIPT, "complaint"))
+
+    assert structured.subject == "Aduan lampu jalan rosak"
+    assert all(request["response_format"] == {"type": "json_object"} for request in groq.requests)
+    # The repair shows the model its own output
+    repair = groq.requests[1]["messages"]
+    assert [message["role"] for message in repair[-2:]] == ["assistant", "user"]
+    assert repair[-2]["content"] == "not json at all"
+
+
+def test_a_failed_repair_falls_back_to_local_extraction(run):
+    groq = _replying("{}", '{"subject": "", "key_points": []}')
+    install(groq)
+
+    structured = run(_service().structure_letter(TRANSCRIPT, "complaint"))
+
+    assert groq.chat.completions.count == 2
+    assert structured == local_extractor.extract(TRANSCRIPT, "complaint")
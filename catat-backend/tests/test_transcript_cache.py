@@ -0,0 +1,56 @@
+import os
+
+from app.services.shared_state import SQLiteState
+from app.services.transcript_cache import TranscriptCache
+from benchmarks.stub_providers import StubGroq, install
+
+
+def test_identical_audio_is_transcribed_once(run):
+    groq = StubGroq(whisper_latency=0.01)
+    install(groq)
+    from app.services.whisper_service import get_whisper_service
+    whisper_service = get_whisper_service()
+    audio = os.urandom(2048)
+
+    async def scenario():
+        return [
+            await whisper_service.transcribe_audio(audio, language="ms"),
+            await whisper_service.transcribe_audio(audio, language="ms", filename="renamed.m4a"),
+            # The language changes the transcript, so it is part of the key
+            await whisper_service.transcribe_audio(audio, language="en"),
+            await whisper_service.transcribe_audio(os.urandom(2048), language="ms")
+        ]
+
+    transcripts = run(scenario())
+
+    assert len(set(transcripts)) == 1
+    assert groq.audio.transcriptions.count == 3
+
+
+def test_keys_cover_audio_language_and_model():
+    key = TranscriptCache.key
+
+    assert key(b"audio", "ms", "whisper-large-v3") == key(b"audio", "ms", "whisper-large-v3")
+    assert len({
+        key(b"audio", "ms", "whisper-large-v3"),
+        key(b"audio!", "ms", "whisper-large-v3"),
+        key(b"audio", "en", "whisper-large-v3"),
+        key(b"audio", "ms", "whisper-large-v3-turbo")
+    }) == 4
+
+
+def test_a_dedicated_file_keeps_transcripts_across_restarts(tmp_path, run):
+    path = str(tmp_path / "transcripts.db")
+
+    async def scenario():
+        before = TranscriptCache(10, 60, SQLiteState(1.0, path))
+        await before.set("k", "Lampu jalan rosak")
+        await before.close()
+
+        after = TranscriptCache(10, 60, SQLiteState(1.0, path))
+        try:
+            return await after.get("k")
+        finally:
+            await after.close()
+
+    assert run(scenario()) == "Lampu jalan rosak"
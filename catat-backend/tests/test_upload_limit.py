@@ -0,0 +1,93 @@
+import httpx
+from fastapi import FastAPI, File, UploadFile
+
+from app.middleware.upload_limit import UploadLimitMiddleware
+
+MB = 1024 * 1024
+BOUNDARY = "catat-test-boundary"
+
+
+def _app(handled: list) -> UploadLimitMiddleware:
+    api = FastAPI()
+
+    @api.post("/api/upload")
+    @api.post("/api/batch")
+    async def upload(audio: UploadFile = File(...)):
+        handled.append(len(await audio.read()))
+        return {"size": handled[-1]}
+
+    return UploadLimitMiddleware(
+        api, max_bytes=1 * MB, path_limits={"/api/batch": 3 * MB},
+        file_field="audio", allowed_types=["audio/webm"], max_part_bytes=1 * MB
+    )
+
+
+def _multipart(content_type: str, size: int, chunk: int = 64 * 1024):
+    """A streamed multipart body (no Content-Length) and a list recording how much of it was sent"""
+    sent = []
+    head = (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="audio"; filename="rec.webm"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+
+    async def body():
+        for piece in [head] + [b"\0" * chunk] * (size // chunk) + [f"\r\n--{BOUNDARY}--\r\n".encode()]:
+            sent.append(len(piece))
+            yield piece
+
+    return body(), sent
+
+
+def _post(run, app, path: str, content, headers=None) -> httpx.Response:
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(
+                path, content=content,
+                headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", **(headers or {})}
+            )
+    return run(scenario())
+
+
+def test_a_declared_oversized_body_is_rejected_unread(run):
+    handled = []
+    content, sent = _multipart("audio/webm", 2 * MB)
+
+    response = _post(run, _app(handled), "/api/upload", content, {"Content-Length": str(2 * MB + 200)})
+
+    assert response.status_code == 413
+    assert handled == [] and sent == []
+
+
+def test_a_streamed_body_is_cut_off_at_the_limit(run):
+    handled = []
+    content, sent = _multipart("audio/webm", 4 * MB)
+
+    response = _post(run, _app(handled), "/api/upload", content)
+
+    assert response.status_code == 413
+    assert handled == []
+    assert sum(sent) < 1.5 * MB
+
+
+def test_a_wrong_part_type_is_rejected_from_its_headers(run):
+    handled = []
+    content, sent = _multipart("text/plain", 1 * MB // 2)
+
+    response = _post(run, _app(handled), "/api/upload", content)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unsupported format: text/plain"
+    # Only the first chunk, which carries the part headers, was read
+    assert handled == [] and len(sent) <= 2
+
+
+def test_per_path_limits_and_accepted_uploads(run):
+    handled = []
+    app = _app(handled)
+
+    batch, _ = _multipart("audio/webm", 2 * MB)
+    assert _post(run, app, "/api/batch", batch).status_code == 200
+    single, _ = _multipart("audio/webm", MB // 2)
+    assert _post(run, app, "/api/upload", single).json() == {"size": MB // 2}
+    assert handled == [2 * MB, MB // 2]
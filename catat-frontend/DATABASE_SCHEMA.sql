@@ -55,6 +55,8 @@ CREATE POLICY "Users can delete own letters"
     USING (auth.uid() = user_id);
 
 -- Optional: For development/testing without authentication
+-- The backend's letter persistence (LETTER_DB_URL) writes rows without a user_id,
+-- which the per-user policies above hide; it needs these public-access policies.
 -- Uncomment these to allow public access (remove in production!)
 -- DROP POLICY IF EXISTS "Users can view own letters" ON public.letters;
 -- DROP POLICY IF EXISTS "Users can insert own letters" ON public.letters;
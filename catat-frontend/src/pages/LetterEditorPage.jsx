@@ -19,12 +19,18 @@ function LetterEditorPage() {
   const [metadata, setMetadata] = useState(null)
   const [structuredData, setStructuredData] = useState(null)
   const [transcript, setTranscript] = useState(null)
+  // Set when the backend already stored this letter
+  const [letterId, setLetterId] = useState(null)
 
   useEffect(() => {
     const loadLetter = async () => {
       // Load letter data from navigation state or Supabase (if editing existing)
       if (location.state) {
-        const { letter, metadata: meta, structuredData: structured, transcript: trans } = location.state
+        const { letter, metadata: meta, structuredData: structured, transcript: trans, letterId: storedId } = location.state
+        
+        if (storedId) {
+          setLetterId(storedId)
+        }
         
         if (letter) {
           // Backend already generates proper HTML structure, use as-is
@@ -111,14 +117,12 @@ function LetterEditorPage() {
         })
         alert('Letter updated successfully!')
       } else {
-        // Save new letter
-        const savedLetter = await supabaseService.saveLetter({
-          title,
-          content,
-          metadata,
-          structuredData,
-          transcript
-        })
+        // The backend writes generated letters shortly after responding; saving under
+        // the same ID keeps one row whether or not its write has landed yet
+        const letterData = { title, content, metadata, structuredData, transcript }
+        const savedLetter = letterId
+          ? await supabaseService.upsertLetter(letterId, letterData)
+          : await supabaseService.saveLetter(letterData)
         alert('Letter saved successfully!')
       }
       
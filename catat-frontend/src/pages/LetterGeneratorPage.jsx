@@ -101,7 +101,8 @@ function LetterGeneratorPage() {
           letter: result.letter,
           metadata: result.metadata,
           structuredData: mergedStructuredData,
-          transcript: result.transcript
+          transcript: result.transcript,
+          letterId: result.letter_id
         }
       })
     }
@@ -38,6 +38,44 @@ class SupabaseService {
     }
   }
 
+  /**
+   * Save a letter under a known ID, inserting or overwriting the row.
+   * Used for letters the backend also writes, which may not be there yet.
+   * @param {string} id - Letter ID from the generation response
+   * @param {Object} letterData - Letter data to save
+   * @returns {Promise<Object>} Saved letter
+   */
+  async upsertLetter(id, letterData) {
+    try {
+      const { data, error } = await supabase
+        .from('letters')
+        .upsert({
+          id,
+          title: letterData.title,
+          content: letterData.content,
+          letter_type: letterData.metadata?.letter_type || 'general',
+          language: letterData.metadata?.language || 'en',
+          tone_detected: letterData.metadata?.tone_detected,
+          urgency: letterData.metadata?.urgency,
+          transcript: letterData.transcript,
+          structured_data: letterData.structuredData,
+          metadata: letterData.metadata,
+          updated_at: new Date().toISOString()
+        }, { onConflict: 'id' })
+        .select()
+
+      if (error) {
+        console.error('Supabase upsert error:', error)
+        throw new Error(error.message)
+      }
+
+      return data[0]
+    } catch (error) {
+      console.error('Failed to save letter:', error)
+      throw error
+    }
+  }
+
   /**
    * Update an existing letter
    * @param {string} id - Letter ID